@@ -10,8 +10,14 @@ bl_info = {
     "tracker_url": "https://github.com/abdelsidi/blender-ai-integration/issues",
 }
 
-import bpy
-from . import ui, utils, core
+try:
+    import bpy
+except ImportError:
+    # Batch analysis workers import this package from plain Python
+    bpy = None
+
+if bpy is not None:
+    from . import ui, utils, core
 
 # Check dependencies on load
 def check_dependencies():
@@ -0,0 +1,242 @@
+"""Headless image-to-scene runner
+
+Analysis only (plain Python, no Blender needed):
+    cd addons
+    python -m ai_image_to_scene.cli photos/*.jpg --analysis-only -o analysis/
+
+Full scene (Blender in background mode):
+    blender -b -P addons/ai_image_to_scene/cli.py -- photo.jpg -o scene.blend
+    blender -b -P addons/ai_image_to_scene/cli.py -- photos/ -o scenes.glb --mesh-method ADAPTIVE
+
+Several images end up in one output file, one collection per image.
+The addon's UI panels are never registered.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Allow running as a plain script (blender -P) as well as with python -m
+ADDONS_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if ADDONS_DIR not in sys.path:
+    sys.path.insert(0, ADDONS_DIR)
+
+from ai_image_to_scene.core.analysis import ImageAnalyzer, DEPTH_QUALITY_RESOLUTIONS
+from ai_image_to_scene.core.analysis_cache import AnalysisCache, analysis_to_json
+from ai_image_to_scene.core.batch import collect_image_paths, iter_batch_analysis
+from ai_image_to_scene.core.depth import DEPTH_BACKENDS, create_depth_backend
+from ai_image_to_scene.core.palette import PALETTE_METHODS
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+SCENE_FORMATS = {
+    '.blend': 'BLEND',
+    '.glb': 'GLB',
+    '.gltf': 'GLTF_SEPARATE',
+}
+
+
+def parse_args(argv=None):
+    if argv is None:
+        # Blender passes script arguments after "--"
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        prog="ai_image_to_scene.cli",
+        description="Convert images to 3D scenes (or analysis files) without the UI")
+
+    parser.add_argument("images", nargs="+",
+                        help="Image files, folders or glob patterns")
+    parser.add_argument("-o", "--output", required=True,
+                        help="Output .blend/.glb/.gltf file, or a folder with --analysis-only")
+    parser.add_argument("--analysis-only", action="store_true",
+                        help="Write <name>.json and <name>_depth.npy per image; no Blender needed")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Analysis processes (0 = one per CPU core, 1 = in-process)")
+
+    analysis = parser.add_argument_group("analysis")
+    analysis.add_argument("--mode", choices=("pyramid", "full"), default="pyramid",
+                          help="Analyze each step at its own resolution, or at full size")
+    analysis.add_argument("--depth-quality", choices=sorted(DEPTH_QUALITY_RESOLUTIONS), default="medium")
+    analysis.add_argument("--depth-backend", choices=DEPTH_BACKENDS, default="HEURISTIC")
+    analysis.add_argument("--depth-model", default=None,
+                          help="ONNX model path, or a file name in local_models.path (config/settings.json)")
+    analysis.add_argument("--depth-threads", type=int, default=0,
+                          help="ONNX Runtime CPU threads (0 = all cores)")
+    analysis.add_argument("--palette", choices=PALETTE_METHODS, default="histogram")
+    analysis.add_argument("--seed", type=int, default=0, help="Palette random seed")
+    analysis.add_argument("--no-cache", action="store_true", help="Do not use the analysis cache")
+    analysis.add_argument("--cache-dir", default=None, help="Analysis cache folder")
+
+    mesh = parser.add_argument_group("scene")
+    mesh.add_argument("--mesh-method", choices=("GRID", "ADAPTIVE"), default="GRID")
+    mesh.add_argument("--mesh-resolution", type=int, default=200, help="Depth mesh cells per side")
+    mesh.add_argument("--max-error", type=float, default=0.02,
+                      help="Max height error of the adaptive mesh (Blender units)")
+    mesh.add_argument("--decimate-flat", action="store_true", help="Simplify flat grid areas")
+    mesh.add_argument("--keep-scene", action="store_true",
+                      help="Build into the open .blend instead of an empty scene")
+
+    args = parser.parse_args(argv)
+
+    if not args.analysis_only:
+        ext = os.path.splitext(args.output)[1].lower()
+        if ext not in SCENE_FORMATS:
+            parser.error(f"output must end in {', '.join(SCENE_FORMATS)} (or use --analysis-only)")
+        if bpy is None:
+            parser.error("building scenes needs Blender: blender -b -P cli.py -- ... "
+                         "(or use --analysis-only)")
+
+    return args
+
+
+def configure(analyzer, args):
+    """Apply command-line analyzer/mesh settings"""
+    analyzer.analysis_mode = args.mode
+    analyzer.set_depth_quality(args.depth_quality)
+    analyzer.depth_backend = create_depth_backend(args.depth_backend, args.depth_model,
+                                                  args.depth_threads)
+    analyzer.palette_method = args.palette
+    analyzer.palette_seed = args.seed
+
+    if not args.no_cache:
+        analyzer.cache = AnalysisCache(args.cache_dir)
+
+    if hasattr(analyzer, 'mesh_method'):
+        analyzer.mesh_method = args.mesh_method
+        analyzer.mesh_resolution = args.mesh_resolution
+        analyzer.max_error = args.max_error
+        analyzer.decimate_flat = args.decimate_flat
+
+    return analyzer
+
+
+def iter_analyses(image_paths, analyzer, workers):
+    """Analysis results like iter_batch_analysis, in-process when workers is 1"""
+    if workers == 1 or len(image_paths) == 1:
+        for path in image_paths:
+            start = time.perf_counter()
+            try:
+                analysis = analyzer.analyze_image_with_ai(path)
+                yield {'path': path, 'analysis': analysis,
+                       'seconds': time.perf_counter() - start, 'error': None}
+            except Exception as e:
+                yield {'path': path, 'analysis': None, 'seconds': 0.0, 'error': str(e)}
+    else:
+        yield from iter_batch_analysis(image_paths, analyzer, workers)
+
+
+def write_analysis(analysis, output_dir, image_path):
+    """Write <stem>.json and <stem>_depth.npy, return the JSON path"""
+    import numpy as np
+
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    json_path = os.path.join(output_dir, stem + ".json")
+    depth_path = os.path.join(output_dir, stem + "_depth.npy")
+
+    data = analysis_to_json(analysis)
+    data['image'] = os.path.abspath(image_path)
+    data['depth_map'] = os.path.basename(depth_path)
+
+    np.save(depth_path, analysis['depth_map'])
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+    return json_path
+
+
+def run_analysis_only(image_paths, args):
+    os.makedirs(args.output, exist_ok=True)
+    analyzer = configure(ImageAnalyzer(), args)
+    failures = 0
+
+    for result in iter_analyses(image_paths, analyzer, args.workers):
+        if result['error']:
+            failures += 1
+            print(f"FAILED {result['path']}: {result['error']}")
+            continue
+
+        json_path = write_analysis(result['analysis'], args.output, result['path'])
+        print(f"{result['path']}: {result['seconds']:.2f}s -> {json_path}")
+
+    return failures
+
+
+def save_scene(output_path):
+    output_path = os.path.abspath(output_path)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    file_format = SCENE_FORMATS[os.path.splitext(output_path)[1].lower()]
+
+    if file_format == 'BLEND':
+        bpy.ops.wm.save_as_mainfile(filepath=output_path)
+    else:
+        bpy.ops.export_scene.gltf(filepath=output_path, export_format=file_format)
+
+    print(f"Saved: {output_path}")
+
+
+def run_scene(image_paths, args):
+    from ai_image_to_scene.core.scene_generator import ImageToSceneCore
+
+    if not args.keep_scene:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+
+    core = configure(ImageToSceneCore(), args)
+    view_layer = bpy.context.view_layer
+    root_collection = view_layer.active_layer_collection
+    failures = 0
+
+    for result in iter_analyses(image_paths, core, args.workers):
+        path = result['path']
+        if result['error']:
+            failures += 1
+            print(f"FAILED {path}: {result['error']}")
+            continue
+
+        start = time.perf_counter()
+        try:
+            if len(image_paths) > 1:
+                core.create_scene_collection(f"AI_Scene_{os.path.splitext(os.path.basename(path))[0]}")
+            core.print_report(result['analysis'])
+            scene_data = core.create_scene_from_analysis(result['analysis'], path)
+        except Exception as e:
+            failures += 1
+            print(f"FAILED {path}: {e}")
+            continue
+        finally:
+            view_layer.active_layer_collection = root_collection
+
+        print(f"{path}: analysis {result['seconds']:.2f}s, build {time.perf_counter() - start:.2f}s, "
+              f"{scene_data['object_count']} objects")
+
+    save_scene(args.output)
+    return failures
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    image_paths = []
+    for source in args.images:
+        image_paths.extend(collect_image_paths(source))
+
+    if not image_paths:
+        print("No images found")
+        return 1
+
+    if args.analysis_only:
+        failures = run_analysis_only(image_paths, args)
+    else:
+        failures = run_scene(image_paths, args)
+
+    print(f"Done: {len(image_paths) - failures} of {len(image_paths)} images")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
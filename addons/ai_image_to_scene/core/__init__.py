@@ -1,4 +1,11 @@
-from .scene_generator import ImageToSceneCore
+try:
+    import bpy
+except ImportError:
+    # Batch analysis workers import this package from plain Python
+    bpy = None
+
+if bpy is not None:
+    from .scene_generator import ImageToSceneCore
 
 def register():
     pass
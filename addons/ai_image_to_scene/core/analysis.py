@@ -0,0 +1,305 @@
+import time
+
+import cv2
+
+from .depth import HeuristicDepthBackend, create_depth_backend
+from .detection import detect_objects, DETECTION_SIZE
+from .features import FeatureCache, ImageFeatures
+from .palette import extract_palette
+
+
+# Longest image side each analyzer works at in 'pyramid' mode (None = full resolution)
+ANALYZER_RESOLUTIONS = {
+    'dominant_colors': 256,
+    'detected_objects': DETECTION_SIZE,
+    'depth_map': 1024,
+    'lighting_direction': 512,
+    'scene_type': 256,
+}
+
+# Depth map resolution for the panel's depth quality setting
+DEPTH_QUALITY_RESOLUTIONS = {
+    'low': 512,
+    'medium': 1024,
+    'high': 2048,
+}
+
+
+class ImagePyramid:
+    """Image pyramid built once and shared by all analyzers"""
+
+    def __init__(self, img, min_size=64):
+        self.levels = [img]
+        self.sized = {}
+
+        # Halve with area averaging until the longest side reaches min_size
+        while max(self.levels[-1].shape[:2]) // 2 >= min_size:
+            prev = self.levels[-1]
+            height, width = prev.shape[:2]
+            size = (max(1, width // 2), max(1, height // 2))
+            self.levels.append(cv2.resize(prev, size, interpolation=cv2.INTER_AREA))
+
+    @property
+    def base(self):
+        return self.levels[0]
+
+    def level_for(self, max_size):
+        """Return the image with its longest side at max_size (the base image if smaller)
+
+        The smallest level still >= max_size is area-resized down to max_size.
+        Results are kept, so analyzers asking for the same size share one array.
+        """
+        if max_size is None or max(self.levels[0].shape[:2]) <= max_size:
+            return self.levels[0]
+
+        if max_size not in self.sized:
+            chosen = self.levels[0]
+            for level in self.levels:
+                if max(level.shape[:2]) < max_size:
+                    break
+                chosen = level
+
+            height, width = chosen.shape[:2]
+            scale = max_size / max(height, width)
+            if scale < 1.0:
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                chosen = cv2.resize(chosen, size, interpolation=cv2.INTER_AREA)
+            self.sized[max_size] = chosen
+
+        return self.sized[max_size]
+
+    def scale_of(self, level):
+        """Scale factors (x, y) that map level coordinates back to the base image"""
+        base_h, base_w = self.levels[0].shape[:2]
+        height, width = level.shape[:2]
+        return (base_w / width, base_h / height)
+
+
+class ImageAnalyzer:
+    """OpenCV image analysis - no Blender dependency"""
+
+    def __init__(self):
+        self.analysis_mode = 'pyramid'  # 'pyramid' or 'full'
+        self.analyzer_resolutions = dict(ANALYZER_RESOLUTIONS)
+        self.palette_method = 'histogram'  # 'histogram', 'sample' or legacy 'kmeans'
+        self.palette_seed = 0
+        self.max_objects = 10
+        self.min_object_fraction = 0.001  # Smallest object, as a fraction of the image area
+        self.depth_backend = HeuristicDepthBackend()
+        self.cache = None  # Optional AnalysisCache
+
+    def set_depth_quality(self, quality):
+        """Pick depth map resolution from a quality preset (low/medium/high)"""
+        self.analyzer_resolutions['depth_map'] = DEPTH_QUALITY_RESOLUTIONS.get(
+            quality, ANALYZER_RESOLUTIONS['depth_map'])
+
+    def analysis_settings(self):
+        """Settings that change the analysis result, plus the depth runtime
+
+        'depth_runtime' (threads, batch size) only changes the speed: batch
+        workers get it, the cache key leaves it out.
+        """
+        return {
+            'mode': self.analysis_mode,
+            'resolutions': self.analyzer_resolutions,
+            'palette_method': self.palette_method,
+            'palette_seed': self.palette_seed,
+            'max_objects': self.max_objects,
+            'min_object_fraction': self.min_object_fraction,
+            'depth': self.depth_backend.settings(),
+            'depth_runtime': self.depth_backend.runtime_settings(),
+        }
+
+    def apply_settings(self, settings):
+        """Restore settings from analysis_settings() (e.g. in a worker process)"""
+        self.analysis_mode = settings['mode']
+        self.analyzer_resolutions = dict(settings['resolutions'])
+        self.palette_method = settings['palette_method']
+        self.palette_seed = settings['palette_seed']
+        self.max_objects = settings['max_objects']
+        self.min_object_fraction = settings['min_object_fraction']
+        depth = settings['depth']
+        self.depth_backend = create_depth_backend(depth['backend'], depth.get('model'),
+                                                  **settings.get('depth_runtime', {}))
+
+    def cache_key(self, image_path):
+        """Analysis cache key of an image with the current settings"""
+        settings = self.analysis_settings()
+        del settings['depth_runtime']
+        return self.cache.make_key(image_path, settings)
+
+    def analyze_image_with_ai(self, image_path):
+        """Analyze image using AI to extract scene information"""
+
+        # Reuse a previous analysis of the same image and settings
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(image_path)
+            analysis = self.cache.get(key)
+            if analysis is not None:
+                return analysis
+
+        # Load image
+        img = cv2.imread(image_path)
+        if img is None:
+            raise ValueError(f"Cannot load image: {image_path}")
+
+        analysis = self.analyze_array(img)
+
+        if key is not None:
+            # A failed cache write must not fail the analysis
+            try:
+                self.cache.put(key, analysis)
+            except (OSError, ValueError) as e:
+                print(f"Analysis cache: cannot store {image_path}: {e}")
+
+        return analysis
+
+    def analyze_array(self, img):
+        """Run every analyzer on an already loaded BGR image"""
+        height, width = img.shape[:2]
+        total_start = time.perf_counter()
+
+        # Build the shared pyramid once ('full' mode analyzes the base image only)
+        start = time.perf_counter()
+        if self.analysis_mode == 'pyramid':
+            pyramid = ImagePyramid(img)
+            resolutions = self.analyzer_resolutions
+        else:
+            pyramid = ImagePyramid(img, min_size=max(height, width))
+            resolutions = {}
+        pyramid_seconds = time.perf_counter() - start
+
+        analyzers = [
+            ('dominant_colors', self._run_dominant_colors),
+            ('detected_objects', self._run_detect_objects),
+            ('depth_map', self._run_depth_map),
+            ('lighting_direction', self._run_lighting),
+            ('scene_type', self._run_classify),
+        ]
+
+        analysis = {'dimensions': (width, height)}
+        report = {}
+        features = FeatureCache()
+
+        for name, run in analyzers:
+            level = pyramid.level_for(resolutions.get(name))
+            scale = pyramid.scale_of(level)
+
+            start = time.perf_counter()
+            analysis[name] = run(features.get(level), scale)
+            seconds = time.perf_counter() - start
+
+            report[name] = {
+                'resolution': (level.shape[1], level.shape[0]),
+                'scale': scale,
+                'seconds': seconds,
+            }
+
+        analysis['analysis_report'] = {
+            'mode': self.analysis_mode,
+            'pyramid_levels': len(pyramid.levels),
+            'pyramid_seconds': pyramid_seconds,
+            'analyzers': report,
+            'depth_backend': self.depth_backend.stats(),
+            'total_seconds': time.perf_counter() - total_start,
+        }
+
+        return analysis
+
+    def print_report(self, analysis):
+        """Print per-analyzer resolution and timing"""
+        report = analysis.get('analysis_report')
+        if not report:
+            return
+
+        if analysis.get('cached'):
+            print("Analysis loaded from cache")
+            return
+
+        print(f"Analysis mode: {report['mode']} "
+              f"(pyramid: {report['pyramid_levels']} levels, {report['pyramid_seconds']*1000:.1f} ms)")
+        for name, info in report['analyzers'].items():
+            width, height = info['resolution']
+            print(f"  {name:<20} {width}x{height}  {info['seconds']*1000:.1f} ms")
+        depth = report.get('depth_backend')
+        if depth:
+            print(f"  depth backend {depth['backend']}: {depth['fps']:.1f} frames/s")
+        print(f"  total {report['total_seconds']*1000:.1f} ms")
+
+    # Pyramid adapters: run an analyzer on a level's features, return results
+    # in base image coordinates
+
+    def _run_dominant_colors(self, features, scale):
+        return self.extract_dominant_colors(features.img)
+
+    def _run_detect_objects(self, features, scale):
+        sx, sy = scale
+        objects = self.detect_objects_basic(features.img, features)
+
+        for obj in objects:
+            x, y, w, h = obj['bbox']
+            x, y = int(round(x * sx)), int(round(y * sy))
+            w, h = int(round(w * sx)), int(round(h * sy))
+            obj['bbox'] = (x, y, w, h)
+            obj['area'] = obj['area'] * sx * sy
+            obj['center'] = (x + w//2, y + h//2)
+
+        return objects
+
+    def _run_depth_map(self, features, scale):
+        # Depth stays at its working resolution; it is sampled through UVs
+        return self.generate_depth_map(features.img, features)
+
+    def _run_lighting(self, features, scale):
+        # Direction is normalized to the image size, so no rescaling is needed
+        return self.estimate_lighting(features.img, features)
+
+    def _run_classify(self, features, scale):
+        return self.classify_scene(features.img, features)
+
+    def extract_dominant_colors(self, img, k=5):
+        """Extract dominant colors from image (deterministic, most dominant first)"""
+        return extract_palette(img, k, method=self.palette_method, seed=self.palette_seed)
+
+    def detect_objects_basic(self, img, features=None):
+        """Object detection using contours (largest objects first)"""
+        features = features or ImageFeatures(img)
+        # Grayscale first: downscaling one channel is cheaper than three
+        return detect_objects(features.gray, self.max_objects, self.min_object_fraction)
+
+    def generate_depth_map(self, img, features=None):
+        """Generate depth map from image with the configured depth backend"""
+        return self.depth_backend.estimate(img, features)
+
+    def estimate_lighting(self, img, features=None):
+        """Estimate lighting direction from image"""
+        features = features or ImageFeatures(img)
+
+        # Find brightest area
+        max_loc = features.luminance_stats['max_loc']
+
+        height, width = img.shape[:2]
+
+        # Normalize to -1 to 1
+        light_x = (max_loc[0] / width) * 2 - 1
+        light_y = (max_loc[1] / height) * 2 - 1
+        light_z = 0.5  # Assume light is above
+
+        return (light_x, light_y, light_z)
+
+    def classify_scene(self, img, features=None):
+        """Classify scene type"""
+        features = features or ImageFeatures(img)
+
+        # Simple classification based on color distribution
+        mean_color, _ = features.channel_stats
+
+        if mean_color[0] > mean_color[1] and mean_color[0] > mean_color[2]:
+            return "indoor_warm"
+        elif mean_color[2] > 150:
+            return "outdoor_sky"
+        elif features.pixel_std < 30:
+            return "minimal"
+        else:
+            return "mixed"
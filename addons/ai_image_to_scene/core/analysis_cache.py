@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from .config import get_cache_dir
+
+# Bump when the analysis output format changes to invalidate old entries
+CACHE_VERSION = 4
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def analysis_to_json(analysis):
+    """JSON-serializable copy of an analysis (without the depth map)"""
+    return {key: value for key, value in analysis.items() if key != 'depth_map'}
+
+
+def analysis_from_json(data, depth_map=None):
+    """Rebuild an analysis dict from its JSON form"""
+    analysis = dict(data)
+    analysis['dimensions'] = tuple(analysis['dimensions'])
+    analysis['lighting_direction'] = tuple(analysis['lighting_direction'])
+
+    for obj in analysis['detected_objects']:
+        obj['bbox'] = tuple(obj['bbox'])
+        obj['center'] = tuple(obj['center'])
+
+    analysis['depth_map'] = depth_map
+    return analysis
+
+
+class AnalysisCache:
+    """On-disk cache of image analyses, keyed by image content and analyzer settings
+
+    Each entry is <key>.json (palette, detections, lighting, scene type) plus
+    <key>.npz (compressed depth map). Entries are evicted least recently used
+    first once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir or get_cache_dir("image_to_scene")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, image_path, settings):
+        """Cache key from the image content hash and the analyzer settings"""
+        payload = json.dumps({
+            'version': CACHE_VERSION,
+            'image': hash_file(image_path),
+            'settings': settings,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".npz"
+
+    def get(self, key):
+        """Return the cached analysis for key, or None"""
+        json_path, depth_path = self._paths(key)
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with np.load(depth_path) as npz:
+                depth_map = npz['depth_map']
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        for path in (json_path, depth_path):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+        self.hits += 1
+        analysis = analysis_from_json(data, depth_map)
+        analysis['cached'] = True
+        return analysis
+
+    def put(self, key, analysis):
+        """Store an analysis, then evict old entries if over the size limit"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        json_path, depth_path = self._paths(key)
+
+        # Depth first, JSON last: an entry only counts once its JSON exists
+        def write_depth(f):
+            np.savez_compressed(f, depth_map=analysis['depth_map'])
+
+        def write_json(f):
+            f.write(json.dumps(analysis_to_json(analysis)).encode('utf-8'))
+
+        self._write(depth_path, write_depth)
+        self._write(json_path, write_json)
+
+        self.evict()
+
+    def _write(self, path, write):
+        """Write a file through a temp file, replaced into place when complete"""
+        # Own temp name per process and thread: batch workers may store the
+        # same entry at the same time
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def entries(self):
+        """List (last_used, size, key) for every complete entry"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+
+            key = name[:-len(".json")]
+            size = 0
+            last_used = 0
+            for path in self._paths(key):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                size += stat.st_size
+                last_used = max(last_used, stat.st_mtime)
+
+            entries.append((last_used, size, key))
+
+        return entries
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(key)
+            total -= size
+
+    def remove(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for _, _, key in self.entries():
+            self.remove(key)
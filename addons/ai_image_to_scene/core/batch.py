@@ -0,0 +1,74 @@
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .analysis import ImageAnalyzer
+from .analysis_cache import AnalysisCache
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def collect_image_paths(source):
+    """Image files from a directory, a glob pattern or a single file (sorted)"""
+    source = os.path.expanduser(source)
+
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    elif glob.has_magic(source):
+        paths = glob.glob(source, recursive=True)
+    else:
+        paths = [source]
+
+    return sorted(path for path in paths
+                  if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def analyze_image_file(image_path, settings, cache_dir=None, cache_max_bytes=None):
+    """Analyze one image (runs in a worker process, no Blender needed)"""
+    analyzer = ImageAnalyzer()
+    analyzer.apply_settings(settings)
+    if cache_dir:
+        analyzer.cache = AnalysisCache(cache_dir, cache_max_bytes)
+
+    start = time.perf_counter()
+    analysis = analyzer.analyze_image_with_ai(image_path)
+    return analysis, time.perf_counter() - start
+
+
+def iter_batch_analysis(image_paths, analyzer, max_workers=None):
+    """Analyze images on all cores, yielding results as each one finishes
+
+    Every result is a dict with 'path', 'analysis' (None on failure),
+    'seconds' and 'error'. Uses the settings and cache of analyzer.
+    """
+    settings = analyzer.analysis_settings()
+    cache = analyzer.cache
+    cache_dir = cache.cache_dir if cache is not None else None
+    cache_max_bytes = cache.max_bytes if cache is not None else None
+
+    # Spawn fresh interpreters: forking a running Blender is not safe
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=max_workers or None, mp_context=context)
+    futures = {}
+
+    try:
+        futures = {
+            pool.submit(analyze_image_file, path, settings, cache_dir, cache_max_bytes): path
+            for path in image_paths
+        }
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                analysis, seconds = future.result()
+                yield {'path': path, 'analysis': analysis, 'seconds': seconds, 'error': None}
+            except Exception as e:
+                yield {'path': path, 'analysis': None, 'seconds': 0.0, 'error': str(e)}
+    finally:
+        # Stop queued work too when the consumer gives up early
+        # (shutdown's cancel_futures needs Python 3.9)
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=True)
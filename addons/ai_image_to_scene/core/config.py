@@ -0,0 +1,40 @@
+import json
+import os
+import tempfile
+
+ADDON_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+PROJECT_DIR = os.path.normpath(os.path.join(ADDON_DIR, "..", ".."))
+SETTINGS_PATH = os.path.join(PROJECT_DIR, "config", "settings.json")
+
+
+def load_settings():
+    """Load project settings from config/settings.json ({} when not available)"""
+    if not os.path.exists(SETTINGS_PATH):
+        return {}
+
+    try:
+        with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"AI Image to 3D Scene: cannot read settings: {e}")
+        return {}
+
+
+def resolve_project_path(path):
+    """Resolve a settings path relative to the project root"""
+    path = os.path.expanduser(path)
+    if os.path.isabs(path):
+        return path
+    return os.path.normpath(os.path.join(PROJECT_DIR, path))
+
+
+def get_cache_dir(name):
+    """Cache sub-directory under paths.cache_dir (system temp dir as fallback)"""
+    cache_dir = load_settings().get('paths', {}).get('cache_dir')
+
+    if cache_dir and os.path.exists(SETTINGS_PATH):
+        base = resolve_project_path(cache_dir)
+    else:
+        base = os.path.join(tempfile.gettempdir(), "blender_ai_cache")
+
+    return os.path.join(base, name)
@@ -0,0 +1,60 @@
+import cv2
+import numpy as np
+
+# Longest side the detector thresholds and traces contours at
+DETECTION_SIZE = 512
+
+
+def detect_objects(img, max_objects=10, min_area_fraction=0.001, work_size=DETECTION_SIZE):
+    """Largest bright regions of a BGR image, biggest first
+
+    Works on a copy downscaled by an integer factor to between work_size
+    and 2 * work_size (Otsu threshold, outer contours only), so the cost
+    after the resize does not grow with the pixel count. min_area_fraction
+    is relative to the image area, so the same setting works at every
+    resolution. Returns dicts with 'id' (rank), 'bbox', 'area' and 'center'
+    in img coordinates.
+    """
+    height, width = img.shape[:2]
+
+    # Integer factors take OpenCV's fast box-filter path for INTER_AREA
+    factor = max(1, max(height, width) // work_size)
+    small = img
+    if factor > 1:
+        small = cv2.resize(img, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    small_h, small_w = gray.shape[:2]
+    sx, sy = width / small_w, height / small_h
+
+    # Otsu picks the foreground threshold from the histogram
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Outer contours only: holes and nested shapes are not separate objects
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return []
+
+    areas = np.array([cv2.contourArea(contour) for contour in contours], dtype=np.float64)
+    candidates = np.flatnonzero(areas >= min_area_fraction * small_w * small_h)
+
+    # Partial sort: only the top max_objects need ordering
+    if len(candidates) > max_objects:
+        top = np.argpartition(-areas[candidates], max_objects - 1)[:max_objects]
+        candidates = candidates[top]
+    candidates = candidates[np.argsort(-areas[candidates], kind='stable')]
+
+    objects = []
+    for rank, index in enumerate(candidates):
+        x, y, w, h = cv2.boundingRect(contours[index])
+        x, y = int(round(x * sx)), int(round(y * sy))
+        w, h = int(round(w * sx)), int(round(h * sy))
+        objects.append({
+            'id': rank,
+            'bbox': (x, y, w, h),
+            'area': float(areas[index] * sx * sy),
+            'center': (x + w//2, y + h//2)
+        })
+
+    return objects
@@ -0,0 +1,78 @@
+from functools import cached_property
+
+import cv2
+import numpy as np
+
+
+class ImageFeatures:
+    """Per-image values computed on first use and shared by every analyzer
+
+    Grayscale, gradients and statistics are each computed at most once per
+    image (or pyramid level) however many analyzers ask for them.
+    """
+
+    def __init__(self, img):
+        self.img = img
+
+    @property
+    def shape(self):
+        return self.img.shape
+
+    @cached_property
+    def gray(self):
+        if self.img.ndim == 2:
+            return self.img
+        return cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def gradient_magnitude(self):
+        """Sobel gradient magnitude of the grayscale image (float32)"""
+        gx = cv2.Sobel(self.gray, cv2.CV_32F, 1, 0, ksize=3)
+        gy = cv2.Sobel(self.gray, cv2.CV_32F, 0, 1, ksize=3)
+        return cv2.magnitude(gx, gy)
+
+    @cached_property
+    def luminance_stats(self):
+        """Grayscale min/max (with locations), mean and standard deviation"""
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(self.gray)
+        mean, std = cv2.meanStdDev(self.gray)
+        return {
+            'min': min_val,
+            'max': max_val,
+            'min_loc': min_loc,
+            'max_loc': max_loc,
+            'mean': float(mean[0, 0]),
+            'std': float(std[0, 0]),
+        }
+
+    @cached_property
+    def channel_stats(self):
+        """Per-channel (B, G, R) mean and standard deviation"""
+        mean, std = cv2.meanStdDev(self.img)
+        return mean.ravel(), std.ravel()
+
+    @cached_property
+    def pixel_std(self):
+        """Standard deviation over all channels together (like np.std(img))"""
+        mean, std = self.channel_stats
+        variance = np.mean(std ** 2 + mean ** 2) - np.mean(mean) ** 2
+        return float(np.sqrt(max(variance, 0.0)))
+
+    @cached_property
+    def gray_histogram(self):
+        """256-bin grayscale histogram"""
+        return cv2.calcHist([self.gray], [0], None, [256], [0, 256]).ravel()
+
+
+class FeatureCache:
+    """ImageFeatures per pyramid level, so analyzers at the same level share them"""
+
+    def __init__(self):
+        self.features = {}
+
+    def get(self, img):
+        features = self.features.get(id(img))
+        if features is None or features.img is not img:
+            features = ImageFeatures(img)
+            self.features[id(img)] = features
+        return features
@@ -0,0 +1,169 @@
+import time
+
+import bpy
+import bmesh
+import numpy as np
+
+from .rtin import rtin_errors, rtin_mesh, rtin_triangles
+
+
+def sample_depth(depth_map, u, v):
+    """Bilinear sample of a 0-255 depth map at UVs in [0, 1] (v points up), returns 0-1"""
+    height, width = depth_map.shape[:2]
+
+    x = np.clip(u, 0.0, 1.0) * (width - 1)
+    y = (1.0 - np.clip(v, 0.0, 1.0)) * (height - 1)
+
+    x0 = np.floor(x).astype(np.int32)
+    y0 = np.floor(y).astype(np.int32)
+    x1 = np.minimum(x0 + 1, width - 1)
+    y1 = np.minimum(y0 + 1, height - 1)
+    fx = (x - x0).astype(np.float32)
+    fy = (y - y0).astype(np.float32)
+
+    top = depth_map[y0, x0] * (1 - fx) + depth_map[y0, x1] * fx
+    bottom = depth_map[y1, x0] * (1 - fx) + depth_map[y1, x1] * fx
+
+    return (top * (1 - fy) + bottom * fy) / 255.0
+
+
+def grid_heightfield(depth_map, resolution, size=10.0, strength=2.0):
+    """Vertices, quad faces and per-vertex UVs of a square grid displaced by depth
+
+    The grid has resolution x resolution quads, is centered on the origin and
+    spans size x size; heights are depth (0-1) * strength.
+    """
+    count = resolution + 1
+    steps = np.linspace(0.0, 1.0, count, dtype=np.float32)
+    u, v = np.meshgrid(steps, steps)
+    u = u.ravel()
+    v = v.ravel()
+
+    verts = np.empty((count * count, 3), dtype=np.float32)
+    verts[:, 0] = (u - 0.5) * size
+    verts[:, 1] = (v - 0.5) * size
+    verts[:, 2] = sample_depth(depth_map, u, v) * strength
+
+    # Vertex (row, col) has index row * count + col; quads wind counter-clockwise
+    index = np.arange(count * count, dtype=np.int32).reshape(count, count)
+    faces = np.stack([index[:-1, :-1], index[:-1, 1:],
+                      index[1:, 1:], index[1:, :-1]], axis=-1).reshape(-1, 4)
+
+    uvs = np.stack([u, v], axis=1)
+
+    return verts, faces, uvs
+
+
+def rtin_heights(depth_map, resolution, strength=2.0):
+    """Resample depth onto the (2**k + 1)^2 grid RTIN needs, k from resolution"""
+    cells = 1 << max(1, int(np.ceil(np.log2(max(2, resolution)))))
+    steps = np.linspace(0.0, 1.0, cells + 1, dtype=np.float32)
+    u, v = np.meshgrid(steps, steps)
+
+    # Row 0 is the bottom edge (v = 0) like the grid builder
+    return (sample_depth(depth_map, u.ravel(), v.ravel()) * strength).reshape(u.shape)
+
+
+def adaptive_heightfield(depth_map, max_error, resolution=256, size=10.0, strength=2.0,
+                         errors=None):
+    """Vertices, triangles and UVs of an error-bounded adaptive mesh
+
+    max_error is in Blender units (the height scale of the result). Pass a
+    precomputed errors grid to re-mesh at another max_error without redoing
+    the error pass.
+    """
+    heights = rtin_heights(depth_map, resolution, strength)
+    if errors is None:
+        errors = rtin_errors(heights)
+
+    used, faces, uvs = rtin_mesh(errors, max_error)
+
+    verts = np.empty((len(used), 3), dtype=np.float32)
+    verts[:, :2] = (uvs - 0.5) * size
+    verts[:, 2] = heights.ravel()[used]
+
+    return verts, faces, uvs, errors
+
+
+def error_tradeoff(errors, max_errors):
+    """Triangle count at each max error (for showing the detail/error tradeoff)"""
+    return [(max_error, len(rtin_triangles(errors, max_error))) for max_error in max_errors]
+
+
+def mesh_from_arrays(name, verts, faces, uvs=None):
+    """Build a mesh datablock from NumPy arrays with bulk foreach_set calls
+
+    faces is an (F, corners) array of vertex indices, uvs an optional
+    per-vertex (V, 2) array written to the "UVMap" layer.
+    """
+    faces = np.ascontiguousarray(faces, dtype=np.int32)
+    face_count, corners = faces.shape
+
+    mesh = bpy.data.meshes.new(name)
+
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(verts, dtype=np.float32).ravel())
+
+    mesh.loops.add(faces.size)
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, faces.size, corners, dtype=np.int32))
+    if bpy.app.version < (4, 0, 0):
+        # Derived from loop_start (read-only) since Blender 4.0
+        mesh.polygons.foreach_set("loop_total", np.full(face_count, corners, dtype=np.int32))
+
+    if uvs is not None:
+        uv_layer = mesh.uv_layers.new(name="UVMap")
+        uv_layer.data.foreach_set("uv", np.ascontiguousarray(uvs[faces.ravel()], dtype=np.float32).ravel())
+
+    mesh.update(calc_edges=True)
+
+    return mesh
+
+
+def decimate_flat_regions(mesh, angle_limit=0.01):
+    """Merge faces in flat regions into larger polygons (angle_limit in radians)"""
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+
+    bmesh.ops.dissolve_limit(bm, angle_limit=angle_limit, use_dissolve_boundaries=False,
+                             verts=bm.verts, edges=bm.edges)
+
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+
+
+def build_heightfield(name, depth_map, resolution=200, size=10.0, strength=2.0,
+                      decimate_flat=False, method='GRID', max_error=0.02):
+    """Create a displaced mesh from a depth map
+
+    method 'GRID' builds a uniform grid, 'ADAPTIVE' an error-bounded RTIN
+    mesh at up to resolution cells per side. Returns (mesh, stats) where
+    stats has vertex/face counts and build time.
+    """
+    start = time.perf_counter()
+    stats = {}
+
+    if method == 'ADAPTIVE':
+        verts, faces, uvs, errors = adaptive_heightfield(
+            depth_map, max_error, resolution, size, strength)
+        stats['tradeoff'] = error_tradeoff(
+            errors, [max_error * 4, max_error * 2, max_error, max_error / 2])
+    else:
+        verts, faces, uvs = grid_heightfield(depth_map, resolution, size, strength)
+
+    mesh = mesh_from_arrays(name, verts, faces, uvs)
+
+    if decimate_flat and method != 'ADAPTIVE':
+        decimate_flat_regions(mesh)
+
+    stats.update({
+        'method': method,
+        'vertices': len(mesh.vertices),
+        'faces': len(mesh.polygons),
+        'seconds': time.perf_counter() - start,
+    })
+
+    return mesh, stats
@@ -0,0 +1,126 @@
+import bpy
+import bmesh
+
+PRIMITIVES = ('CUBE', 'CYLINDER')
+
+
+def primitive_mesh(kind):
+    """Shared unit mesh for a primitive type (built once with bmesh, reused by name)
+
+    CUBE is 1 x 1 x 1, CYLINDER has radius 0.5 and depth 1, both centered on
+    the origin. Objects size them with their scale.
+    """
+    name = f"AI_Proxy_{kind.title()}"
+    mesh = bpy.data.meshes.get(name)
+    if mesh is not None:
+        return mesh
+
+    bm = bmesh.new()
+    bm.loops.layers.uv.new("UVMap")
+    if kind == 'CUBE':
+        bmesh.ops.create_cube(bm, size=1.0, calc_uvs=True)
+    elif kind == 'CYLINDER':
+        bmesh.ops.create_cone(bm, cap_ends=True, segments=32, radius1=0.5, radius2=0.5,
+                              depth=1.0, calc_uvs=True)
+    else:
+        bm.free()
+        raise ValueError(f"Unknown primitive: {kind}")
+
+    mesh = bpy.data.meshes.new(name)
+    bm.to_mesh(mesh)
+    bm.free()
+
+    # One empty slot; each object links its own material to it
+    mesh.materials.append(None)
+
+    return mesh
+
+
+def quantize_color(color, levels=8):
+    """Snap an RGB color (0-1) to levels steps per channel"""
+    step = levels - 1
+    return tuple(round(min(max(c, 0.0), 1.0) * step) / step for c in color[:3])
+
+
+class MaterialCache:
+    """Principled materials shared by every object of the same quantized color"""
+
+    def __init__(self, prefix="AI_Object", levels=8, roughness=0.5):
+        self.prefix = prefix
+        self.levels = levels
+        self.roughness = roughness
+        self.materials = {}
+
+    def get(self, color):
+        key = quantize_color(color, self.levels)
+        mat = self.materials.get(key)
+        if mat is None:
+            mat = self.create(key)
+            self.materials[key] = mat
+        return mat
+
+    def create(self, color):
+        hex_color = "".join(f"{round(c * 255):02X}" for c in color)
+        mat = bpy.data.materials.new(name=f"{self.prefix}_Mat_{hex_color}")
+        mat.use_nodes = True
+
+        nodes = mat.node_tree.nodes
+        links = mat.node_tree.links
+        nodes.clear()
+
+        output = nodes.new('ShaderNodeOutputMaterial')
+        principled = nodes.new('ShaderNodeBsdfPrincipled')
+
+        links.new(principled.outputs['BSDF'], output.inputs['Surface'])
+
+        principled.inputs['Base Color'].default_value = (*color, 1.0)
+        principled.inputs['Roughness'].default_value = self.roughness
+
+        # Viewport color too, so solid mode shows the same palette
+        mat.diffuse_color = (*color, 1.0)
+
+        return mat
+
+
+class ProxyBuilder:
+    """Creates lightweight objects that share one mesh per primitive type
+
+    Avoids bpy.ops (operator overhead, undo pushes and scene updates per
+    object): objects come from bpy.data.objects.new and materials from a
+    MaterialCache.
+    """
+
+    def __init__(self, collection=None, materials=None):
+        self.collection = collection or bpy.context.collection
+        self.materials = materials or MaterialCache()
+        self.meshes = {}
+        self.objects = []
+
+    def mesh(self, kind):
+        mesh = self.meshes.get(kind)
+        if mesh is None:
+            mesh = primitive_mesh(kind)
+            self.meshes[kind] = mesh
+        return mesh
+
+    def add(self, name, kind, location, scale=(1.0, 1.0, 1.0), color=None):
+        obj = bpy.data.objects.new(name, self.mesh(kind))
+        obj.location = location
+        obj.scale = scale
+
+        if color is not None:
+            slot = obj.material_slots[0]
+            slot.link = 'OBJECT'
+            slot.material = self.materials.get(color)
+
+        self.collection.objects.link(obj)
+        self.objects.append(obj)
+
+        return obj
+
+    def stats(self):
+        return {
+            'objects': len(self.objects),
+            'meshes': len(self.meshes),
+            'materials': len(self.materials.materials),
+        }
@@ -0,0 +1,125 @@
+import cv2
+import numpy as np
+
+
+PALETTE_METHODS = ('histogram', 'sample', 'kmeans')
+
+
+def extract_palette(img, k=5, method='histogram', seed=0):
+    """Extract k dominant BGR colors, most dominant first
+
+    'histogram' - quantize every pixel into a 3D color histogram, cluster the bins
+    'sample'    - cluster a bounded, seeded sample of pixels
+    'kmeans'    - legacy cv2.kmeans on every pixel (random centers, not deterministic)
+    """
+    if method == 'histogram':
+        points, weights = color_histogram(img)
+    elif method == 'sample':
+        points = sample_pixels(img, seed=seed)
+        weights = np.ones(len(points), dtype=np.float32)
+    elif method == 'kmeans':
+        return kmeans_palette(img, k)
+    else:
+        raise ValueError(f"Unknown palette method: {method}")
+
+    centers, center_weights = weighted_kmeans(points, weights, k, seed=seed)
+
+    # Sort by cluster weight, ties broken by color so the order is stable
+    order = sorted(range(len(centers)),
+                   key=lambda i: (-center_weights[i], tuple(centers[i])))
+
+    return [[int(round(c)) for c in centers[i]] for i in order]
+
+
+def color_histogram(img, bits=5):
+    """Quantize pixels into a (2**bits)^3 color histogram in one pass
+
+    Returns the center color of every non-empty bin and its pixel count.
+    """
+    bins = 1 << bits
+    hist = cv2.calcHist([img], [0, 1, 2], None, [bins] * 3, [0, 256] * 3)
+
+    occupied = np.nonzero(hist)
+    step = 256 / bins
+    points = (np.stack(occupied, axis=1).astype(np.float32) + 0.5) * step
+
+    return points, hist[occupied]
+
+
+def sample_pixels(img, max_samples=100000, seed=0):
+    """Bounded, seeded pixel sample (every pixel when the image is small enough)"""
+    pixels = img.reshape(-1, 3)
+    if len(pixels) <= max_samples:
+        return pixels.astype(np.float32)
+
+    rng = np.random.default_rng(seed)
+    index = np.sort(rng.integers(0, len(pixels), max_samples))
+    return pixels[index].astype(np.float32)
+
+
+def kmeans_plus_plus(points, weights, k, rng):
+    """Weighted k-means++ seeding"""
+    centers = np.empty((k, points.shape[1]), dtype=np.float32)
+    centers[0] = points[rng.choice(len(points), p=weights / weights.sum())]
+
+    dist = np.sum((points - centers[0]) ** 2, axis=1)
+    for i in range(1, k):
+        prob = weights * dist
+        total = prob.sum()
+        if total <= 0:
+            # Fewer distinct colors than k: repeat the existing centers
+            centers[i:] = centers[np.arange(k - i) % i]
+            break
+        centers[i] = points[rng.choice(len(points), p=prob / total)]
+        dist = np.minimum(dist, np.sum((points - centers[i]) ** 2, axis=1))
+
+    return centers
+
+
+def weighted_kmeans(points, weights, k, seed=0, max_iter=20, eps=0.001):
+    """Deterministic weighted k-means (k-means++ seeding with a fixed seed)
+
+    Returns (centers, total weight per center).
+    """
+    points = np.asarray(points, dtype=np.float32)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    rng = np.random.default_rng(seed)
+    centers = kmeans_plus_plus(points, weights, k, rng)
+
+    for _ in range(max_iter):
+        labels = _nearest_center(points, centers)
+
+        cluster_weight = np.bincount(labels, weights=weights, minlength=k)
+        filled = cluster_weight > 0
+        new_centers = centers.copy()
+        for c in range(points.shape[1]):
+            sums = np.bincount(labels, weights=weights * points[:, c], minlength=k)
+            new_centers[filled, c] = sums[filled] / cluster_weight[filled]
+
+        shift = np.max(np.abs(new_centers - centers))
+        centers = new_centers
+        if shift < eps:
+            break
+
+    labels = _nearest_center(points, centers)
+    cluster_weight = np.bincount(labels, weights=weights, minlength=k)
+
+    return centers, cluster_weight
+
+
+def _nearest_center(points, centers):
+    # Squared distances via |p|^2 - 2 p.c + |c|^2
+    dist = (np.sum(points ** 2, axis=1)[:, None]
+            - 2 * points @ centers.T
+            + np.sum(centers ** 2, axis=1)[None, :])
+    return np.argmin(dist, axis=1)
+
+
+def kmeans_palette(img, k=5):
+    """Legacy palette: cv2.kmeans on every pixel with random centers"""
+    data = np.float32(img).reshape((-1, 3))
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 0.001)
+    _, labels, centers = cv2.kmeans(data, k, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
+
+    return [[int(c) for c in center] for center in centers]
@@ -0,0 +1,153 @@
+"""Right-triangulated irregular network (RTIN) meshing of a height grid
+
+Works on a (2**k + 1)^2 grid of heights, row 0 at y = 0. NumPy only, so
+it runs outside Blender too. ai_image_to_scene/core/rtin.py and
+ai_video_to_3d/rtin.py are the same file (tests/test_rtin.py checks it).
+"""
+import numpy as np
+
+
+def _root_triangles(grid_size):
+    last = grid_size - 1
+    a = np.array([[0, 0], [last, last]], dtype=np.int32)
+    b = np.array([[last, last], [0, 0]], dtype=np.int32)
+    c = np.array([[last, 0], [0, last]], dtype=np.int32)
+    return a, b, c
+
+
+def _children(a, b, c):
+    # a-b is the hypotenuse, c the right angle; split at the hypotenuse midpoint
+    m = (a + b) // 2
+    return (np.concatenate([c, b]), np.concatenate([a, c]), np.concatenate([m, m]))
+
+
+def rtin_levels(grid_size):
+    """Triangles of the RTIN hierarchy, level by level
+
+    Each level is (a, b, c) arrays of (x, y) grid points: a-b is the
+    hypotenuse, c the right-angle corner. Levels stop before the leaves.
+    """
+    levels = []
+    a, b, c = _root_triangles(grid_size)
+    while np.abs(a[0] - c[0]).sum() > 1:
+        levels.append((a, b, c))
+        a, b, c = _children(a, b, c)
+
+    return levels
+
+
+def _plane_errors(heights, a, b, c):
+    """Largest height difference between each triangle's plane and the grid points it covers"""
+    lo = np.minimum(np.minimum(a, b), c)
+    extent = np.maximum(np.maximum(a, b), c) - lo
+    error = np.zeros(len(a), dtype=np.float64)
+
+    # Triangles of one level are congruent: at most two bounding box shapes
+    for shape in np.unique(extent, axis=0):
+        sel = np.flatnonzero((extent == shape).all(axis=1))
+        dx, dy = np.meshgrid(np.arange(shape[0] + 1), np.arange(shape[1] + 1))
+        px = lo[sel, :1].astype(np.int64) + dx.ravel()
+        py = lo[sel, 1:].astype(np.int64) + dy.ravel()
+
+        ax, ay = a[sel, :1].astype(np.int64), a[sel, 1:].astype(np.int64)
+        bx, by = b[sel, :1].astype(np.int64), b[sel, 1:].astype(np.int64)
+        cx, cy = c[sel, :1].astype(np.int64), c[sel, 1:].astype(np.int64)
+
+        # Integer barycentric weights (times twice the area): exact inside test
+        area = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+        wa = (bx - px) * (cy - py) - (by - py) * (cx - px)
+        wb = (cx - px) * (ay - py) - (cy - py) * (ax - px)
+        wc = area - wa - wb
+        inside = (wa * area >= 0) & (wb * area >= 0) & (wc * area >= 0)
+
+        plane = (wa * heights[ay, ax].astype(np.float64) + wb * heights[by, bx]
+                 + wc * heights[cy, cx]) / area
+        deviation = np.abs(heights[py, px] - plane)
+        error[sel] = np.where(inside, deviation, 0.0).max(axis=1)
+
+    return error
+
+
+def rtin_errors(heights, levels=None):
+    """Per-vertex approximation error, propagated from children to parents
+
+    The error stored at a hypotenuse midpoint is the largest difference
+    between the triangles on that hypotenuse (and all their descendants) and
+    the grid points they cover, so keeping a triangle whenever its midpoint
+    error is within max_error bounds the error of the whole mesh.
+    """
+    size = heights.shape[0]
+    if levels is None:
+        levels = rtin_levels(size)
+
+    errors = np.zeros(size * size, dtype=np.float32)
+
+    # Smallest triangles first so parents include their children's error
+    for depth in range(len(levels) - 1, -1, -1):
+        a, b, c = levels[depth]
+        m = (a + b) // 2
+        im = m[:, 1] * size + m[:, 0]
+
+        error = _plane_errors(heights, a, b, c)
+
+        if depth < len(levels) - 1:
+            # Children hypotenuses are c-a and b-c
+            left = (a + c) // 2
+            right = (b + c) // 2
+            error = np.maximum(error, errors[left[:, 1] * size + left[:, 0]])
+            error = np.maximum(error, errors[right[:, 1] * size + right[:, 0]])
+
+        # Each midpoint is shared by at most two triangles of the same level
+        np.maximum.at(errors, im, error.astype(np.float32))
+
+    return errors.reshape(size, size)
+
+
+def rtin_triangles(errors, max_error):
+    """Crack-free triangles whose max height error stays within max_error
+
+    Returns an (F, 3) array of (x, y) grid index triples.
+    """
+    size = errors.shape[0]
+    flat = errors.ravel()
+
+    done = []
+    a, b, c = _root_triangles(size)
+    while len(a):
+        m = (a + b) // 2
+        split = ((np.abs(a - c).sum(axis=1) > 1)
+                 & (flat[m[:, 1] * size + m[:, 0]] > max_error))
+
+        keep = ~split
+        done.append(np.stack([a[keep], b[keep], c[keep]], axis=1))
+        a, b, c = _children(a[split], b[split], c[split])
+
+    return np.concatenate(done)
+
+
+def rtin_mesh(errors, max_error):
+    """Used grid points and counter-clockwise faces of the mesh for max_error
+
+    Returns (used, faces, xy): flat grid indices (row * size + col) of the
+    used points, (F, 3) int32 faces indexing used, and the points' (x, y)
+    in [0, 1].
+    """
+    grid_size = errors.shape[0]
+    triangles = rtin_triangles(errors, max_error)
+
+    # Shared grid points become shared vertices
+    index = triangles[..., 1] * grid_size + triangles[..., 0]
+    used, faces = np.unique(index, return_inverse=True)
+    faces = faces.reshape(-1, 3).astype(np.int32)
+
+    xy = np.empty((len(used), 2), dtype=np.float32)
+    xy[:, 0] = (used % grid_size).astype(np.float32) / (grid_size - 1)
+    xy[:, 1] = (used // grid_size).astype(np.float32) / (grid_size - 1)
+
+    # Wind every triangle counter-clockwise (normals up)
+    p0, p1, p2 = xy[faces[:, 0]], xy[faces[:, 1]], xy[faces[:, 2]]
+    cross = (p1[:, 0] - p0[:, 0]) * (p2[:, 1] - p0[:, 1]) - (p1[:, 1] - p0[:, 1]) * (p2[:, 0] - p0[:, 0])
+    flip = cross < 0
+    faces[flip] = faces[flip][:, [0, 2, 1]]
+
+    return used, faces, xy
@@ -1,128 +1,27 @@
 import bpy
-import cv2
 import numpy as np
-from PIL import Image
-import os
-import requests
-import json
+import random
+import time
 from pathlib import Path
-from datetime import datetime
 
-class ImageToSceneCore:
+from .analysis import ImageAnalyzer
+from .batch import collect_image_paths, iter_batch_analysis
+from .heightfield import build_heightfield
+from .instancing import ProxyBuilder
+
+class ImageToSceneCore(ImageAnalyzer):
     """Core engine for converting images to 3D scenes"""
     
     def __init__(self):
+        super().__init__()
         self.api_key = ""
         self.use_local_depth = True
         self.temp_dir = None
-    
-    def analyze_image_with_ai(self, image_path):
-        """Analyze image using AI to extract scene information"""
-        
-        # Load image
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Cannot load image: {image_path}")
-        
-        height, width = img.shape[:2]
-        
-        # Use OpenCV for initial analysis
-        analysis = {
-            'dimensions': (width, height),
-            'dominant_colors': self.extract_dominant_colors(img),
-            'detected_objects': self.detect_objects_basic(img),
-            'depth_map': self.generate_depth_map(img),
-            'lighting_direction': self.estimate_lighting(img),
-            'scene_type': self.classify_scene(img)
-        }
-        
-        return analysis
-    
-    def extract_dominant_colors(self, img, k=5):
-        """Extract dominant colors from image"""
-        data = np.float32(img).reshape((-1, 3))
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 0.001)
-        _, labels, centers = cv2.kmeans(data, k, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-        
-        colors = []
-        for center in centers:
-            colors.append([int(c) for c in center])
-        
-        return colors
-    
-    def detect_objects_basic(self, img):
-        """Basic object detection using contours"""
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, thresh = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-        
-        contours, _ = cv2.findContours(thresh, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        
-        objects = []
-        for i, contour in enumerate(contours[:10]):  # Limit to 10 objects
-            area = cv2.contourArea(contour)
-            if area > 1000:  # Filter small contours
-                x, y, w, h = cv2.boundingRect(contour)
-                objects.append({
-                    'id': i,
-                    'bbox': (x, y, w, h),
-                    'area': area,
-                    'center': (x + w//2, y + h//2)
-                })
-        
-        return objects
-    
-    def generate_depth_map(self, img):
-        """Generate depth map from image - FIXED: proper depth direction"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Method 1: Use image brightness as depth (brighter = higher/closer)
-        # This works better for landscapes and most photos
-        depth = cv2.normalize(gray.astype(np.float32), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
-        
-        # Method 2: Use gradient for detail (optional enhancement)
-        sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        gradient = np.sqrt(sobelx**2 + sobely**2)
-        gradient = cv2.normalize(gradient, None, 0, 100, cv2.NORM_MINMAX).astype(np.uint8)
-        
-        # Combine: Base brightness + edge detail
-        depth = cv2.addWeighted(depth, 0.7, gradient, 0.3, 0)
-        
-        # Apply blur for smoothness but keep more detail
-        depth = cv2.GaussianBlur(depth, (7, 7), 0)
-        
-        return depth
-    
-    def estimate_lighting(self, img):
-        """Estimate lighting direction from image"""
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Find brightest area
-        _, max_val, _, max_loc = cv2.minMaxLoc(gray)
-        
-        height, width = img.shape[:2]
-        
-        # Normalize to -1 to 1
-        light_x = (max_loc[0] / width) * 2 - 1
-        light_y = (max_loc[1] / height) * 2 - 1
-        light_z = 0.5  # Assume light is above
-        
-        return (light_x, light_y, light_z)
-    
-    def classify_scene(self, img):
-        """Classify scene type"""
-        # Simple classification based on color distribution
-        mean_color = np.mean(img, axis=(0, 1))
-        
-        if mean_color[0] > mean_color[1] and mean_color[0] > mean_color[2]:
-            return "indoor_warm"
-        elif mean_color[2] > 150:
-            return "outdoor_sky"
-        elif np.std(img) < 30:
-            return "minimal"
-        else:
-            return "mixed"
+        self.mesh_resolution = 200  # Depth mesh quads per side
+        self.decimate_flat = False
+        self.mesh_method = 'GRID'  # 'GRID' or 'ADAPTIVE'
+        self.max_error = 0.02  # Max height error of the adaptive mesh (Blender units)
+        self.last_mesh_stats = None
     
     def create_scene_from_analysis(self, analysis, image_path):
         """Create complete 3D scene from analysis"""
@@ -138,11 +37,17 @@ class ImageToSceneCore:
         scene_objects.append(ground)
         
         # 2. Create objects from detection
+        start = time.perf_counter()
+        builder = ProxyBuilder()
         for obj_data in analysis['detected_objects']:
-            obj = self.create_object_from_detection(obj_data, analysis)
+            obj = self.create_object_from_detection(obj_data, analysis, builder)
             if obj:
                 scene_objects.append(obj)
         
+        stats = builder.stats()
+        print(f"Detection proxies: {stats['objects']} objects, {stats['meshes']} meshes, "
+              f"{stats['materials']} materials in {(time.perf_counter() - start)*1000:.1f} ms")
+        
         # 3. Create depth-based displacement plane with configurable strength
         displacement_strength = 2.0  # Default upward displacement
         displacement_plane = self.create_displacement_plane(analysis, image_path, displacement_strength)
@@ -180,8 +85,8 @@ class ImageToSceneCore:
         
         return ground
     
-    def create_object_from_detection(self, obj_data, analysis):
-        """Create 3D object from detection data"""
+    def detection_proxy(self, obj_data, analysis):
+        """Primitive type, location and scale standing in for a detection"""
         x, y, w, h = obj_data['bbox']
         center_x = (x / analysis['dimensions'][0] - 0.5) * 10
         center_y = (0.5 - y / analysis['dimensions'][1]) * 10 + 2
@@ -190,95 +95,80 @@ class ImageToSceneCore:
         depth_estimate = 1.0 - (obj_data['area'] / (analysis['dimensions'][0] * analysis['dimensions'][1]))
         z_pos = depth_estimate * 2
         
-        # Create object based on aspect ratio
+        # Pick the shape based on aspect ratio
         aspect = w / h if h > 0 else 1
         
         if aspect > 1.5:
             # Wide object - likely a table, sofa, etc.
-            bpy.ops.mesh.primitive_cube_add(size=1, location=(center_x, center_y, z_pos))
-            obj = bpy.context.active_object
-            obj.scale = (2, 1, 0.5)
+            return 'CUBE', (center_x, center_y, z_pos), (2, 1, 0.5)
         elif aspect < 0.7:
             # Tall object - likely a person, lamp, etc.
-            bpy.ops.mesh.primitive_cylinder_add(radius=0.5, depth=2, location=(center_x, center_y, z_pos + 1))
-            obj = bpy.context.active_object
+            return 'CYLINDER', (center_x, center_y, z_pos + 1), (1, 1, 2)
         else:
             # Square-ish object
-            bpy.ops.mesh.primitive_cube_add(size=1.5, location=(center_x, center_y, z_pos + 0.75))
-            obj = bpy.context.active_object
-        
-        obj.name = f"AI_Object_{obj_data['id']}"
+            return 'CUBE', (center_x, center_y, z_pos + 0.75), (1.5, 1.5, 1.5)
+    
+    def create_object_from_detection(self, obj_data, analysis, builder=None):
+        """Create 3D object from detection data (shares its mesh and material)"""
+        if builder is None:
+            builder = ProxyBuilder()
         
-        # Add material
-        mat = self.create_object_material(analysis, obj_data)
-        obj.data.materials.append(mat)
+        kind, location, scale = self.detection_proxy(obj_data, analysis)
         
-        return obj
+        return builder.add(f"AI_Object_{obj_data['id']}", kind, location, scale,
+                           color=self.object_color(obj_data))
     
-    def create_displacement_plane(self, analysis, image_path, strength=2.0):
-        """Create plane with displacement based on depth map - FIXED UV and direction"""
-        # Create high-res plane at origin
-        bpy.ops.mesh.primitive_plane_add(size=10, location=(0, 0, 0))
-        plane = bpy.context.active_object
-        plane.name = "AI_Depth_Scene"
-        
-        # Enter edit mode for UV and subdivision
+    def create_displacement_plane(self, analysis, image_path, strength=2.0,
+                                  resolution=None, decimate_flat=None):
+        """Create plane displaced by the depth map - built directly from NumPy arrays"""
+        if resolution is None:
+            resolution = self.mesh_resolution
+        if decimate_flat is None:
+            decimate_flat = self.decimate_flat
+        
+        # Mesh with heights sampled from the depth map (Positive = UP)
+        mesh, stats = build_heightfield(
+            "AI_Depth_Scene", analysis['depth_map'],
+            resolution=resolution, size=10, strength=abs(strength),
+            decimate_flat=decimate_flat,
+            method=self.mesh_method, max_error=self.max_error
+        )
+        self.last_mesh_stats = stats
+        print(f"Depth mesh ({stats['method']}): {stats['vertices']} vertices, "
+              f"{stats['faces']} faces in {stats['seconds']*1000:.0f} ms")
+        
+        plane = bpy.data.objects.new("AI_Depth_Scene", mesh)
+        bpy.context.collection.objects.link(plane)
         bpy.context.view_layer.objects.active = plane
-        bpy.ops.object.mode_set(mode='EDIT')
-        
-        # Select all
-        bpy.ops.mesh.select_all(action='SELECT')
-        
-        # Create UV map that covers full image (Project from View)
-        bpy.ops.uv.smart_project(angle_limit=66.0, island_margin=0.0, area_weight=1.0)
-        
-        # Subdivide for detail
-        bpy.ops.mesh.subdivide(number_cuts=50, smoothness=0)
-        
-        # Exit edit mode
-        bpy.ops.object.mode_set(mode='OBJECT')
-        
-        # Add Subdivision Surface for smoothness
-        subsurf = plane.modifiers.new(name="Subsurf", type='SUBSURF')
-        subsurf.levels = 2
-        subsurf.render_levels = 3
-        subsurf.subdivision_type = 'SIMPLE'
-        
-        # Apply subdivision
-        bpy.ops.object.modifier_apply(modifier="Subsurf")
-        
-        # Add displacement modifier
-        disp = plane.modifiers.new(name="Displacement", type='DISPLACE')
-        
-        # Create texture from depth map
-        depth_map = analysis['depth_map']
-        
-        # Save depth map temporarily with proper format
-        temp_path = os.path.join(bpy.app.tempdir, "depth_map.png")
-        cv2.imwrite(temp_path, depth_map)
-        
-        # Load as texture
-        tex = bpy.data.textures.new(name="DepthTexture", type='IMAGE')
-        img = bpy.data.images.load(temp_path)
-        tex.image = img
-        
-        # Configure displacement
-        disp.texture = tex
-        disp.texture_coords = 'UV'
-        disp.uv_layer = "UVMap"
-        disp.direction = 'Z'  # Displace along Z (up/down)
-        disp.strength = abs(strength)  # Positive = UP
-        disp.mid_level = 0.0  # Black = 0 displacement
         
         # Add material with original image
         mat = self.create_scene_material(image_path)
         plane.data.materials.append(mat)
         
-        # Apply displacement
-        bpy.ops.object.modifier_apply(modifier="Displacement")
-        
         return plane
     
+    def create_depth_image(self, depth_map, name):
+        """Write a depth map straight into a float image datablock (reused by name)"""
+        height, width = depth_map.shape[:2]
+        
+        img = bpy.data.images.get(name)
+        if img is None:
+            img = bpy.data.images.new(name, width=width, height=height,
+                                      float_buffer=True, is_data=True)
+        elif tuple(img.size) != (width, height):
+            img.scale(width, height)
+        
+        # Blender pixels are RGBA floats with the bottom row first
+        depth = np.flipud(depth_map).astype(np.float32) / 255.0
+        pixels = np.empty((height, width, 4), dtype=np.float32)
+        pixels[..., :3] = depth[..., None]
+        pixels[..., 3] = 1.0
+        
+        img.pixels.foreach_set(pixels.ravel())
+        img.update()
+        
+        return img
+    
     def create_ground_material(self, analysis):
         """Create ground material"""
         mat = bpy.data.materials.new(name="AI_Ground_Material")
@@ -304,29 +194,10 @@ class ImageToSceneCore:
         
         return mat
     
-    def create_object_material(self, analysis, obj_data):
-        """Create material for detected object"""
-        mat = bpy.data.materials.new(name=f"AI_Object_{obj_data['id']}_Mat")
-        mat.use_nodes = True
-        
-        nodes = mat.node_tree.nodes
-        links = mat.node_tree.links
-        nodes.clear()
-        
-        output = nodes.new('ShaderNodeOutputMaterial')
-        principled = nodes.new('ShaderNodeBsdfPrincipled')
-        
-        links.new(principled.outputs['BSDF'], output.inputs['Surface'])
-        
-        # Random variation based on object ID
-        import random
-        random.seed(obj_data['id'])
-        
-        r, g, b = random.random(), random.random(), random.random()
-        principled.inputs['Base Color'].default_value = (r, g, b, 1.0)
-        principled.inputs['Roughness'].default_value = 0.5
-        
-        return mat
+    def object_color(self, obj_data):
+        """Color for a detected object (random, stable per object ID)"""
+        rng = random.Random(obj_data['id'])
+        return (rng.random(), rng.random(), rng.random())
     
     def create_scene_material(self, image_path):
         """Create material with original image texture"""
@@ -388,7 +259,11 @@ class ImageToSceneCore:
     
     def setup_world_environment(self, analysis):
         """Setup world environment"""
-        world = bpy.context.scene.world
+        scene = bpy.context.scene
+        if scene.world is None:
+            # Empty scenes (e.g. factory settings in background mode) have no world
+            scene.world = bpy.data.worlds.new("World")
+        world = scene.world
         world.use_nodes = True
         
         nodes = world.node_tree.nodes
@@ -429,12 +304,72 @@ class ImageToSceneCore:
         # Step 1: Analyze image
         print(f"Analyzing image: {image_path}")
         analysis = self.analyze_image_with_ai(image_path)
+        self.print_report(analysis)
         
         # Step 2: Create scene
         print("Creating 3D scene...")
         scene_data = self.create_scene_from_analysis(analysis, image_path)
         
         return scene_data
+    
+    def create_scene_collection(self, name):
+        """Create a collection under the scene and make it the active one"""
+        collection = bpy.data.collections.new(name)
+        bpy.context.scene.collection.children.link(collection)
+        
+        view_layer = bpy.context.view_layer
+        view_layer.active_layer_collection = view_layer.layer_collection.children[collection.name]
+        
+        return collection
+    
+    def process_image_batch(self, source, max_workers=None):
+        """Batch pipeline: directory or glob -> one scene collection per image
+        
+        Analysis runs in a process pool; scenes are built here on the main
+        thread as analyses arrive. Returns a per-image report.
+        """
+        image_paths = collect_image_paths(source)
+        if not image_paths:
+            raise ValueError(f"No images found: {source}")
+        
+        print(f"Batch: {len(image_paths)} images")
+        view_layer = bpy.context.view_layer
+        previous_collection = view_layer.active_layer_collection
+        report = []
+        
+        try:
+            for result in iter_batch_analysis(image_paths, self, max_workers):
+                path = result.pop('path')
+                analysis = result.pop('analysis')
+                entry = {
+                    'path': path,
+                    'analysis_seconds': result['seconds'],
+                    'build_seconds': 0.0,
+                    'object_count': 0,
+                    'error': result['error'],
+                }
+                
+                if analysis is not None:
+                    start = time.perf_counter()
+                    try:
+                        self.create_scene_collection(f"AI_Scene_{Path(path).stem}")
+                        scene_data = self.create_scene_from_analysis(analysis, path)
+                        entry['object_count'] = scene_data['object_count']
+                    except Exception as e:
+                        entry['error'] = str(e)
+                    entry['build_seconds'] = time.perf_counter() - start
+                
+                if entry['error']:
+                    print(f"  FAILED {path}: {entry['error']}")
+                else:
+                    print(f"  {Path(path).name}: analysis {entry['analysis_seconds']:.2f}s, "
+                          f"build {entry['build_seconds']:.2f}s")
+                
+                report.append(entry)
+        finally:
+            view_layer.active_layer_collection = previous_collection
+        
+        return report
 
 def register():
     pass
@@ -1,7 +1,27 @@
 import bpy
-from bpy.types import Panel, Operator, PropertyGroup
+from bpy.types import Panel, Operator
 from bpy.props import StringProperty, EnumProperty, FloatProperty, BoolProperty, IntProperty
 
+def create_core(scene):
+    """Create an ImageToSceneCore configured from the panel settings"""
+    from ..core.scene_generator import ImageToSceneCore
+    from ..core.depth import create_depth_backend
+    core = ImageToSceneCore()
+    core.analysis_mode = scene.image_scene_analysis_mode
+    core.set_depth_quality(scene.image_scene_depth_quality)
+    core.depth_backend = create_depth_backend(scene.image_scene_depth_backend,
+                                              threads=scene.image_scene_depth_threads)
+    core.mesh_resolution = 25 * 2 ** scene.image_scene_subdivision
+    core.decimate_flat = scene.image_scene_decimate_flat
+    core.mesh_method = scene.image_scene_mesh_method
+    core.max_error = scene.image_scene_max_error
+    
+    if scene.image_scene_use_cache:
+        from ..core.analysis_cache import AnalysisCache
+        core.cache = AnalysisCache(max_bytes=scene.image_scene_cache_size * 1024 * 1024)
+    
+    return core
+
 class AIImageToScenePanel(Panel):
     """AI Image to 3D Scene Panel"""
     bl_label = "AI Image to 3D Scene"
@@ -41,6 +61,10 @@ class AIImageToScenePanel(Panel):
             # Show detected scene type
             row = box.row()
             row.label(text=f"Scene: {scene.image_scene_type}", icon='WORLD')
+            
+            if scene.image_scene_analysis_time:
+                row = box.row()
+                row.label(text=scene.image_scene_analysis_time, icon='TIME')
         
         layout.separator()
         
@@ -48,6 +72,11 @@ class AIImageToScenePanel(Panel):
         box = layout.box()
         box.label(text="Step 2: Generate Depth", icon='IMAGE_ZDEPTH')
         
+        row = box.row()
+        row.prop(scene, "image_scene_depth_backend", text="Estimator")
+        if scene.image_scene_depth_backend == 'ONNX':
+            row.prop(scene, "image_scene_depth_threads", text="Threads")
+        
         row = box.row()
         row.prop(scene, "image_scene_depth_quality", text="Quality")
         
@@ -91,13 +120,61 @@ class AIImageToScenePanel(Panel):
         
         layout.separator()
         
+        # Batch
+        box = layout.box()
+        box.label(text="Batch: Folder to Scenes", icon='FILE_FOLDER')
+        
+        row = box.row()
+        row.prop(scene, "image_scene_batch_source", text="")
+        
+        row = box.row()
+        row.prop(scene, "image_scene_batch_workers", text="Workers")
+        
+        row = box.row()
+        row.operator("image_scene.batch_create", text="Create All Scenes", icon='RENDERLAYERS')
+        
+        if scene.image_scene_batch_status:
+            col = box.column(align=True)
+            col.scale_y = 0.8
+            for line in scene.image_scene_batch_status.split("\n"):
+                col.label(text=line)
+        
+        layout.separator()
+        
         # Advanced Options
         box = layout.box()
         box.label(text="Advanced Options", icon='PREFERENCES')
         
+        row = box.row()
+        row.prop(scene, "image_scene_analysis_mode", text="Analysis")
+        
+        row = box.row()
+        row.prop(scene, "image_scene_use_cache", text="Cache Analysis")
+        sub = row.row()
+        sub.enabled = scene.image_scene_use_cache
+        sub.prop(scene, "image_scene_cache_size", text="MB")
+        sub.operator("image_scene.clear_cache", text="", icon='TRASH')
+        
         row = box.row()
         row.prop(scene, "image_scene_subdivision", text="Mesh Detail")
         
+        row = box.row()
+        row.prop(scene, "image_scene_mesh_method", text="Mesh")
+        
+        if scene.image_scene_mesh_method == 'ADAPTIVE':
+            row = box.row()
+            row.prop(scene, "image_scene_max_error", text="Max Height Error")
+            
+            # Triangle count vs. error of the last adaptive build
+            if scene.image_scene_mesh_stats:
+                col = box.column(align=True)
+                col.scale_y = 0.8
+                for line in scene.image_scene_mesh_stats.split("\n"):
+                    col.label(text=line)
+        else:
+            row = box.row()
+            row.prop(scene, "image_scene_decimate_flat", text="Simplify Flat Areas")
+        
         row = box.row()
         row.prop(scene, "image_scene_use_colors", text="Use Image Colors")
         
@@ -119,15 +196,19 @@ class ImportImageOperator(Operator):
             return {'CANCELLED'}
         
         try:
-            from ..core.scene_generator import ImageToSceneCore
-            core = ImageToSceneCore()
+            core = create_core(scene)
             
             # Analyze image
             analysis = core.analyze_image_with_ai(image_path)
+            core.print_report(analysis)
             
             # Store in scene
             scene.image_scene_info = f"{analysis['dimensions'][0]}x{analysis['dimensions'][1]}"
             scene.image_scene_type = analysis['scene_type']
+            if analysis.get('cached'):
+                scene.image_scene_analysis_time = "Loaded from cache"
+            else:
+                scene.image_scene_analysis_time = f"Analyzed in {analysis['analysis_report']['total_seconds']:.2f}s"
             scene.image_scene_analyzed = True
             
             # Store analysis temporarily
@@ -154,7 +235,22 @@ class GenerateDepthOperator(Operator):
             self.report({'ERROR'}, "Please import image first!")
             return {'CANCELLED'}
         
-        scene.image_scene_depth_status = "Depth map ready"
+        try:
+            from pathlib import Path
+            core = create_core(scene)
+            analysis = core.analyze_image_with_ai(scene.image_scene_path)
+            
+            # Preview image in the Image Editor (the mesh is displaced directly)
+            depth_map = analysis['depth_map']
+            core.create_depth_image(depth_map, f"AI_Depth_{Path(scene.image_scene_path).stem}")
+        except Exception as e:
+            self.report({'ERROR'}, f"Depth generation failed: {e}")
+            return {'CANCELLED'}
+        
+        scene.image_scene_depth_status = f"Depth map ready ({depth_map.shape[1]}x{depth_map.shape[0]})"
+        depth_stats = analysis.get('analysis_report', {}).get('depth_backend')
+        if depth_stats and not analysis.get('cached'):
+            scene.image_scene_depth_status += f", {depth_stats['fps']:.1f} frames/s"
         self.report({'INFO'}, "Depth map generated")
         
         return {'FINISHED'}
@@ -174,14 +270,20 @@ class CreateSceneOperator(Operator):
             return {'CANCELLED'}
         
         try:
-            from ..core.scene_generator import ImageToSceneCore
-            core = ImageToSceneCore()
+            core = create_core(scene)
             
             self.report({'INFO'}, "Creating 3D scene... Please wait")
             
             # Generate full scene
             result = core.process_image_to_scene(image_path)
             
+            stats = core.last_mesh_stats
+            if stats and stats.get('tradeoff'):
+                lines = [f"{stats['faces']:,} faces, {stats['vertices']:,} vertices"]
+                for max_error, triangles in stats['tradeoff']:
+                    lines.append(f"  error {max_error:.3f} → {triangles:,} tris")
+                scene.image_scene_mesh_stats = "\n".join(lines)
+            
             self.report({'INFO'}, f"Scene created with {result['object_count']} objects!")
             
         except Exception as e:
@@ -190,6 +292,53 @@ class CreateSceneOperator(Operator):
         
         return {'FINISHED'}
 
+class BatchCreateOperator(Operator):
+    """Create one scene collection per image in a folder or glob pattern"""
+    bl_idname = "image_scene.batch_create"
+    bl_label = "Batch Create Scenes"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        scene = context.scene
+        source = bpy.path.abspath(scene.image_scene_batch_source)
+        
+        if not scene.image_scene_batch_source:
+            self.report({'ERROR'}, "Please select a folder or pattern!")
+            return {'CANCELLED'}
+        
+        try:
+            core = create_core(scene)
+            report = core.process_image_batch(source, scene.image_scene_batch_workers)
+        except Exception as e:
+            self.report({'ERROR'}, f"Batch failed: {e}")
+            return {'CANCELLED'}
+        
+        failed = [entry for entry in report if entry['error']]
+        analysis_seconds = sum(entry['analysis_seconds'] for entry in report)
+        build_seconds = sum(entry['build_seconds'] for entry in report)
+        
+        lines = [f"{len(report) - len(failed)} scenes, {len(failed)} failed",
+                 f"Analysis {analysis_seconds:.1f}s (all workers), build {build_seconds:.1f}s"]
+        for entry in failed[:5]:
+            lines.append(f"  {bpy.path.basename(entry['path'])}: {entry['error']}")
+        scene.image_scene_batch_status = "\n".join(lines)
+        
+        self.report({'WARNING'} if failed else {'INFO'}, lines[0])
+        return {'FINISHED'}
+
+class ClearCacheOperator(Operator):
+    """Delete all cached image analyses"""
+    bl_idname = "image_scene.clear_cache"
+    bl_label = "Clear Analysis Cache"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        from ..core.analysis_cache import AnalysisCache
+        AnalysisCache().clear()
+        
+        self.report({'INFO'}, "Analysis cache cleared")
+        return {'FINISHED'}
+
 class ResetSceneOperator(Operator):
     """Reset Scene"""
     bl_idname = "image_scene.reset"
@@ -202,6 +351,7 @@ class ResetSceneOperator(Operator):
         scene.image_scene_analyzed = False
         scene.image_scene_info = ""
         scene.image_scene_type = ""
+        scene.image_scene_analysis_time = ""
         scene.image_scene_depth_status = ""
         
         self.report({'INFO'}, "Scene reset")
@@ -212,6 +362,8 @@ def register():
     bpy.utils.register_class(ImportImageOperator)
     bpy.utils.register_class(GenerateDepthOperator)
     bpy.utils.register_class(CreateSceneOperator)
+    bpy.utils.register_class(BatchCreateOperator)
+    bpy.utils.register_class(ClearCacheOperator)
     bpy.utils.register_class(ResetSceneOperator)
     
     # Properties
@@ -237,16 +389,48 @@ def register():
         default=""
     )
     
+    bpy.types.Scene.image_scene_analysis_time = StringProperty(
+        name="Analysis Time",
+        default=""
+    )
+    
+    bpy.types.Scene.image_scene_analysis_mode = EnumProperty(
+        name="Analysis Mode",
+        description="Resolution used by the image analyzers",
+        items=[
+            ('pyramid', 'Fast (Pyramid)', 'Run each analyzer on a downscaled copy sized for it'),
+            ('full', 'Full Resolution', 'Run every analyzer on the original image'),
+        ],
+        default='pyramid'
+    )
+    
     bpy.types.Scene.image_scene_depth_quality = EnumProperty(
         name="Depth Quality",
         items=[
-            ('low', 'Low (Fast)', 'Fast but less accurate'),
-            ('medium', 'Medium', 'Balanced quality'),
-            ('high', 'High (Slow)', 'Best quality, slower'),
+            ('low', 'Low (Fast)', 'Depth map at 512 px'),
+            ('medium', 'Medium', 'Depth map at 1024 px'),
+            ('high', 'High (Slow)', 'Depth map at 2048 px'),
         ],
         default='medium'
     )
     
+    bpy.types.Scene.image_scene_depth_backend = EnumProperty(
+        name="Depth Estimator",
+        items=[
+            ('HEURISTIC', 'Heuristic (Fast)', 'Brightness and edges, no model needed'),
+            ('ONNX', 'ONNX Model (CPU)', 'MiDaS-style depth model from local_models.path in config/settings.json (needs onnxruntime)'),
+        ],
+        default='HEURISTIC'
+    )
+    
+    bpy.types.Scene.image_scene_depth_threads = IntProperty(
+        name="Threads",
+        description="ONNX Runtime CPU threads (0 = all cores)",
+        default=0,
+        min=0,
+        max=64
+    )
+    
     bpy.types.Scene.image_scene_depth_strength = FloatProperty(
         name="Height Amount",
         description="How much the mesh rises up (positive) or down (negative)",
@@ -277,16 +461,79 @@ def register():
     
     bpy.types.Scene.image_scene_subdivision = IntProperty(
         name="Mesh Detail",
+        description="Depth mesh resolution: 50, 100, 200, 400, 800 or 1600 quads per side",
         default=3,
         min=1,
         max=6
     )
     
+    bpy.types.Scene.image_scene_decimate_flat = BoolProperty(
+        name="Simplify Flat Areas",
+        description="Merge faces in flat regions of the depth mesh",
+        default=False
+    )
+    
+    bpy.types.Scene.image_scene_mesh_method = EnumProperty(
+        name="Mesh Method",
+        items=[
+            ('GRID', 'Uniform Grid', 'Same detail everywhere'),
+            ('ADAPTIVE', 'Adaptive', 'Fewer triangles in flat areas, within a max height error'),
+        ],
+        default='GRID'
+    )
+    
+    bpy.types.Scene.image_scene_max_error = FloatProperty(
+        name="Max Height Error",
+        description="Largest height difference between the adaptive mesh and the depth map at any grid point",
+        default=0.02,
+        min=0.0005,
+        max=1.0,
+        precision=4
+    )
+    
+    bpy.types.Scene.image_scene_mesh_stats = StringProperty(
+        name="Mesh Stats",
+        default=""
+    )
+    
     bpy.types.Scene.image_scene_use_colors = BoolProperty(
         name="Use Colors",
         default=True
     )
     
+    bpy.types.Scene.image_scene_use_cache = BoolProperty(
+        name="Cache Analysis",
+        description="Reuse analysis results when the image and settings are unchanged",
+        default=True
+    )
+    
+    bpy.types.Scene.image_scene_cache_size = IntProperty(
+        name="Cache Size",
+        description="Maximum analysis cache size in MB (least recently used entries are removed)",
+        default=512,
+        min=16,
+        max=16384
+    )
+    
+    bpy.types.Scene.image_scene_batch_source = StringProperty(
+        name="Batch Source",
+        description="Folder of images, or a glob pattern such as //photos/*.jpg",
+        subtype='DIR_PATH'
+    )
+    
+    bpy.types.Scene.image_scene_batch_workers = IntProperty(
+        name="Workers",
+        description="Analysis processes (0 = one per CPU core)",
+        default=0,
+        min=0,
+        max=64
+    )
+    
+    bpy.types.Scene.image_scene_batch_status = StringProperty(
+        name="Batch Status",
+        default=""
+    )
+    
     # Window manager property for temp storage
     bpy.types.WindowManager.image_scene_analysis = StringProperty()
 
@@ -295,18 +542,33 @@ def unregister():
     bpy.utils.unregister_class(ImportImageOperator)
     bpy.utils.unregister_class(GenerateDepthOperator)
     bpy.utils.unregister_class(CreateSceneOperator)
+    bpy.utils.unregister_class(BatchCreateOperator)
+    bpy.utils.unregister_class(ClearCacheOperator)
     bpy.utils.unregister_class(ResetSceneOperator)
     
     del bpy.types.Scene.image_scene_path
     del bpy.types.Scene.image_scene_analyzed
     del bpy.types.Scene.image_scene_info
     del bpy.types.Scene.image_scene_type
+    del bpy.types.Scene.image_scene_analysis_time
+    del bpy.types.Scene.image_scene_analysis_mode
     del bpy.types.Scene.image_scene_depth_quality
+    del bpy.types.Scene.image_scene_depth_backend
+    del bpy.types.Scene.image_scene_depth_threads
     del bpy.types.Scene.image_scene_depth_strength
     del bpy.types.Scene.image_scene_depth_status
     del bpy.types.Scene.image_scene_create_ground
     del bpy.types.Scene.image_scene_create_objects
     del bpy.types.Scene.image_scene_add_lighting
     del bpy.types.Scene.image_scene_subdivision
+    del bpy.types.Scene.image_scene_decimate_flat
+    del bpy.types.Scene.image_scene_mesh_method
+    del bpy.types.Scene.image_scene_max_error
+    del bpy.types.Scene.image_scene_mesh_stats
     del bpy.types.Scene.image_scene_use_colors
+    del bpy.types.Scene.image_scene_use_cache
+    del bpy.types.Scene.image_scene_cache_size
+    del bpy.types.Scene.image_scene_batch_source
+    del bpy.types.Scene.image_scene_batch_workers
+    del bpy.types.Scene.image_scene_batch_status
     del bpy.types.WindowManager.image_scene_analysis
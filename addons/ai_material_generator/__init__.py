@@ -10,13 +10,19 @@ bl_info = {
     "tracker_url": "https://github.com/abdelsidi/blender-ai-integration/issues",
 }
 
-import bpy
 import os
 import sys
 
-from . import ui
-from . import utils
-from . import models
+try:
+    import bpy
+except ImportError:
+    # The API clients and caches also run (and are tested) in plain Python
+    bpy = None
+
+if bpy is not None:
+    from . import ui
+    from . import utils
+    from . import models
 
 def register():
     """تسجيل الإضافة"""
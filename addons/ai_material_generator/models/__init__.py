@@ -1,5 +1,12 @@
-from . import stable_diffusion
-from . import dalle
+try:
+    import bpy
+except ImportError:
+    # The API clients and caches also run (and are tested) in plain Python
+    bpy = None
+
+if bpy is not None:
+    from . import stable_diffusion
+    from . import dalle
 
 def register():
     stable_diffusion.register()
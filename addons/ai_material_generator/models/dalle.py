@@ -7,13 +7,20 @@ import base64
 import tempfile
 from typing import Optional, Dict
 
+from ..utils.generation_cache import default_cache
+from ..utils.rate_limit import request_scheduler
+
 class DALLEAPI:
     """واجهة برمجة التطبيقات لـ DALL-E"""
     
-    def __init__(self, api_key: str = ""):
+    def __init__(self, api_key: str = "", use_cache: bool = True):
         self.api_key = api_key
         self.api_url = "https://api.openai.com/v1/images/generations"
         self.model = "dall-e-3"
+        # الصور المولدة تُخزن، فنفس الطلب لا يُرسل مرتين
+        self.cache = default_cache() if use_cache else None
+        # حد max_requests_per_minute وإعادة المحاولة، مشتركان بين كل النسخ
+        self.scheduler = request_scheduler("openai")
     
     def set_api_key(self, api_key: str):
         """تعيين مفتاح API"""
@@ -32,6 +39,13 @@ class DALLEAPI:
         Returns:
             مسار الصورة المولدة أو None
         """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key("dalle", prompt, model=self.model, size=size, quality=quality)
+            cached = self.cache.get(cache_key)
+            if cached:
+                return cached
+        
         if not self.api_key:
             print("Error: DALL-E API key not set")
             return None
@@ -54,7 +68,7 @@ class DALLEAPI:
                 "response_format": "b64_json"
             }
             
-            response = requests.post(
+            response = self.scheduler.post(
                 self.api_url,
                 headers=headers,
                 json=payload,
@@ -71,6 +85,8 @@ class DALLEAPI:
                 with open(temp_path, "wb") as f:
                     f.write(image_data)
                 
+                if cache_key:
+                    return self.cache.put(cache_key, temp_path)
                 return temp_path
             
             return None
@@ -110,7 +126,7 @@ class DALLEAPI:
                 "size": "1024x1024",
             }
             
-            response = requests.post(
+            response = self.scheduler.post(
                 "https://api.openai.com/v1/images/edits",
                 headers=headers,
                 json=payload,
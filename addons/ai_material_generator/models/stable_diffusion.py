@@ -1,23 +1,164 @@
 """
 Stable Diffusion Integration for Material Generation
 """
-import bpy
+try:
+    import bpy
+except ImportError:
+    # StableDiffusionAPI also runs (and is tested) in plain Python
+    bpy = None
 import requests
+from requests.adapters import HTTPAdapter
 import tempfile
 import os
-from typing import Dict, Optional
+import base64
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ..utils.generation_cache import default_cache, normalize_prompt
+from ..utils.image_processor import ImageProcessor
+from ..utils.rate_limit import request_scheduler
 
 class StableDiffusionAPI:
-    """واجهة برمجة التطبيقات لـ Stable Diffusion"""
+    """واجهة برمجة التطبيقات لـ Stable Diffusion
+    
+    كل الطلبات تمر عبر جلسة requests.Session مشتركة (إعادة استخدام
+    الاتصالات) ومجمع خيوط مشترك، فلا يُرسل أكثر من max_concurrency طلب
+    في نفس الوقت مهما كان عدد المستدعين.
+    
+    الطلبات المتطابقة (نفس الـ prompt والحجم والخطوات و CFG و sampler) تُجمع
+    في طلب txt2img واحد بحد max_batch_size صورة، ثم تُعاد كل صورة لصاحبها.
+    ببذرة ثابتة تأخذ الصورة i في الدفعة البذرة seed + i، كما في Automatic1111.
     
-    def __init__(self, api_url: str = "http://localhost:7860", api_key: str = ""):
+    الصور المولدة تُخزن في ذاكرة دائمة (use_cache)، فنفس الطلب لا يُرسل مرتين.
+    """
+    
+    SAMPLER = "DPM++ 2M Karras"
+    METAL_WORDS = ('metal', 'steel', 'iron', 'gold', 'silver', 'copper', 'bronze', 'chrome')
+    
+    def __init__(self, api_url: str = "http://localhost:7860", api_key: str = "",
+                 max_concurrency: int = 4, timeout: float = 120, max_batch_size: int = 4,
+                 use_cache: bool = True):
         self.api_url = api_url
         self.api_key = api_key
         self.model = "sdxl"
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.max_batch_size = max(1, max_batch_size)
+        self.cache = default_cache() if use_cache else None
+        # إعادة المحاولة (وحد المعدل إن ضُبط في config/settings.json)
+        self.scheduler = request_scheduler("stability")
+        # LOCAL: خرائط Normal/Roughness/Metallic تُشتق من اللون الأساسي
+        # DIFFUSION: كل خريطة توليد منفصل على الخادم
+        self.pbr_maps = 'LOCAL'
+        self.normal_strength = 1.0
+        
+        self._session = None
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    @property
+    def session(self) -> requests.Session:
+        """جلسة HTTP مشتركة بحجم مجمع اتصالات يساوي max_concurrency"""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=self.max_concurrency)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                if self.api_key:
+                    session.headers["Authorization"] = f"Bearer {self.api_key}"
+                self._session = session
+            return self._session
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """مجمع الخيوط الذي يحدد عدد الطلبات المتزامنة"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                    thread_name_prefix="sd_api")
+            return self._executor
+    
+    def close(self):
+        """إغلاق الاتصالات والخيوط"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def build_payload(self, prompt: str, negative_prompt: str = "",
+                      width: int = 512, height: int = 512,
+                      steps: int = 30, cfg_scale: float = 7.0, seed: int = -1) -> Dict:
+        """بناء طلب txt2img لنسيج"""
+        return {
+            "prompt": f"texture, seamless, {prompt}",
+            "negative_prompt": f"blur, low quality, {negative_prompt}",
+            "width": width,
+            "height": height,
+            "steps": steps,
+            "cfg_scale": cfg_scale,
+            "sampler_name": self.SAMPLER,
+            "seed": seed,
+            "batch_size": 1,
+            "n_iter": 1,
+        }
+    
+    def cache_key(self, payload: Dict, variation: int = 0) -> str:
+        """مفتاح الذاكرة لطلب (variation يميز تنويعات نفس الطلب)"""
+        return self.cache.make_key(
+            "stable_diffusion", payload["prompt"],
+            negative_prompt=normalize_prompt(payload["negative_prompt"]),
+            model=self.model,
+            width=payload["width"],
+            height=payload["height"],
+            steps=payload["steps"],
+            cfg_scale=payload["cfg_scale"],
+            sampler=payload["sampler_name"],
+            seed=payload["seed"],
+            variation=variation,
+        )
+    
+    def txt2img(self, payload: Dict) -> List[str]:
+        """
+        إرسال طلب txt2img عبر الجلسة المشتركة
+        
+        Args:
+            payload: بيانات الطلب
+            
+        Returns:
+            قائمة الصور المولدة بترميز base64
+        """
+        response = self.scheduler.post(
+            f"{self.api_url}/sdapi/v1/txt2img",
+            session=self.session,
+            json=payload,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json().get("images") or []
+    
+    def save_image(self, image_b64: str) -> str:
+        """حفظ صورة base64 في ملف PNG مؤقت"""
+        fd, temp_path = tempfile.mkstemp(suffix=".png")
+        with os.fdopen(fd, "wb") as f:
+            f.write(base64.b64decode(image_b64))
+        return temp_path
     
     def generate_texture(self, prompt: str, negative_prompt: str = "", 
                         width: int = 512, height: int = 512,
-                        steps: int = 30, cfg_scale: float = 7.0) -> Optional[str]:
+                        steps: int = 30, cfg_scale: float = 7.0, seed: int = -1) -> Optional[str]:
         """
         توليد نسيج باستخدام Stable Diffusion
         
@@ -28,43 +169,25 @@ class StableDiffusionAPI:
             height: ارتفاع الصورة
             steps: عدد خطوات التوليد
             cfg_scale: مقياس CFG
+            seed: البذرة (-1 عشوائية)
             
         Returns:
             مسار الصورة المولدة أو None في حالةFailure
         """
         try:
-            # بناء الطلب
-            payload = {
-                "prompt": f"texture, seamless, {prompt}",
-                "negative_prompt": f"blur, low quality, {negative_prompt}",
-                "width": width,
-                "height": height,
-                "steps": steps,
-                "cfg_scale": cfg_scale,
-                "sampler_name": "DPM++ 2M Karras",
-                "batch_size": 1,
-                "n_iter": 1,
-            }
+            payload = self.build_payload(prompt, negative_prompt, width, height,
+                                         steps, cfg_scale, seed)
             
-            # إرسال الطلب إلى API
-            response = requests.post(
-                f"{self.api_url}/sdapi/v1/txt2img",
-                json=payload,
-                timeout=120
-            )
-            response.raise_for_status()
+            key = self.cache_key(payload) if self.cache is not None else None
+            if key:
+                cached = self.cache.get(key)
+                if cached:
+                    return cached
             
-            data = response.json()
-            if "images" in data and len(data["images"]) > 0:
-                # حفظ الصورة
-                import base64
-                img_data = base64.b64decode(data["images"][0])
-                
-                temp_path = tempfile.mktemp(suffix=".png")
-                with open(temp_path, "wb") as f:
-                    f.write(img_data)
-                
-                return temp_path
+            images = self.txt2img(payload)
+            if images:
+                path = self.save_image(images[0])
+                return self.cache.put(key, path) if key else path
             
             return None
             
@@ -72,6 +195,163 @@ class StableDiffusionAPI:
             print(f"Error generating texture with Stable Diffusion: {e}")
             return None
     
+    def generate_textures(self, requests_by_name: Dict[str, Dict]) -> Dict[str, Optional[str]]:
+        """
+        توليد عدة أنسجة دفعة واحدة
+        
+        Args:
+            requests_by_name: اسم كل نسيج مع معاملات generate_texture الخاصة به
+            
+        Returns:
+            قاموس بنفس الأسماء يحتوي على مسارات الصور (None عند الفشل)
+        """
+        paths = self.generate_batch(list(requests_by_name.values()))
+        return dict(zip(requests_by_name, paths))
+    
+    def generate_batch(self, items: List[Dict]) -> List[Optional[str]]:
+        """
+        توليد عدة أنسجة مع جمع الطلبات المتطابقة في طلبات txt2img مجمّعة
+        
+        الدفعات تُرسل في نفس الوقت (بحد max_concurrency طلب). الطلبات
+        الموجودة في الذاكرة لا تُرسل؛ الطلب المكرر يعطي تنويعات تُخزن كلٌ
+        على حدة، وببذرة ثابتة يأخذ التنويع i البذرة seed + i.
+        
+        Args:
+            items: معاملات generate_texture لكل نسيج (التكرار يعطي تنويعات)
+            
+        Returns:
+            مسارات الصور بنفس ترتيب items (None عند الفشل)
+        """
+        payloads = [self.build_payload(**item) for item in items]
+        variations = [0] * len(items)
+        
+        seen = {}
+        for index, payload in enumerate(payloads):
+            identity = json.dumps(payload, sort_keys=True)
+            variation = seen.get(identity, 0)
+            seen[identity] = variation + 1
+            
+            if payload["seed"] >= 0:
+                # البذرة الفعلية للصورة هي ما يميز التنويع
+                payload["seed"] += variation
+            else:
+                variations[index] = variation
+        
+        paths = [None] * len(items)
+        keys = [None] * len(items)
+        if self.cache is not None:
+            for index, payload in enumerate(payloads):
+                keys[index] = self.cache_key(payload, variations[index])
+                paths[index] = self.cache.get(keys[index])
+        
+        missing = [index for index, path in enumerate(paths) if path is None]
+        pending = [self.submit_batch(payloads, batch)
+                   for batch in self.plan_batches([payloads[i] for i in missing], missing)]
+        
+        for batch, future in pending:
+            for index, path in zip(batch, future.result()):
+                if path and keys[index]:
+                    path = self.cache.put(keys[index], path)
+                paths[index] = path
+        return paths
+    
+    def submit_batch(self, payloads: List[Dict], batch: List[int]):
+        """إرسال دفعة (مواقع في payloads) إلى مجمع الخيوط، يعيد (batch, future)"""
+        return batch, self.executor.submit(self.run_batch, [payloads[i] for i in batch])
+    
+    def batch_key(self, payload: Dict) -> tuple:
+        """الإعدادات التي يجب أن تتطابق داخل دفعة واحدة"""
+        return (payload["prompt"], payload["negative_prompt"], payload["width"], payload["height"],
+                payload["steps"], payload["cfg_scale"], payload["sampler_name"], payload["seed"] < 0)
+    
+    def plan_batches(self, payloads: List[Dict], positions: Optional[List[int]] = None) -> List[List[int]]:
+        """
+        تقسيم الطلبات إلى دفعات متوافقة
+        
+        Args:
+            payloads: الطلبات
+            positions: موقع كل طلب في الدفعات الناتجة (افتراضياً 0..n-1)
+            
+        Returns:
+            قائمة دفعات، كل دفعة قائمة مواقع
+        """
+        if positions is None:
+            positions = list(range(len(payloads)))
+        
+        groups = {}
+        for index, payload in enumerate(payloads):
+            groups.setdefault(self.batch_key(payload), []).append(index)
+        
+        batches = []
+        for indices in groups.values():
+            if payloads[indices[0]]["seed"] < 0:
+                batches.extend(indices[start:start + self.max_batch_size]
+                               for start in range(0, len(indices), self.max_batch_size))
+                continue
+            
+            # بذرة ثابتة: الصورة i في الدفعة بذرتها seed + i، فلا تُجمع إلا البذور المتتالية
+            batch = []
+            for index in sorted(indices, key=lambda i: payloads[i]["seed"]):
+                if batch and (len(batch) == self.max_batch_size
+                              or payloads[index]["seed"] != payloads[batch[0]]["seed"] + len(batch)):
+                    batches.append(batch)
+                    batch = []
+                batch.append(index)
+            batches.append(batch)
+        
+        return [[positions[i] for i in batch] for batch in batches]
+    
+    def batch_payload(self, payloads: List[Dict]) -> Dict:
+        """دمج طلبات متوافقة في طلب واحد بـ batch_size = عددها"""
+        payload = dict(payloads[0])
+        payload["batch_size"] = len(payloads)
+        return payload
+    
+    def run_batch(self, payloads: List[Dict]) -> List[Optional[str]]:
+        """
+        إرسال دفعة واحدة وحفظ صورها بترتيب payloads
+        
+        Returns:
+            مسارات الصور (None لكل صورة فاشلة)
+        """
+        try:
+            images = self.txt2img(self.batch_payload(payloads))
+        except Exception as e:
+            print(f"Error generating textures with Stable Diffusion: {e}")
+            return [None] * len(payloads)
+        
+        # الصورة المجمّعة (grid) إن وُجدت تأتي أولاً، فالصور الفردية هي الأخيرة
+        images = images[-len(payloads):] if len(images) >= len(payloads) else []
+        if not images:
+            print(f"Stable Diffusion returned too few images for a batch of {len(payloads)}")
+            return [None] * len(payloads)
+        
+        return [self.save_image(image) for image in images]
+    
+    def material_map_requests(self, prompt: str, style: str = "realistic") -> Dict[str, Dict]:
+        """معاملات توليد كل خريطة من خرائط المادة"""
+        return {
+            # النسيج الأساسي
+            "base_color": {
+                "prompt": f"{prompt}, {style} material, tileable texture",
+            },
+            # خريطة الـ Normal
+            "normal": {
+                "prompt": f"{prompt}, normal map, bump map, height map",
+                "negative_prompt": "color, saturation",
+            },
+            # خريطة الـ Roughness
+            "roughness": {
+                "prompt": f"{prompt}, roughness map, grayscale",
+                "negative_prompt": "color, saturation, hue",
+            },
+            # خريطة الـ Metallic
+            "metallic": {
+                "prompt": f"{prompt}, metallic map, metalness map, grayscale",
+                "negative_prompt": "color, saturation, hue",
+            },
+        }
+    
     def generate_material_maps(self, prompt: str, style: str = "realistic") -> Dict:
         """
         توليد خرائط المواد المختلفة
@@ -83,89 +363,103 @@ class StableDiffusionAPI:
         Returns:
             قاموس يحتوي على مسارات خرائط المواد
         """
-        maps = {}
-        
-        # توليد النسيج الأساسي
-        base_texture = self.generate_texture(
-            prompt=f"{prompt}, {style} material, tileable texture"
-        )
-        if base_texture:
-            maps["base_color"] = base_texture
+        map_requests = self.material_map_requests(prompt, style)
         
-        # توليد خريطة الـ Normal
-        normal_map = self.generate_texture(
-            prompt=f"{prompt}, normal map, bump map, height map",
-            negative_prompt="color, saturation"
-        )
-        if normal_map:
-            maps["normal"] = normal_map
-        
-        # توليد خريطة الـ Roughness
-        roughness_map = self.generate_texture(
-            prompt=f"{prompt}, roughness map, grayscale",
-            negative_prompt="color, saturation, hue"
-        )
-        if roughness_map:
-            maps["roughness"] = roughness_map
-        
-        # توليد خريطة الـ Metallic
-        metallic_map = self.generate_texture(
-            prompt=f"{prompt}, metallic map, metalness map, grayscale",
-            negative_prompt="color, saturation, hue"
-        )
-        if metallic_map:
-            maps["metallic"] = metallic_map
+        if self.pbr_maps == 'LOCAL':
+            # توليد واحد على الخادم، والباقي محلياً من نفس الصورة
+            base_color = self.generate_texture(**map_requests["base_color"])
+            if not base_color:
+                return {}
+            
+            maps = {"base_color": base_color}
+            maps.update(ImageProcessor.derive_pbr_maps(base_color, self.normal_strength,
+                                                       self.metalness(prompt)))
+            return maps
         
-        return maps
+        # الخرائط الأربع في دفعة واحدة (أو دفعات متزامنة)
+        results = self.generate_textures(map_requests)
+        return {name: path for name, path in results.items() if path}
+    
+    def metalness(self, prompt: str) -> float:
+        """قيمة المعدن المتوقعة من وصف المادة"""
+        prompt_lower = prompt.lower()
+        return 1.0 if any(word in prompt_lower for word in self.METAL_WORDS) else 0.0
     
     def is_available(self) -> bool:
         """التحقق من توفر خدمة Stable Diffusion"""
         try:
-            response = requests.get(f"{self.api_url}/sdapi/v1/samplers", timeout=5)
+            response = self.session.get(f"{self.api_url}/sdapi/v1/samplers", timeout=5)
             return response.status_code == 200
         except:
             return False
 
-class StableDiffusionSettings(bpy.types.PropertyGroup):
-    """إعدادات Stable Diffusion"""
-    
-    api_url: bpy.props.StringProperty(
-        name="API URL",
-        description="Stable Diffusion API URL",
-        default="http://localhost:7860"
-    )
-    
-    use_local: bpy.props.BoolProperty(
-        name="Use Local Server",
-        description="Use local Automatic1111 installation",
-        default=True
-    )
-    
-    steps: bpy.props.IntProperty(
-        name="Steps",
-        description="Number of sampling steps",
-        default=30,
-        min=10,
-        max=150
-    )
-    
-    cfg_scale: bpy.props.FloatProperty(
-        name="CFG Scale",
-        description="Classifier Free Guidance Scale",
-        default=7.0,
-        min=1.0,
-        max=30.0
-    )
-    
-    resolution: bpy.props.EnumProperty(
-        name="Resolution",
-        description="Output resolution",
-        items=[
-            ('512', '512x512', 'Standard quality'),
-            ('1024', '1024x1024', 'High quality (SDXL)'),
-        ],
-        default='512'
-    )
+if bpy is not None:
+    class StableDiffusionSettings(bpy.types.PropertyGroup):
+        """إعدادات Stable Diffusion"""
+        
+        api_url: bpy.props.StringProperty(
+            name="API URL",
+            description="Stable Diffusion API URL",
+            default="http://localhost:7860"
+        )
+        
+        use_local: bpy.props.BoolProperty(
+            name="Use Local Server",
+            description="Use local Automatic1111 installation",
+            default=True
+        )
+        
+        steps: bpy.props.IntProperty(
+            name="Steps",
+            description="Number of sampling steps",
+            default=30,
+            min=10,
+            max=150
+        )
+        
+        cfg_scale: bpy.props.FloatProperty(
+            name="CFG Scale",
+            description="Classifier Free Guidance Scale",
+            default=7.0,
+            min=1.0,
+            max=30.0
+        )
+        
+        resolution: bpy.props.EnumProperty(
+            name="Resolution",
+            description="Output resolution",
+            items=[
+                ('512', '512x512', 'Standard quality'),
+                ('1024', '1024x1024', 'High quality (SDXL)'),
+            ],
+            default='512'
+        )
+        
+        pbr_maps: bpy.props.EnumProperty(
+            name="PBR Maps",
+            description="How normal, roughness and metallic maps are made",
+            items=[
+                ('LOCAL', 'Derive Locally', 'Derive the maps from the base color (one generation per material)'),
+                ('DIFFUSION', 'Generate', 'Generate every map on the server'),
+            ],
+            default='LOCAL'
+        )
+        
+        max_batch_size: bpy.props.IntProperty(
+            name="Batch Size",
+            description="Maximum images generated by one server request",
+            default=4,
+            min=1,
+            max=8
+        )
+        
+        max_concurrency: bpy.props.IntProperty(
+            name="Parallel Requests",
+            description="Maximum requests sent to the server at the same time",
+            default=4,
+            min=1,
+            max=16
+        )
 
 def register():
     bpy.utils.register_class(StableDiffusionSettings)
@@ -15,6 +15,13 @@ def load_material_presets():
             return [(mat['id'], mat['name'], f"{mat['type']} material") for mat in data.get('materials', [])]
     return []
 
+def update_cache_size(self, context):
+    """Apply the cache size from the panel to the shared generation cache"""
+    from ..utils.generation_cache import default_cache
+    cache = default_cache()
+    cache.max_bytes = context.scene.ai_material_cache_size * 1024 * 1024
+    cache.evict()
+
 class AIMaterialGeneratorPanel(Panel):
     """AI Material Generator Panel"""
     bl_label = "AI Material Generator"
@@ -76,6 +83,22 @@ class AIMaterialGeneratorPanel(Panel):
         row = box.row()
         row.scale_y = 1.5
         row.operator("ai_material.apply", text="Apply to Selected", icon='CHECKMARK')
+        
+        layout.separator()
+        
+        # Generated image cache (DALL-E / Stable Diffusion)
+        from ..utils.generation_cache import default_cache
+        cache = default_cache()
+        
+        box = layout.box()
+        box.label(text="Generation Cache", icon='FILE_CACHE')
+        
+        row = box.row()
+        row.prop(context.scene, "ai_material_cache_size", text="MB")
+        row.operator("ai_material.clear_cache", text="", icon='TRASH')
+        
+        row = box.row()
+        row.label(text=f"{cache.hits} hits, {cache.misses} misses")
 
 class GenerateMaterialOperator(Operator):
     """Generate Material from Prompt"""
@@ -204,11 +227,25 @@ class ApplyMaterialOperator(Operator):
         
         return {'FINISHED'}
 
+class ClearGenerationCacheOperator(Operator):
+    """Delete all cached generated images"""
+    bl_idname = "ai_material.clear_cache"
+    bl_label = "Clear Generation Cache"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        from ..utils.generation_cache import default_cache
+        default_cache().clear()
+        
+        self.report({'INFO'}, "Generation cache cleared")
+        return {'FINISHED'}
+
 def register():
     bpy.utils.register_class(AIMaterialGeneratorPanel)
     bpy.utils.register_class(GenerateMaterialOperator)
     bpy.utils.register_class(ApplyPresetOperator)
     bpy.utils.register_class(ApplyMaterialOperator)
+    bpy.utils.register_class(ClearGenerationCacheOperator)
     
     # Load presets
     presets = load_material_presets()
@@ -229,13 +266,24 @@ def register():
         name="Last Material",
         default=""
     )
+    
+    bpy.types.Scene.ai_material_cache_size = bpy.props.IntProperty(
+        name="Cache Size",
+        description="Maximum generation cache size in MB (least recently used images are removed)",
+        default=1024,
+        min=16,
+        max=65536,
+        update=update_cache_size
+    )
 
 def unregister():
     bpy.utils.unregister_class(AIMaterialGeneratorPanel)
     bpy.utils.unregister_class(GenerateMaterialOperator)
     bpy.utils.unregister_class(ApplyPresetOperator)
     bpy.utils.unregister_class(ApplyMaterialOperator)
+    bpy.utils.unregister_class(ClearGenerationCacheOperator)
     
     del bpy.types.Scene.ai_material_prompt
     del bpy.types.Scene.ai_material_preset
     del bpy.types.Scene.ai_material_last_generated
+    del bpy.types.Scene.ai_material_cache_size
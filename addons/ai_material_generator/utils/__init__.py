@@ -1,5 +1,12 @@
-from . import image_processor
-from . import material_utils
+try:
+    import bpy
+except ImportError:
+    # The API clients and caches also run (and are tested) in plain Python
+    bpy = None
+
+if bpy is not None:
+    from . import image_processor
+    from . import material_utils
 
 def register():
     image_processor.register()
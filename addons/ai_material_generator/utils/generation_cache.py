@@ -0,0 +1,161 @@
+"""
+Prompt-keyed cache of generated images
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ..config import get_cache_dir, load_settings
+
+# يُزاد عند تغيير صيغة المفتاح لإبطال المدخلات القديمة
+CACHE_VERSION = 1
+
+def normalize_prompt(prompt: str) -> str:
+    """توحيد الـ prompt (حالة الأحرف والمسافات) ليعطي نفس المفتاح"""
+    return re.sub(r"\s+", " ", prompt.strip().lower())
+
+class GenerationCache:
+    """ذاكرة تخزين دائمة للصور المولدة، مفتاحها الـ prompt وإعدادات التوليد
+    
+    كل مدخل ملف <key>.png تحت paths.cache_dir. عند تجاوز max_bytes تُحذف
+    المدخلات الأقدم استخداماً أولاً (LRU).
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 1024 * 1024 * 1024):
+        self.cache_dir = cache_dir or get_cache_dir("material_generator")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def make_key(self, service: str, prompt: str, **params) -> str:
+        """
+        مفتاح المدخل من الخدمة والـ prompt الموحد والإعدادات
+        
+        Args:
+            service: اسم الخدمة (dalle, stable_diffusion)
+            prompt: وصف الصورة
+            params: النموذج والحجم والجودة والخطوات و CFG و seed...
+        
+        Returns:
+            مفتاح SHA-256
+        """
+        payload = json.dumps({
+            'version': CACHE_VERSION,
+            'service': service,
+            'prompt': normalize_prompt(prompt),
+            'params': params,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".png")
+    
+    def get(self, key: str) -> Optional[str]:
+        """مسار الصورة المخزنة للمفتاح أو None"""
+        path = self.path(key)
+        
+        try:
+            # تحديث وقت الاستخدام لترتيب الحذف (LRU)
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        with self._lock:
+            self.hits += 1
+        return path
+    
+    def put(self, key: str, image_path: str) -> str:
+        """
+        نقل صورة مولدة إلى الذاكرة ثم حذف القديم إن تجاوز الحجم
+        
+        Args:
+            key: مفتاح المدخل
+            image_path: مسار الصورة المولدة (يُنقل الملف)
+        
+        Returns:
+            مسار الصورة داخل الذاكرة
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        
+        # الملف يظهر مكتملاً فقط بعد النقل
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.move(image_path, tmp_path)
+        os.replace(tmp_path, path)
+        
+        self.evict(keep=key)
+        return path
+    
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """(آخر استخدام، الحجم، المفتاح) لكل مدخل"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".png"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len(".png")]))
+        
+        return entries
+    
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+    
+    def evict(self, keep: Optional[str] = None):
+        """حذف المدخلات الأقدم استخداماً حتى يصبح الحجم ضمن max_bytes"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.remove(key)
+            total -= size
+    
+    def remove(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+    
+    def clear(self):
+        for _, _, key in self.entries():
+            self.remove(key)
+    
+    def stats(self) -> Dict:
+        entries = self.entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+
+_default_cache = None
+
+def default_cache() -> GenerationCache:
+    """
+    الذاكرة المشتركة بين DALL-E و Stable Diffusion (عداداتها تظهر في اللوحة)
+    
+    حدها الأقصى paths.material_cache_max_mb في config/settings.json
+    (1024 افتراضياً)، وحجم الذاكرة في اللوحة يغيره بعد ذلك.
+    """
+    global _default_cache
+    if _default_cache is None:
+        max_mb = load_settings().get('paths', {}).get('material_cache_max_mb', 1024)
+        _default_cache = GenerationCache(max_bytes=int(max_mb * 1024 * 1024))
+    return _default_cache
@@ -1,12 +1,15 @@
 """
 Image Processing Utilities for Material Generation
 """
-import bpy
+try:
+    import bpy
+except ImportError:
+    bpy = None
 from PIL import Image
 import numpy as np
 import tempfile
 import os
-from typing import Tuple, Optional
+from typing import Dict, Tuple
 
 class ImageProcessor:
     """معالج الصور للمواد"""
@@ -78,28 +81,8 @@ class ImageProcessor:
             مسار خريطة Normal
         """
         try:
-            img = Image.open(image_path).convert('L')
-            arr = np.array(img, dtype=np.float32)
-            
-            # حساب الـ gradients
-            grad_x = np.gradient(arr, axis=1) * strength
-            grad_y = np.gradient(arr, axis=0) * strength
-            
-            # إنشاء خريطة Normal
-            normal_map = np.zeros((*arr.shape, 3), dtype=np.float32)
-            normal_map[..., 0] = ((-grad_x / 255.0) + 1) * 127.5  # R
-            normal_map[..., 1] = ((-grad_y / 255.0) + 1) * 127.5  # G
-            normal_map[..., 2] = 255  # B
-            
-            # تحويل إلى uint8
-            normal_map = normal_map.astype(np.uint8)
-            
-            # حفظ
-            output_img = Image.fromarray(normal_map)
-            output_path = tempfile.mktemp(suffix="_normal.png")
-            output_img.save(output_path)
-            
-            return output_path
+            arr = np.array(Image.open(image_path).convert('L'), dtype=np.float32)
+            return ImageProcessor.save_map(ImageProcessor.normal_from_height(arr, strength), "_normal.png")
             
         except Exception as e:
             print(f"Error generating normal map: {e}")
@@ -117,38 +100,138 @@ class ImageProcessor:
             مسار خريطة Roughness
         """
         try:
-            img = Image.open(image_path).convert('L')
-            
-            # Roughness غالباً يعتمد على التباين
-            arr = np.array(img, dtype=np.float32)
-            
-            # حساب التباين المحلي
-            from scipy.ndimage import generic_filter
+            arr = np.array(Image.open(image_path).convert('L'), dtype=np.float32)
+            return ImageProcessor.save_map(ImageProcessor.roughness_from_gray(arr), "_roughness.png")
             
-            def local_variance(patch):
-                return np.var(patch)
-            
-            variance = generic_filter(arr, local_variance, size=5)
-            
-            # تطبيع
-            variance = (varariance / variance.max() * 255).astype(np.uint8)
+        except Exception as e:
+            print(f"Error generating roughness map: {e}")
+            return image_path
+    
+    @staticmethod
+    def generate_metallic_map(image_path: str, metalness: float = 1.0) -> str:
+        """
+        توليد خريطة Metallic من النسيج
+        
+        Args:
+            image_path: مسار النسيج
+            metalness: قيمة المعدن للمناطق ذات اللون السائد (0 لمادة غير معدنية)
             
-            output_img = Image.fromarray(variance)
-            output_path = tempfile.mktemp(suffix="_roughness.png")
-            output_img.save(output_path)
+        Returns:
+            مسار خريطة Metallic
+        """
+        try:
+            rgb = np.array(Image.open(image_path).convert('RGB'), dtype=np.float32)
+            return ImageProcessor.save_map(ImageProcessor.metallic_from_rgb(rgb, metalness), "_metallic.png")
             
-            return output_path
+        except Exception as e:
+            print(f"Error generating metallic map: {e}")
+            return image_path
+    
+    @staticmethod
+    def derive_pbr_maps(image_path: str, normal_strength: float = 1.0,
+                        metalness: float = 0.0) -> Dict[str, str]:
+        """
+        اشتقاق خرائط Normal و Roughness و Metallic من صورة اللون الأساسي
+        
+        تُقرأ الصورة مرة واحدة وكل الحسابات مصفوفات numpy، فلا حاجة
+        لطلبات توليد إضافية وتبقى الخرائط مطابقة للون الأساسي.
+        
+        Args:
+            image_path: مسار صورة اللون الأساسي
+            normal_strength: شدة الـ Normal
+            metalness: قيمة المعدن (انظر generate_metallic_map)
             
-        except ImportError:
-            # إذا لم يكن scipy متاحاً
-            img = Image.open(image_path).convert('L')
-            output_path = tempfile.mktemp(suffix="_roughness.png")
-            img.save(output_path)
-            return output_path
+        Returns:
+            قاموس يحتوي على مسارات الخرائط (normal, roughness, metallic)
+        """
+        try:
+            img = Image.open(image_path).convert('RGB')
+            rgb = np.array(img, dtype=np.float32)
+            gray = np.array(img.convert('L'), dtype=np.float32)
+
+            return {
+                "normal": ImageProcessor.save_map(
+                    ImageProcessor.normal_from_height(gray, normal_strength), "_normal.png"),
+                "roughness": ImageProcessor.save_map(
+                    ImageProcessor.roughness_from_gray(gray), "_roughness.png"),
+                "metallic": ImageProcessor.save_map(
+                    ImageProcessor.metallic_from_rgb(rgb, metalness), "_metallic.png"),
+            }
             
         except Exception as e:
-            print(f"Error generating roughness map: {e}")
-            return image_path
+            print(f"Error deriving PBR maps: {e}")
+            return {}
+    
+    @staticmethod
+    def normal_from_height(arr: np.ndarray, strength: float = 1.0) -> np.ndarray:
+        """خريطة Normal (uint8 RGB) من صورة رمادية تُعامل كارتفاع"""
+        grad_x = np.gradient(arr, axis=1) * strength
+        grad_y = np.gradient(arr, axis=0) * strength
+        
+        normal_map = np.empty((*arr.shape, 3), dtype=np.float32)
+        normal_map[..., 0] = ((-grad_x / 255.0) + 1) * 127.5  # R
+        normal_map[..., 1] = ((-grad_y / 255.0) + 1) * 127.5  # G
+        normal_map[..., 2] = 255  # B
+        
+        return np.clip(normal_map, 0, 255).astype(np.uint8)
+    
+    @staticmethod
+    def box_mean(arr: np.ndarray, size: int = 5) -> np.ndarray:
+        """
+        متوسط كل نافذة size x size بصورة تكاملية (integral image)
+        
+        نفس نتيجة مرشح متوسط بحواف منعكسة، بتكلفة ثابتة لكل بكسل مهما كان size.
+        """
+        radius = size // 2
+        padded = np.pad(arr.astype(np.float64), ((radius, size - 1 - radius),) * 2, mode='symmetric')
+        
+        integral = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1))
+        integral[1:, 1:] = padded.cumsum(axis=0).cumsum(axis=1)
+        
+        height, width = arr.shape
+        total = (integral[size:size + height, size:size + width]
+                 - integral[:height, size:size + width]
+                 - integral[size:size + height, :width]
+                 + integral[:height, :width])
+        return total / (size * size)
+    
+    @staticmethod
+    def roughness_from_gray(arr: np.ndarray, size: int = 5) -> np.ndarray:
+        """خريطة Roughness (uint8) من التباين المحلي في نوافذ size x size"""
+        # Var = E[x^2] - E[x]^2
+        mean = ImageProcessor.box_mean(arr, size)
+        variance = np.maximum(ImageProcessor.box_mean(arr.astype(np.float64) ** 2, size) - mean * mean, 0)
+        
+        # تطبيع
+        peak = variance.max()
+        if peak <= 0:
+            return np.zeros(arr.shape, dtype=np.uint8)
+        return (variance / peak * 255).astype(np.uint8)
+    
+    @staticmethod
+    def metallic_from_rgb(rgb: np.ndarray, metalness: float = 1.0) -> np.ndarray:
+        """
+        خريطة Metallic (uint8) من الألوان
+        
+        المناطق القريبة من اللون السائد (الوسيط) تأخذ metalness، والمناطق
+        البعيدة عنه (صدأ، أوساخ، طلاء) تُعتبر غير معدنية.
+        """
+        if metalness <= 0:
+            return np.zeros(rgb.shape[:2], dtype=np.uint8)
+        
+        dominant = np.median(rgb.reshape(-1, 3), axis=0)
+        distance = np.linalg.norm(rgb - dominant, axis=-1) / 255.0
+        metal = np.clip(1.0 - (distance - 0.15) / 0.2, 0.0, 1.0) * min(metalness, 1.0)
+        
+        return (metal * 255).astype(np.uint8)
+    
+    @staticmethod
+    def save_map(arr: np.ndarray, suffix: str = ".png") -> str:
+        """حفظ مصفوفة uint8 كصورة PNG مؤقتة"""
+        fd, output_path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        Image.fromarray(arr).save(output_path)
+        return output_path
     
     @staticmethod
     def resize_for_blender(image_path: str, target_size: Tuple[int, int] = (1024, 1024)) -> str:
@@ -0,0 +1,203 @@
+"""
+Client-side rate limiting and retries for the image generation APIs
+"""
+import email.utils
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+
+from ..config import load_settings
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# نسبة الحصة المستخدمة: تأخر وصول الطلبات بضعة أجزاء من الثانية يكفي
+# لتجاوز حد الخادم عند العمل على الحد تماماً
+RATE_HEADROOM = 0.95
+
+class Clock:
+    """الساعة المستخدمة للانتظار (يمكن استبدالها بساعة وهمية في الاختبارات)"""
+    
+    def time(self) -> float:
+        return time.monotonic()
+    
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+class TokenBucket:
+    """محدد معدل Token Bucket مشترك بين الخيوط
+    
+    يمتلئ بمعدل rate_per_minute رمز في الدقيقة حتى burst رمز، وكل طلب
+    يستهلك رمزاً. burst=1 يوزع الطلبات بالتساوي، لأن الخدمات تطبق الحد
+    غالباً على فترات أقصر من دقيقة.
+    """
+    
+    def __init__(self, rate_per_minute: float, burst: int = 1, clock: Optional[Clock] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.clock = clock or Clock()
+        
+        self.tokens = float(self.capacity)
+        self.updated = self.clock.time()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def reserve(self) -> float:
+        """
+        حجز رمز للطلب التالي
+        
+        Returns:
+            مدة الانتظار بالثواني قبل إرسال الطلب (0 إذا كان متاحاً الآن)
+        """
+        with self._lock:
+            now = self.clock.time()
+            self._refill(now)
+            
+            # الرمز يُحجز حتى لو لم يتوفر بعد، فالخيوط تصطف بالترتيب
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+    
+    def acquire(self):
+        """الانتظار حتى يُسمح بطلب واحد"""
+        self.clock.sleep(self.reserve())
+    
+    def pause(self, seconds: float):
+        """إيقاف كل الطلبات لمدة seconds (بعد 429 من الخادم)"""
+        with self._lock:
+            now = self.clock.time()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            # الرصيد يبدأ من الصفر عند نهاية الإيقاف، فالطلبات المصطفة تُوزع
+            # بعدها بمعدل rate بدلاً من أن تنطلق كلها معاً
+            self.tokens = 0.0
+            self.updated = self.blocked_until
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """ثواني Retry-After (عدد ثوانٍ أو تاريخ HTTP) أو None"""
+    if not value:
+        return None
+    
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+class RetryPolicy:
+    """إعادة المحاولة بتأخير أُسّي مع jitter، مع احترام Retry-After"""
+    
+    def __init__(self, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 60.0,
+                 statuses=RETRY_STATUSES, rng: Optional[random.Random] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = statuses
+        self.rng = rng or random.Random()
+    
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        التأخير قبل إعادة المحاولة رقم attempt + 1
+        
+        Args:
+            attempt: عدد المحاولات الفاشلة حتى الآن ناقص واحد (يبدأ من 0)
+            retry_after: قيمة Retry-After من الخادم إن وُجدت
+        
+        Returns:
+            مدة الانتظار بالثواني
+        """
+        if retry_after is not None:
+            # jitter صغير فوق طلب الخادم حتى لا تعود كل الخيوط معاً
+            return retry_after + self.rng.uniform(0, self.base_delay)
+        
+        # Full jitter: عشوائي بين 0 والتأخير الأسي
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class RequestScheduler:
+    """إرسال طلبات HTTP عبر محدد المعدل مع إعادة المحاولة
+    
+    يعيد المحاولة عند انتهاء المهلة أو فشل الاتصال أو الحالات في
+    RetryPolicy.statuses. عند 429 يوقف المحدد لكل الخيوط.
+    """
+    
+    def __init__(self, limiter: Optional[TokenBucket] = None, retry: Optional[RetryPolicy] = None,
+                 clock: Optional[Clock] = None):
+        self.limiter = limiter
+        self.retry = retry or RetryPolicy()
+        self.clock = clock or (limiter.clock if limiter else Clock())
+        self.retries = 0
+        self.throttled = 0
+    
+    def request(self, method: str, url: str, session=None, **kwargs) -> requests.Response:
+        """
+        إرسال طلب (session اختيارية: requests.Session مشتركة)
+        
+        Returns:
+            الاستجابة الأخيرة (قد تكون خطأ إذا نفدت المحاولات)
+        """
+        sender = session or requests
+        attempt = 0
+        
+        while True:
+            if self.limiter is not None:
+                self.limiter.acquire()
+            
+            paused = False
+            try:
+                response = sender.request(method, url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if attempt >= self.retry.max_retries:
+                    raise
+                delay = self.retry.delay(attempt)
+                print(f"Request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in self.retry.statuses or attempt >= self.retry.max_retries:
+                    return response
+                
+                delay = self.retry.delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+                if response.status_code == 429:
+                    self.throttled += 1
+                    if self.limiter is not None:
+                        # الانتظار يحدث في acquire() التالي، لكل الخيوط
+                        self.limiter.pause(delay)
+                        paused = True
+                print(f"Request returned {response.status_code}, retrying in {delay:.1f}s")
+            
+            self.retries += 1
+            attempt += 1
+            if not paused:
+                self.clock.sleep(delay)
+    
+    def post(self, url: str, session=None, **kwargs) -> requests.Response:
+        return self.request("POST", url, session=session, **kwargs)
+    
+    def get(self, url: str, session=None, **kwargs) -> requests.Response:
+        return self.request("GET", url, session=session, **kwargs)
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def request_scheduler(service: str) -> RequestScheduler:
+    """
+    المجدول المشترك لخدمة من ai_services في config/settings.json
+    
+    max_requests_per_minute للخدمة (إن وُجد) يحدد معدل المحدد (مضروباً في
+    RATE_HEADROOM)، فكل النسخ والخيوط تتقاسم نفس الحصة.
+    """
+    with _schedulers_lock:
+        if service not in _schedulers:
+            settings = load_settings().get('ai_services', {}).get(service, {})
+            rate = settings.get('max_requests_per_minute')
+            _schedulers[service] = RequestScheduler(TokenBucket(rate * RATE_HEADROOM) if rate else None)
+        return _schedulers[service]
@@ -10,16 +10,20 @@ bl_info = {
     "tracker_url": "https://github.com/abdelsidi/blender-ai-integration/issues",
 }
 
-import bpy
-from . import ui, utils
+try:
+    import bpy
+except ImportError:
+    # Depth worker processes import this package from plain Python
+    bpy = None
+
+if bpy is not None:
+    from . import ui
 
 def register():
     ui.register()
-    utils.register()
 
 def unregister():
     ui.unregister()
-    utils.unregister()
 
 if __name__ == "__main__":
     register()
@@ -1,17 +1,95 @@
 import bpy
 import os
+import tempfile
 import cv2
 import numpy as np
 from PIL import Image
 from pathlib import Path
 
+from .depth import HeuristicDepthBackend
+from .streaming import DepthJob, FrameSampling, PngSink, iter_frames, resize_frame, stream_depth
+from .animation import ensure_fcurve, set_keyframes
+from .jobs import ChunkedJob
+from .pointcache import PC2Writer
+from .temporal import DepthSequence
+from .rtin import rtin_errors
+from .terrain import (DepthSampler, get_positions, set_positions, sample_depth,
+                      rtin_heights, adaptive_plane_arrays, mesh_from_arrays)
+
+class PointCacheRecorder:
+    """Positions of an object displaced by each depth map, appended to a PC2 file
+    
+    Only the current frame's positions are held in memory. Repeated frames
+    (the same array, see DepthSequence) reuse the last positions.
+    """
+    
+    def __init__(self, obj, filepath, strength):
+        self.obj = obj
+        self.filepath = filepath
+        self.strength = strength
+        self.base = get_positions(obj.data)
+        self.u = (self.base[:, 0] + 1) / 2
+        self.v = (self.base[:, 1] + 1) / 2
+        self.sampler = None
+        self.previous = None
+        self.co = None
+        self.writer = PC2Writer(filepath, len(self.base))
+    
+    def append(self, depth):
+        if depth is not self.previous:
+            if self.sampler is None or self.sampler.shape != depth.shape[:2]:
+                self.sampler = DepthSampler(depth.shape, self.u, self.v)
+            
+            self.co = self.base.copy()
+            self.co[:, 2] += self.sampler(depth) * self.strength
+            self.previous = depth
+        
+        self.writer.write_frame(self.co)
+    
+    @property
+    def frame_count(self):
+        return self.writer.num_samples
+    
+    def close(self):
+        self.writer.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
 class VideoTo3DGenerator:
     """Video to 3D depth generator using AI"""
     
     def __init__(self):
         self.processing_mode = 'cloud'  # 'cloud' or 'local'
         self.depth_model = None
+        self.depth_backend = HeuristicDepthBackend()
+        self.frame_max_size = 512  # Frames are shrunk to this before depth (None = full size)
+        self.depth_map_size = 256  # Longest side of the depth maps kept per frame
+        self.queue_size = 8  # Frames waiting between pipeline stages
+        self.start_time = 0.0  # In point (seconds)
+        self.end_time = None  # Out point (seconds, None = end of video)
+        self.target_fps = None  # Frames per second to sample (overrides sample_rate)
+        self.temporal_smoothing = 0.0  # Flicker filter strength (0 = off, up to 0.95)
+        self.keyframe_interval = 30  # Frames between full depth keyframes
+        self.delta_threshold = 0.0  # Mean change (depth levels) below which a frame repeats the last
+        self.delta_step = 1  # Depth levels per quantized delta step
+        self.resumable = False  # Keep depth chunks on disk so an interrupted run resumes
+        self.jobs_dir = None  # Chunked job folders (default: cache_dir/video_jobs)
+        self.chunk_size = 64  # Sampled frames per chunk
+        self.keep_jobs = False  # Keep job folders after a complete run
+        self.depth_workers = 1  # Depth batches estimated concurrently
+        self.depth_processes = False  # Worker processes instead of threads
+        self.debug_dir = None  # Write frame/depth PNGs here when set
         self.temp_dir = None
+        self.mesh_method = 'GRID'  # 'GRID' or 'ADAPTIVE'
+        self.max_error = 0.01  # Max displacement error of the adaptive mesh
+        self.adaptive_grid_size = 129  # Finest adaptive grid (2**k + 1 points per side)
+        self.last_mesh_stats = None
+        self.animation_mode = 'SHAPE_KEYS'  # 'SHAPE_KEYS' or 'POINT_CACHE'
+        self.cache_dir = None  # PC2 folder (default: video_cache next to the .blend)
     
     def import_video(self, filepath):
         """Import video file"""
@@ -36,177 +114,366 @@ class VideoTo3DGenerator:
         cap.release()
         return video_info
     
+    def frame_sampling(self, sample_rate=1):
+        """FrameSampling for sample_rate and the in/out points and target FPS"""
+        return FrameSampling(sample_rate, self.start_time, self.end_time, self.target_fps)
+    
     def extract_frames(self, video_path, output_dir, sample_rate=1):
-        """Extract frames from video"""
-        cap = cv2.VideoCapture(video_path)
+        """Extract frames from video to PNG files (for export/debugging)"""
         frames_dir = os.path.join(output_dir, "frames")
         os.makedirs(frames_dir, exist_ok=True)
         
-        frame_count = 0
         saved_count = 0
+        for index, frame in iter_frames(video_path, self.frame_sampling(sample_rate)):
+            frame_path = os.path.join(frames_dir, f"frame_{index:05d}.png")
+            cv2.imwrite(frame_path, frame)
+            saved_count += 1
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Save every Nth frame based on sample_rate
-            if frame_count % sample_rate == 0:
-                frame_path = os.path.join(frames_dir, f"frame_{saved_count:05d}.png")
-                cv2.imwrite(frame_path, frame)
-                saved_count += 1
-            
-            frame_count += 1
-        
-        cap.release()
         return frames_dir, saved_count
     
+    def iter_depth_maps(self, video_path, sample_rate=1):
+        """Depth maps of a video, decoded and estimated in memory, one at a time
+        
+        Yields uint8 depth maps (longest side depth_map_size).
+        Frames only touch the disk when debug_dir is set.
+        """
+        sink = PngSink(self.debug_dir) if self.debug_dir else None
+        
+        if self.resumable:
+            results = self.chunked_job(video_path, sample_rate).stream(
+                cleanup=not self.keep_jobs, **self.pipeline_settings(sink))
+        else:
+            results = stream_depth(video_path, self.depth_backend, self.frame_sampling(sample_rate),
+                                   self.frame_max_size, self.queue_size, sink,
+                                   self.depth_workers, self.depth_processes)
+        
+        for index, frame, depth in results:
+            yield resize_frame(depth, self.depth_map_size)
+        
+        stats = self.depth_backend.stats()
+        print(f"Depth ({stats['backend']}): {stats['frames']} frames, {stats['fps']:.1f} frames/s")
+    
+    def stream_depth_maps(self, video_path, sample_rate=1):
+        """All depth maps of a video (see iter_depth_maps) in a DepthSequence"""
+        depth_maps = self.new_depth_sequence()
+        for depth in self.iter_depth_maps(video_path, sample_rate):
+            depth_maps.append(depth)
+        
+        self.print_sequence_stats(depth_maps)
+        return depth_maps
+    
+    def new_depth_sequence(self, keep=True):
+        """DepthSequence with the temporal smoothing and delta settings"""
+        return DepthSequence(self.temporal_smoothing, self.keyframe_interval,
+                             self.delta_threshold, self.delta_step, keep)
+    
+    def iter_temporal(self, depth_maps):
+        """Smooth and repeat-collapse depth maps on the fly, without storing them"""
+        sequence = self.new_depth_sequence(keep=False)
+        for depth in depth_maps:
+            yield sequence.append(depth)
+        self.print_sequence_stats(sequence)
+    
+    def print_sequence_stats(self, sequence):
+        stats = sequence.stats()
+        print(f"Depth storage: {stats['keyframes']} keyframes, {stats['deltas']} deltas, "
+              f"{stats['repeats']} repeats; {stats['bytes'] / 2**20:.1f} MB of {stats['raw_bytes'] / 2**20:.1f} MB")
+    
+    def start_depth_job(self, video_path, sample_rate=1):
+        """Start stream_depth_maps in the background, returns the running DepthJob
+        
+        Poll the job from the main thread (modal operator or timer) and keep
+        depth_map(depth) of each result.
+        """
+        sink = PngSink(self.debug_dir) if self.debug_dir else None
+        
+        source = None
+        if self.resumable:
+            chunked = self.chunked_job(video_path, sample_rate)
+            source = lambda: chunked.stream(cleanup=not self.keep_jobs, **self.pipeline_settings(sink))
+        
+        job = DepthJob(video_path, self.depth_backend, self.frame_sampling(sample_rate), self.frame_max_size,
+                       self.queue_size, sink, self.depth_workers, self.depth_processes, source)
+        return job.start()
+    
+    def chunked_job(self, video_path, sample_rate=1):
+        """ChunkedJob for a video with the current depth settings"""
+        return ChunkedJob(video_path, self.depth_backend, self.frame_sampling(sample_rate),
+                          self.frame_max_size, self.depth_map_size, self.chunk_size, self.jobs_dir)
+    
+    def pipeline_settings(self, sink=None):
+        """Keyword arguments for ChunkedJob.run/stream"""
+        return {
+            'queue_size': self.queue_size,
+            'workers': self.depth_workers,
+            'processes': self.depth_processes,
+            'sink': sink,
+        }
+    
+    def depth_map(self, depth):
+        """Depth map as kept per frame (longest side depth_map_size)"""
+        return resize_frame(depth, self.depth_map_size)
+    
     def generate_depth_map_simple(self, image_path):
-        """Simple depth estimation (placeholder for AI model)"""
-        # Load image
+        """Depth map of one image file with the configured depth backend"""
         img = cv2.imread(image_path)
         if img is None:
             return None
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Simple gradient-based depth estimation
-        # In real implementation, this would use MiDaS, DPT, or similar
-        sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        
-        # Magnitude
-        magnitude = np.sqrt(sobelx**2 + sobely**2)
-        
-        # Normalize
-        depth = cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX)
-        depth = np.uint8(depth)
-        
-        return depth
+        return self.depth_backend.estimate(img)
     
     def generate_depth_maps(self, frames_dir, output_dir):
-        """Generate depth maps for all frames"""
+        """Generate depth maps for all frames (in batches for model backends)"""
         depth_dir = os.path.join(output_dir, "depth_maps")
         os.makedirs(depth_dir, exist_ok=True)
         
         frames = sorted([f for f in os.listdir(frames_dir) if f.endswith('.png')])
-        
-        for i, frame_name in enumerate(frames):
-            frame_path = os.path.join(frames_dir, frame_name)
+        batch_size = self.depth_backend.batch_size
+        
+        for start in range(0, len(frames), batch_size):
+            batch = []
+            for i, frame_name in enumerate(frames[start:start + batch_size], start):
+                img = cv2.imread(os.path.join(frames_dir, frame_name))
+                if img is not None:
+                    batch.append((i, img))
             
-            # Generate depth
-            depth = self.generate_depth_map_simple(frame_path)
+            depths = self.depth_backend.estimate_batch([img for _, img in batch])
             
-            if depth is not None:
+            for (i, _), depth in zip(batch, depths):
                 depth_path = os.path.join(depth_dir, f"depth_{i:05d}.png")
                 cv2.imwrite(depth_path, depth)
         
+        stats = self.depth_backend.stats()
+        print(f"Depth ({stats['backend']}): {stats['frames']} frames, {stats['fps']:.1f} frames/s")
+        
         return depth_dir
     
-    def create_displaced_mesh(self, base_mesh, depth_image_path, strength=1.0):
-        """Create displaced mesh from depth map"""
-        import bmesh
-        
-        # Get mesh
-        bpy.context.view_layer.objects.active = base_mesh
-        
-        # Enter edit mode
-        bpy.ops.object.mode_set(mode='EDIT')
-        
-        # Get bmesh
-        bm = bmesh.from_mesh(base_mesh.data)
-        
-        # Load depth image
-        depth_img = cv2.imread(depth_image_path, cv2.IMREAD_GRAYSCALE)
-        if depth_img is None:
-            return
-        
-        height, width = depth_img.shape
-        
-        # Displace vertices
-        for vert in bm.verts:
-            # Get UV coordinates (simplified)
-            x = (vert.co.x + 1) / 2  # Normalize to 0-1
-            y = (vert.co.y + 1) / 2
-            
-            # Sample depth
-            px = int(x * (width - 1))
-            py = int(y * (height - 1))
-            
-            depth_val = depth_img[py, px] / 255.0
-            
-            # Apply displacement
-            vert.co.z += depth_val * strength
-        
-        # Update mesh
-        bmesh.to_mesh(bm, base_mesh.data)
-        bm.free()
-        
-        # Exit edit mode
-        bpy.ops.object.mode_set(mode='OBJECT')
+    def create_displaced_mesh(self, base_mesh, depth_image, strength=1.0):
+        """Displace a plane's vertices along Z by a depth map
+        
+        depth_image is a depth map file or a uint8 array. Vertex XY in
+        [-1, 1] covers the whole image, image top at +Y. All vertices are
+        read, sampled (bilinear) and written back in bulk on the mesh data,
+        so no edit mode is needed.
+        """
+        if isinstance(depth_image, str):
+            depth_img = cv2.imread(depth_image, cv2.IMREAD_GRAYSCALE)
+            if depth_img is None:
+                return
+        else:
+            depth_img = depth_image
+        
+        # Edit-mode data would overwrite the mesh on the next mode switch
+        if base_mesh.mode == 'EDIT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        
+        co = get_positions(base_mesh.data)
+        co[:, 2] += sample_depth(depth_img, (co[:, 0] + 1) / 2, (co[:, 1] + 1) / 2) * strength
+        set_positions(base_mesh.data, co)
     
-    def create_3d_from_video(self, video_path, displacement_strength=1.0):
+    def create_3d_from_video(self, video_path, displacement_strength=1.0, sample_rate=1):
         """Full pipeline: video -> 3D animated mesh"""
-        import tempfile
-        
-        # Create temp directory
-        temp_dir = tempfile.mkdtemp()
-        
         # Import video
         video_info = self.import_video(video_path)
         
-        # Extract frames
-        frames_dir, frame_count = self.extract_frames(video_path, temp_dir)
+        if self.streams_point_cache():
+            base_plane = self.create_grid_plane(f"VideoDepth_{video_info['name']}")
+            depth_maps = self.iter_temporal(self.iter_depth_maps(video_path, sample_rate))
+            self.write_point_cache(base_plane, depth_maps, self.playback_fps(video_info, sample_rate),
+                                   displacement_strength)
+            return base_plane
         
-        # Generate depth maps
-        depth_dir = self.generate_depth_maps(frames_dir, temp_dir)
+        # Decode frames and estimate depth in memory
+        depth_maps = self.stream_depth_maps(video_path, sample_rate)
         
+        return self.create_3d_from_depth_maps(video_info, depth_maps, displacement_strength, sample_rate)
+    
+    def streams_point_cache(self):
+        """Whether depth maps can go straight into a point cache as they arrive
+        
+        The grid topology does not depend on the depth, so memory stays flat
+        however long the video; the adaptive mesh needs the frames first.
+        """
+        return self.animation_mode == 'POINT_CACHE' and self.mesh_method == 'GRID'
+    
+    def create_3d_from_depth_maps(self, video_info, depth_maps, displacement_strength=1.0, sample_rate=1):
+        """Animated mesh from depth maps already estimated (main thread only)"""
         # Create base plane
+        if self.mesh_method == 'ADAPTIVE':
+            base_plane = self.create_adaptive_plane(
+                f"VideoDepth_{video_info['name']}", depth_maps, displacement_strength)
+        else:
+            base_plane = self.create_grid_plane(f"VideoDepth_{video_info['name']}")
+        
+        # Animate displacement
+        fps = self.playback_fps(video_info, sample_rate)
+        if self.animation_mode == 'POINT_CACHE':
+            self.write_point_cache(base_plane, depth_maps, fps, displacement_strength)
+        else:
+            self.animate_displacement(base_plane, depth_maps, fps, displacement_strength)
+        
+        return base_plane
+    
+    def create_grid_plane(self, name):
+        """Flat 2 x 2 plane subdivided for detail"""
         bpy.ops.mesh.primitive_plane_add(size=2, location=(0, 0, 0))
         base_plane = bpy.context.active_object
-        base_plane.name = f"VideoDepth_{video_info['name']}"
+        base_plane.name = name
         
         # Subdivide for detail
         bpy.ops.object.modifier_add(type='SUBSURF')
         base_plane.modifiers["Subdivision"].levels = 4
         bpy.ops.object.modifier_apply(modifier="Subdivision")
         
-        # Animate displacement
-        self.animate_displacement(base_plane, depth_dir, video_info['fps'], displacement_strength)
-        
         return base_plane
     
-    def animate_displacement(self, obj, depth_dir, fps, strength):
-        """Animate displacement using depth maps"""
+    def playback_fps(self, video_info, sample_rate=1):
+        """One depth map per sampled frame: play back at the sampled rate"""
+        return video_info['fps'] / self.frame_sampling(sample_rate).step(video_info['fps'])
+    
+    def set_scene_timing(self, fps, frame_count):
         scene = bpy.context.scene
+        scene.render.fps = max(1, round(fps))
+        scene.frame_start = 1
+        scene.frame_end = max(1, frame_count)
+    
+    def create_adaptive_plane(self, name, depth_maps, strength, max_frames=32):
+        """Create a flat plane triangulated to keep the sampled frames within max_error"""
+        # One topology for all frames: take the worst error of a spread of frames
+        step = max(1, len(depth_maps) // max_frames)
+        errors = None
+        for depth in depth_maps[::step]:
+            frame_errors = rtin_errors(rtin_heights(depth, self.adaptive_grid_size, strength))
+            errors = frame_errors if errors is None else np.maximum(errors, frame_errors)
+        
+        if errors is None:
+            errors = np.zeros((self.adaptive_grid_size, self.adaptive_grid_size), dtype=np.float32)
+        
+        verts, faces, uvs = adaptive_plane_arrays(errors, self.max_error, size=2.0)
+        mesh = mesh_from_arrays(name, verts, faces, uvs)
+        
+        grid_cells = self.adaptive_grid_size - 1
+        self.last_mesh_stats = {
+            'vertices': len(verts),
+            'faces': len(faces),
+            'grid_faces': grid_cells * grid_cells * 2,
+            'tradeoff': [(e, len(adaptive_plane_arrays(errors, e)[1]))
+                         for e in (self.max_error * 4, self.max_error * 2, self.max_error / 2)],
+        }
         
-        depth_files = sorted([f for f in os.listdir(depth_dir) if f.endswith('.png')])
+        obj = bpy.data.objects.new(name, mesh)
+        bpy.context.collection.objects.link(obj)
+        bpy.context.view_layer.objects.active = obj
         
-        # Set frame rate
-        scene.render.fps = int(fps)
+        return obj
+    
+    def animate_displacement(self, obj, depth_maps, fps, strength):
+        """Animate displacement: one shape key per depth map, shown on its frame
         
+        Each key's positions are written with one foreach_set and its value
+        curve with one keyframe_points.add + foreach_set. A run of repeated
+        frames (the same array, see DepthSequence) shares one shape key.
+        """
         # Create shape keys
-        obj.shape_key_add(name="Basis")
+        if obj.data.shape_keys is None:
+            obj.shape_key_add(name="Basis")
         
-        for i, depth_file in enumerate(depth_files):
-            frame_num = i + 1
-            
-            # Create shape key
-            shapekey = obj.shape_key_add(name=f"Frame_{i:05d}")
+        base = get_positions(obj.data)
+        u = (base[:, 0] + 1) / 2
+        v = (base[:, 1] + 1) / 2
+        sampler = None
+        
+        previous = None
+        shapekey = None
+        run_start = 0
+        frame_count = 0
+        
+        for i, depth in enumerate(depth_maps):
+            frame_count += 1
+            if depth is previous:
+                continue
             
-            # Apply displacement to shape key
-            # (This is simplified - full implementation would use drivers)
+            if shapekey is not None:
+                self.key_shape_run(obj, shapekey, run_start, i - run_start)
             
-            # Set keyframe
-            shapekey.value = 0
-            shapekey.keyframe_insert(data_path="value", frame=frame_num - 1)
+            if sampler is None or sampler.shape != depth.shape[:2]:
+                sampler = DepthSampler(depth.shape, u, v)
             
-            shapekey.value = 1
-            shapekey.keyframe_insert(data_path="value", frame=frame_num)
+            co = base.copy()
+            co[:, 2] += sampler(depth) * strength
             
-            shapekey.value = 0
-            shapekey.keyframe_insert(data_path="value", frame=frame_num + 1)
+            shapekey = obj.shape_key_add(name=f"Frame_{i:05d}", from_mix=False)
+            shapekey.data.foreach_set("co", co.ravel())
+            previous = depth
+            run_start = i
+        
+        if shapekey is not None:
+            self.key_shape_run(obj, shapekey, run_start, frame_count - run_start)
+        
+        # Set frame rate
+        self.set_scene_timing(fps, frame_count)
+    
+    def key_shape_run(self, obj, shapekey, first, length):
+        """Fully on for frames first..first+length-1 (0-based), off on the neighbouring frames"""
+        start = first + 1
+        end = start + length - 1
+        if length == 1:
+            frames, values = (start - 1, start, start + 1), (0.0, 1.0, 0.0)
+        else:
+            frames, values = (start - 1, start, end, end + 1), (0.0, 1.0, 1.0, 0.0)
+        
+        fcurve = ensure_fcurve(obj.data.shape_keys, f'key_blocks["{shapekey.name}"].value')
+        set_keyframes(fcurve, frames, values)
+    
+    def point_cache_path(self, name):
+        """PC2 file for an object: in cache_dir, next to the .blend, or in the temp folder"""
+        if self.cache_dir:
+            directory = self.cache_dir
+        elif bpy.data.filepath:
+            directory = os.path.join(os.path.dirname(bpy.data.filepath), "video_cache")
+        else:
+            directory = os.path.join(tempfile.gettempdir(), "ai_video_to_3d")
+        
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{bpy.path.clean_name(name)}.pc2")
+    
+    def start_point_cache(self, obj, strength):
+        """PointCacheRecorder for obj; pass it to attach_point_cache after the last frame"""
+        return PointCacheRecorder(obj, self.point_cache_path(obj.name), strength)
+    
+    def attach_point_cache(self, recorder, fps):
+        """Close a recorded cache and play it back through a Mesh Cache modifier
+        
+        Returns the cache path.
+        """
+        recorder.close()
+        self.set_scene_timing(fps, recorder.frame_count)
+        
+        modifier = recorder.obj.modifiers.new("VideoDepthCache", 'MESH_CACHE')
+        modifier.cache_format = 'PC2'
+        modifier.frame_start = 1  # First sample shows on scene frame 1
+        try:
+            modifier.filepath = bpy.path.relpath(recorder.filepath) if bpy.data.filepath else recorder.filepath
+        except ValueError:
+            # Cache on another drive than the .blend
+            modifier.filepath = recorder.filepath
+        
+        print(f"Point cache: {recorder.frame_count} frames x {len(recorder.base)} vertices -> {recorder.filepath}")
+        return recorder.filepath
+    
+    def write_point_cache(self, obj, depth_maps, fps, strength):
+        """Animate displacement through a PC2 file and a Mesh Cache modifier
+        
+        Alternative to shape keys for long videos: positions of each frame
+        are appended to the file as depth maps arrive (depth_maps may be a
+        generator), so neither the .blend nor memory grows with the length.
+        Returns the cache path.
+        """
+        with self.start_point_cache(obj, strength) as recorder:
+            for depth in depth_maps:
+                recorder.append(depth)
+        
+        return self.attach_point_cache(recorder, fps)
     
     def text_to_image_generate(self, prompt, style="realistic", output_path=None):
         """Bonus: Text-to-image generation"""
@@ -0,0 +1,41 @@
+import bpy
+import numpy as np
+
+# Bulk F-curve writing: one foreach_set per curve instead of a
+# keyframe_insert call per key.
+
+
+def ensure_action(id_data, name):
+    """The action animating id_data, created and assigned if missing"""
+    anim = id_data.animation_data or id_data.animation_data_create()
+    if anim.action is None:
+        anim.action = bpy.data.actions.new(name)
+    return anim.action
+
+
+def ensure_fcurve(id_data, data_path, index=0):
+    """F-curve of data_path in the action of id_data"""
+    action = ensure_action(id_data, f"{id_data.name}Action")
+
+    if hasattr(action, "fcurve_ensure_for_datablock"):
+        # Blender 4.4+ layered actions (action.fcurves is gone in 5.0)
+        return action.fcurve_ensure_for_datablock(id_data, data_path, index=index)
+
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index)
+    return fcurve
+
+
+def set_keyframes(fcurve, frames, values):
+    """Replace the keyframes of an F-curve with (frame, value) pairs in one call"""
+    fcurve.keyframe_points.clear()
+    fcurve.keyframe_points.add(len(frames))
+
+    co = np.empty((len(frames), 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+    fcurve.keyframe_points.foreach_set("co", co.ravel())
+
+    # Recompute handles after the bulk write
+    fcurve.update()
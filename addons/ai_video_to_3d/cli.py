@@ -0,0 +1,250 @@
+"""Headless, resumable video-to-3D runner
+
+Depth runs in chunks kept in a job folder (see jobs.py), so it can be
+interrupted and resumed, or split across machines and merged:
+
+    cd addons
+    python -m ai_video_to_3d.cli depth clip.mp4 --worker 0 --workers 2 --jobs-dir /share/jobs
+    python -m ai_video_to_3d.cli depth clip.mp4 --worker 1 --workers 2 --jobs-dir /share/jobs
+    python -m ai_video_to_3d.cli status clip.mp4 --jobs-dir /share/jobs
+    python -m ai_video_to_3d.cli merge clip.mp4 --from /mnt/other/jobs/clip_0123456789abcdef
+
+Build the animated mesh (Blender in background mode; computes any missing
+chunks first, removes the job folder afterwards unless --keep-job):
+
+    blender -b -P addons/ai_video_to_3d/cli.py -- build clip.mp4 -o clip.blend --jobs-dir /share/jobs
+
+Depth settings must be the same for every command of one job; they are
+part of the job folder name.
+"""
+
+import argparse
+import os
+import sys
+
+# Allow running as a plain script (blender -P) as well as with python -m
+ADDONS_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if ADDONS_DIR not in sys.path:
+    sys.path.insert(0, ADDONS_DIR)
+
+from ai_video_to_3d.depth import DEPTH_BACKENDS, create_depth_backend
+from ai_video_to_3d.jobs import ChunkedJob, cleanup_jobs
+from ai_video_to_3d.streaming import FrameSampling
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+SCENE_FORMATS = {
+    '.blend': 'BLEND',
+    '.glb': 'GLB',
+    '.gltf': 'GLTF_SEPARATE',
+}
+
+
+def add_depth_arguments(parser):
+    parser.add_argument("video", help="Video file")
+    parser.add_argument("--jobs-dir", default=None,
+                        help="Job folders (default: cache_dir/video_jobs from config/settings.json)")
+
+    sampling = parser.add_argument_group("sampling")
+    sampling.add_argument("--sample-rate", type=int, default=1, help="Use every Nth frame")
+    sampling.add_argument("--target-fps", type=float, default=None,
+                          help="Frames per second to sample (overrides --sample-rate)")
+    sampling.add_argument("--start", type=float, default=0.0, help="In point (seconds)")
+    sampling.add_argument("--end", type=float, default=None, help="Out point (seconds)")
+
+    depth = parser.add_argument_group("depth")
+    depth.add_argument("--depth-backend", choices=DEPTH_BACKENDS, default="HEURISTIC")
+    depth.add_argument("--depth-model", default=None,
+                       help="ONNX model path, or a file name in local_models.path (config/settings.json)")
+    depth.add_argument("--depth-threads", type=int, default=0,
+                       help="ONNX Runtime CPU threads (0 = all cores)")
+    depth.add_argument("--depth-batch", type=int, default=4, help="Frames per model call")
+    depth.add_argument("--frame-max-size", type=int, default=512,
+                       help="Shrink frames to this before depth (0 = full size)")
+    depth.add_argument("--depth-map-size", type=int, default=256, help="Longest side of kept depth maps")
+    depth.add_argument("--chunk-size", type=int, default=64, help="Sampled frames per chunk")
+    depth.add_argument("--depth-workers", type=int, default=1,
+                       help="Depth batches estimated at the same time")
+    depth.add_argument("--processes", action="store_true",
+                       help="Depth workers as processes instead of threads")
+
+
+def parse_args(argv=None):
+    if argv is None:
+        # Blender passes script arguments after "--"
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        prog="ai_video_to_3d.cli",
+        description="Resumable video depth and 3D builds without the UI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    depth = commands.add_parser("depth", help="Compute this worker's unfinished depth chunks")
+    add_depth_arguments(depth)
+    depth.add_argument("--worker", type=int, default=0, help="This worker (0-based)")
+    depth.add_argument("--workers", type=int, default=1, help="Number of workers sharing the job")
+
+    status = commands.add_parser("status", help="Show finished chunk ranges")
+    add_depth_arguments(status)
+
+    merge = commands.add_parser("merge", help="Copy finished chunks from other job folders")
+    add_depth_arguments(merge)
+    merge.add_argument("--from", dest="sources", nargs="+", required=True,
+                       help="Job folders of the same video and settings")
+
+    build = commands.add_parser("build", help="Build the animated mesh (needs Blender)")
+    add_depth_arguments(build)
+    build.add_argument("-o", "--output", required=True, help="Output .blend/.glb/.gltf file")
+    build.add_argument("--strength", type=float, default=1.0, help="Displacement strength")
+    build.add_argument("--mesh-method", choices=("GRID", "ADAPTIVE"), default="GRID")
+    build.add_argument("--max-error", type=float, default=0.01,
+                       help="Max displacement error of the adaptive mesh")
+    build.add_argument("--animation", choices=("SHAPE_KEYS", "POINT_CACHE"), default="SHAPE_KEYS")
+    build.add_argument("--cache-dir", default=None, help="PC2 folder for --animation POINT_CACHE")
+    build.add_argument("--smoothing", type=float, default=0.0, help="Temporal smoothing (0 = off)")
+    build.add_argument("--delta-threshold", type=float, default=0.0,
+                       help="Repeat the previous frame below this mean depth change (0 = keep all)")
+    build.add_argument("--keyframe-interval", type=int, default=30)
+    build.add_argument("--delta-step", type=int, default=1)
+    build.add_argument("--keep-job", action="store_true", help="Keep the job folder after the build")
+    build.add_argument("--keep-scene", action="store_true",
+                       help="Build into the open .blend instead of an empty scene")
+
+    clean = commands.add_parser("clean", help="Remove job folders not updated for a while")
+    clean.add_argument("--jobs-dir", default=None)
+    clean.add_argument("--max-age-days", type=float, default=7.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        ext = os.path.splitext(args.output)[1].lower()
+        if ext not in SCENE_FORMATS:
+            parser.error(f"output must end in {', '.join(SCENE_FORMATS)}")
+        if bpy is None:
+            parser.error("build needs Blender: blender -b -P cli.py -- build ...")
+
+    return args
+
+
+def frame_sampling(args):
+    return FrameSampling(args.sample_rate, args.start, args.end, args.target_fps)
+
+
+def depth_backend(args):
+    return create_depth_backend(args.depth_backend, args.depth_model,
+                                args.depth_threads, args.depth_batch)
+
+
+def create_job(args):
+    return ChunkedJob(args.video, depth_backend(args), frame_sampling(args),
+                      args.frame_max_size or None, args.depth_map_size, args.chunk_size,
+                      args.jobs_dir)
+
+
+def pipeline(args):
+    return {'workers': args.depth_workers, 'processes': args.processes}
+
+
+def print_status(job):
+    status = job.status()
+    ranges = ", ".join(f"{start}-{end - 1}" for start, end in status['ranges']) or "none"
+    print(f"{status['job_dir']}")
+    print(f"  {status['completed']} of {status['chunks']} chunks, {status['frames']} frames; done: {ranges}")
+
+
+def run_depth(args):
+    job = create_job(args)
+    done = job.run(args.worker, args.workers, **pipeline(args))
+    print(f"Worker {args.worker + 1}/{args.workers}: {done} chunks computed")
+    print_status(job)
+    return 0
+
+
+def run_merge(args):
+    job = create_job(args)
+    for source in args.sources:
+        copied = job.merge_from(source)
+        print(f"{source}: {copied} chunks copied")
+    print_status(job)
+    return 0
+
+
+def save_scene(output_path):
+    output_path = os.path.abspath(output_path)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    file_format = SCENE_FORMATS[os.path.splitext(output_path)[1].lower()]
+
+    if file_format == 'BLEND':
+        bpy.ops.wm.save_as_mainfile(filepath=output_path)
+    else:
+        bpy.ops.export_scene.gltf(filepath=output_path, export_format=file_format)
+
+    print(f"Saved: {output_path}")
+
+
+def run_build(args):
+    from ai_video_to_3d.ai_video_to_3d import VideoTo3DGenerator
+
+    if not args.keep_scene:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+
+    generator = VideoTo3DGenerator()
+    generator.depth_backend = depth_backend(args)
+    generator.start_time = args.start
+    generator.end_time = args.end
+    generator.target_fps = args.target_fps
+    generator.frame_max_size = args.frame_max_size or None
+    generator.depth_map_size = args.depth_map_size
+    generator.depth_workers = args.depth_workers
+    generator.depth_processes = args.processes
+    generator.resumable = True
+    generator.jobs_dir = args.jobs_dir
+    generator.chunk_size = args.chunk_size
+    generator.keep_jobs = args.keep_job
+    generator.temporal_smoothing = args.smoothing
+    generator.delta_threshold = args.delta_threshold
+    generator.keyframe_interval = args.keyframe_interval
+    generator.delta_step = args.delta_step
+    generator.mesh_method = args.mesh_method
+    generator.max_error = args.max_error
+    generator.animation_mode = args.animation
+    if args.cache_dir:
+        generator.cache_dir = os.path.abspath(args.cache_dir)
+
+    if bpy.context.collection is None or bpy.context.scene is None:
+        bpy.context.window.scene = bpy.data.scenes.new("Scene")
+
+    obj = generator.create_3d_from_video(os.path.abspath(args.video), args.strength, args.sample_rate)
+    print(f"Created {obj.name}: {len(obj.data.vertices)} vertices")
+
+    save_scene(args.output)
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "clean":
+        removed = cleanup_jobs(args.jobs_dir, args.max_age_days)
+        print(f"Removed {removed} job folders")
+        return 0
+
+    if not os.path.exists(args.video):
+        print(f"Video not found: {args.video}")
+        return 1
+
+    if args.command == "depth":
+        return run_depth(args)
+    if args.command == "status":
+        print_status(create_job(args))
+        return 0
+    if args.command == "merge":
+        return run_merge(args)
+    return run_build(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
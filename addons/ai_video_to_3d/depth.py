@@ -0,0 +1,186 @@
+import abc
+import os
+import time
+
+import cv2
+import numpy as np
+
+from .config import load_settings, resolve_project_path
+
+# Depth backends for video frames
+
+DEPTH_BACKENDS = ('HEURISTIC', 'ONNX')
+
+# MiDaS v2.1 small (256 x 256 input); any model with the same I/O works
+DEFAULT_ONNX_MODEL = "midas_v21_small_256.onnx"
+
+# ImageNet normalization used by MiDaS-style models
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def get_model_path(filename=None):
+    """Depth model path under local_models.path from config/settings.json"""
+    local_models = load_settings().get('ai_services', {}).get('local_models', {})
+    model_dir = resolve_project_path(local_models.get('path', "./ai_models"))
+    return os.path.join(model_dir, filename or local_models.get('depth_model', DEFAULT_ONNX_MODEL))
+
+
+def normalize_depth(depth):
+    """Scale a depth map to uint8 0-255 (255 = closest)"""
+    return cv2.normalize(depth, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+
+
+class DepthBackend(abc.ABC):
+    """Depth estimator interface: BGR frames in, uint8 depth maps (brighter = closer) out
+
+    Subclasses implement estimate_batch_raw; the wrappers keep frame and
+    time counters for throughput reports.
+    """
+
+    name = 'BASE'
+    batch_size = 1
+
+    def __init__(self):
+        self.frames = 0
+        self.seconds = 0.0
+
+    def settings(self):
+        """Settings that change the result"""
+        return {'backend': self.name}
+
+    def estimate(self, img):
+        return self.estimate_batch([img])[0]
+
+    def estimate_batch(self, frames):
+        start = time.perf_counter()
+        depths = self.estimate_batch_raw(frames)
+        self.seconds += time.perf_counter() - start
+        self.frames += len(frames)
+        return depths
+
+    @abc.abstractmethod
+    def estimate_batch_raw(self, frames):
+        """Depth maps for a list of frames (no counters)"""
+
+    @property
+    def fps(self):
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'frames': self.frames,
+            'seconds': self.seconds,
+            'fps': self.fps,
+        }
+
+
+class HeuristicDepthBackend(DepthBackend):
+    """Gradient-magnitude stand-in for a depth model (no extra dependencies)"""
+
+    name = 'HEURISTIC'
+
+    def estimate_batch_raw(self, frames):
+        return [self.estimate_one(img) for img in frames]
+
+    def estimate_one(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+        # Simple gradient-based depth estimation
+        sobelx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+        sobely = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+
+        return normalize_depth(cv2.magnitude(sobelx, sobely))
+
+
+class OnnxDepthBackend(DepthBackend):
+    """Monocular depth model (MiDaS-small class) on the ONNX Runtime CPU provider
+
+    Sessions are shared by every backend with the same model and thread
+    count, so the model loads once per Blender session. Frames are run in
+    batches of batch_size when the model accepts a dynamic batch axis.
+    """
+
+    name = 'ONNX'
+
+    _sessions = {}
+
+    def __init__(self, model_path=None, threads=0, batch_size=4):
+        super().__init__()
+        self.model_path = model_path or get_model_path()
+        self.threads = threads  # 0 = ONNX Runtime default (all cores)
+        self.batch_size = max(1, batch_size)
+
+    def settings(self):
+        return {'backend': self.name, 'model': self.model_path}
+
+    @property
+    def session(self):
+        key = (self.model_path, self.threads)
+        session = OnnxDepthBackend._sessions.get(key)
+        if session is None:
+            session = self.create_session()
+            OnnxDepthBackend._sessions[key] = session
+        return session
+
+    def create_session(self):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("ONNX depth needs onnxruntime: pip install onnxruntime")
+
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Depth model not found: {self.model_path}")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        print(f"Loading depth model: {self.model_path}")
+        return ort.InferenceSession(self.model_path, sess_options=options,
+                                    providers=['CPUExecutionProvider'])
+
+    def input_layout(self):
+        """(name, height, width, dynamic batch) of the model input"""
+        model_input = self.session.get_inputs()[0]
+        _, _, height, width = model_input.shape
+        height = height if isinstance(height, int) else 256
+        width = width if isinstance(width, int) else 256
+        dynamic_batch = not isinstance(model_input.shape[0], int)
+        return model_input.name, height, width, dynamic_batch
+
+    def preprocess(self, frames, height, width):
+        batch = np.empty((len(frames), 3, height, width), dtype=np.float32)
+        for i, img in enumerate(frames):
+            rgb = cv2.cvtColor(cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA),
+                               cv2.COLOR_BGR2RGB)
+            batch[i] = ((rgb.astype(np.float32) / 255.0 - IMAGENET_MEAN) / IMAGENET_STD).transpose(2, 0, 1)
+        return batch
+
+    def estimate_batch_raw(self, frames):
+        input_name, height, width, dynamic_batch = self.input_layout()
+        chunk = self.batch_size if dynamic_batch else 1
+
+        depths = []
+        for start in range(0, len(frames), chunk):
+            batch_frames = frames[start:start + chunk]
+            output = self.session.run(None, {input_name: self.preprocess(batch_frames, height, width)})[0]
+            output = output.reshape(len(batch_frames), output.shape[-2], output.shape[-1])
+
+            # MiDaS predicts inverse depth (larger = closer), like our maps
+            for img, prediction in zip(batch_frames, output):
+                prediction = cv2.resize(prediction, (img.shape[1], img.shape[0]),
+                                        interpolation=cv2.INTER_CUBIC)
+                depths.append(normalize_depth(prediction))
+
+        return depths
+
+
+def create_depth_backend(name='HEURISTIC', model=None, threads=0, batch_size=4):
+    """Depth backend by name (model: a path, or a file name in local_models.path)"""
+    if name == 'ONNX':
+        return OnnxDepthBackend(get_model_path(model), threads, batch_size)
+    if name == 'HEURISTIC':
+        return HeuristicDepthBackend()
+    raise ValueError(f"Unknown depth backend: {name}")
@@ -0,0 +1,285 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+
+import numpy as np
+
+from .config import get_cache_dir
+from .streaming import ChunkSampling, FrameSampling, count_frames, resize_frame, stream_depth
+
+# Bump when the chunk format changes so old jobs are not resumed
+MANIFEST_VERSION = 1
+
+
+def hash_video(path, sample_bytes=1 << 20):
+    """Quick content hash of a video: its size plus the first and last MiB
+
+    Hashing a whole multi-GB video takes longer than a depth chunk, and
+    any re-encode or edit changes the size or the ends.
+    """
+    digest = hashlib.sha256()
+    size = os.path.getsize(path)
+    digest.update(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_bytes))
+        if size > sample_bytes:
+            f.seek(max(sample_bytes, size - sample_bytes))
+            digest.update(f.read(sample_bytes))
+    return digest.hexdigest()
+
+
+def merge_ranges(ranges):
+    """Merge [start, end) ranges that touch or overlap"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ChunkedJob:
+    """Depth maps of one video computed in chunks, resumable from an on-disk manifest
+
+    The job folder (under jobs_dir, named from the video hash and the
+    settings) holds manifest.json and a chunk_NNNNN.npz of depth maps for
+    every finished chunk. Chunk files appear atomically, so after a crash
+    a rerun skips the finished chunks and redoes at most one. Several
+    processes can share a job: worker i of n takes every n-th chunk, and
+    chunks computed elsewhere can be merged in with merge_from().
+
+    Chunks hold the depth maps as estimated (resized to depth_map_size);
+    temporal smoothing runs later over the merged sequence.
+    """
+
+    def __init__(self, video_path, backend, sampling=1, frame_max_size=None, depth_map_size=256,
+                 chunk_size=64, jobs_dir=None):
+        self.video_path = os.path.abspath(video_path)
+        self.backend = backend
+        self.sampling = FrameSampling.coerce(sampling)
+        self.frame_max_size = frame_max_size
+        self.depth_map_size = depth_map_size
+        self.chunk_size = max(1, chunk_size)
+
+        self.video_hash = hash_video(self.video_path)
+        self.params = {
+            'sampling': self.sampling.settings(),
+            'depth': backend.settings(),
+            'frame_max_size': frame_max_size,
+            'depth_map_size': depth_map_size,
+            'chunk_size': self.chunk_size,
+        }
+        self.key = hashlib.sha256(json.dumps({
+            'version': MANIFEST_VERSION,
+            'video': self.video_hash,
+            'params': self.params,
+        }, sort_keys=True).encode()).hexdigest()[:16]
+
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        self.job_dir = os.path.join(jobs_dir or get_cache_dir("video_jobs"), f"{stem}_{self.key}")
+        self.manifest_path = os.path.join(self.job_dir, "manifest.json")
+
+        self.total_frames = count_frames(self.video_path, self.sampling)
+        if not self.total_frames:
+            raise ValueError(f"Cannot split a video without a frame count: {video_path}")
+        self.chunk_count = math.ceil(self.total_frames / self.chunk_size)
+
+    def open(self):
+        """Create the job folder and manifest, or check the existing ones"""
+        os.makedirs(self.job_dir, exist_ok=True)
+
+        manifest = self.read_manifest()
+        if manifest is None:
+            write_json_atomic(self.manifest_path, {
+                'version': MANIFEST_VERSION,
+                'key': self.key,
+                'video': self.video_path,
+                'video_hash': self.video_hash,
+                'params': self.params,
+                'total_frames': self.total_frames,
+                'chunk_count': self.chunk_count,
+                'completed': [],
+                'created': time.time(),
+                'updated': time.time(),
+            })
+        elif manifest.get('key') != self.key:
+            raise ValueError(f"Job folder belongs to another video or settings: {self.job_dir}")
+
+        return self
+
+    def read_manifest(self, path=None):
+        path = path or self.manifest_path
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def chunk_range(self, index):
+        """[start, end) sampled frame indices of a chunk"""
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.total_frames)
+
+    def chunk_path(self, index, job_dir=None):
+        return os.path.join(job_dir or self.job_dir, f"chunk_{index:05d}.npz")
+
+    def completed(self):
+        """Indices of finished chunks (the chunk files are the source of truth)"""
+        return [i for i in range(self.chunk_count) if os.path.exists(self.chunk_path(i))]
+
+    def pending(self, worker=0, worker_count=1):
+        """Unfinished chunks of worker (0-based) out of worker_count"""
+        return [i for i in range(self.chunk_count)
+                if i % worker_count == worker and not os.path.exists(self.chunk_path(i))]
+
+    @property
+    def is_complete(self):
+        return len(self.completed()) == self.chunk_count
+
+    @property
+    def progress(self):
+        return len(self.completed()) / self.chunk_count
+
+    def compute_chunk(self, index, queue_size=8, workers=1, processes=False, sink=None):
+        """Decode and estimate one chunk, yielding its depth maps, then save it"""
+        start, end = self.chunk_range(index)
+        if sink is not None:
+            # Number debug output by position in the whole video
+            chunk_sink, sink = sink, lambda i, frame, depth: chunk_sink(start + i, frame, depth)
+
+        depth_maps = []
+        for _, _, depth in stream_depth(self.video_path, self.backend,
+                                        ChunkSampling(self.sampling, start, end),
+                                        self.frame_max_size, queue_size, sink, workers, processes):
+            depth = resize_frame(depth, self.depth_map_size)
+            depth_maps.append(depth)
+            yield depth
+
+        self.save_chunk(index, depth_maps)
+
+    def save_chunk(self, index, depth_maps):
+        path = self.chunk_path(index)
+        tmp_path = f"{path[:-4]}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, depth=np.stack(depth_maps) if depth_maps else np.empty((0, 0, 0), np.uint8))
+        os.replace(tmp_path, path)
+        self.update_manifest()
+
+    def load_chunk(self, index):
+        with np.load(self.chunk_path(index)) as data:
+            return list(data['depth'])
+
+    def update_manifest(self):
+        """Record finished chunk ranges in the manifest (for people and tools reading it)"""
+        manifest = self.read_manifest() or {}
+        manifest['completed'] = merge_ranges(self.chunk_range(i) for i in self.completed())
+        manifest['updated'] = time.time()
+        write_json_atomic(self.manifest_path, manifest)
+
+    def run(self, worker=0, worker_count=1, **pipeline):
+        """Compute this worker's unfinished chunks, returns how many were done
+
+        pipeline: queue_size, workers, processes, sink of compute_chunk
+        """
+        self.open()
+        done = 0
+        for index in self.pending(worker, worker_count):
+            start, end = self.chunk_range(index)
+            chunk_start = time.perf_counter()
+            for _ in self.compute_chunk(index, **pipeline):
+                pass
+            done += 1
+            print(f"Chunk {index + 1}/{self.chunk_count} (frames {start}-{end - 1}): "
+                  f"{time.perf_counter() - chunk_start:.1f}s")
+        return done
+
+    def stream(self, cleanup=False, **pipeline):
+        """All depth maps in order as (index, None, depth), computing missing chunks
+
+        Finished chunks are read back, the rest computed and saved as they
+        go, so an interrupted stream resumes where it stopped. cleanup
+        removes the job folder once everything was consumed.
+        """
+        self.open()
+        index = 0
+        for chunk in range(self.chunk_count):
+            if os.path.exists(self.chunk_path(chunk)):
+                depth_maps = self.load_chunk(chunk)
+            else:
+                depth_maps = self.compute_chunk(chunk, **pipeline)
+
+            for depth in depth_maps:
+                yield index, None, depth
+                index += 1
+
+        if cleanup:
+            self.cleanup()
+
+    def iter_depth_maps(self):
+        """Depth maps of a finished job, in order"""
+        missing = self.chunk_count - len(self.completed())
+        if missing:
+            raise ValueError(f"Job is missing {missing} of {self.chunk_count} chunks: {self.job_dir}")
+
+        for chunk in range(self.chunk_count):
+            yield from self.load_chunk(chunk)
+
+    def merge_from(self, other_dir):
+        """Copy chunks finished in another job folder of the same video and settings"""
+        manifest = self.read_manifest(os.path.join(other_dir, "manifest.json"))
+        if manifest is None or manifest.get('key') != self.key:
+            raise ValueError(f"Not a job of this video and settings: {other_dir}")
+
+        self.open()
+        copied = 0
+        for index in range(self.chunk_count):
+            source = self.chunk_path(index, other_dir)
+            if os.path.exists(source) and not os.path.exists(self.chunk_path(index)):
+                tmp_path = f"{self.chunk_path(index)[:-4]}.{os.getpid()}.tmp.npz"
+                shutil.copyfile(source, tmp_path)
+                os.replace(tmp_path, self.chunk_path(index))
+                copied += 1
+
+        self.update_manifest()
+        return copied
+
+    def cleanup(self):
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+
+    def status(self):
+        completed = self.completed()
+        return {
+            'job_dir': self.job_dir,
+            'chunks': self.chunk_count,
+            'completed': len(completed),
+            'frames': self.total_frames,
+            'ranges': merge_ranges(self.chunk_range(i) for i in completed),
+        }
+
+
+def cleanup_jobs(jobs_dir=None, max_age_days=7.0):
+    """Remove job folders not updated for max_age_days, returns how many"""
+    jobs_dir = jobs_dir or get_cache_dir("video_jobs")
+    if not os.path.isdir(jobs_dir):
+        return 0
+
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for name in os.listdir(jobs_dir):
+        job_dir = os.path.join(jobs_dir, name)
+        manifest_path = os.path.join(job_dir, "manifest.json")
+        if not os.path.isfile(manifest_path):
+            continue
+        if os.path.getmtime(manifest_path) < cutoff:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            removed += 1
+    return removed
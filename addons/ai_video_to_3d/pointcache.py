@@ -0,0 +1,72 @@
+import struct
+
+import numpy as np
+
+# PC2 point cache files, as read by Blender's Mesh Cache modifier:
+# a 32-byte header, then float32 x, y, z of every point for each sample.
+
+PC2_SIGNATURE = b"POINTCACHE2\0"
+PC2_HEADER = struct.Struct("<12siiffi")  # signature, version, points, start frame, sample rate, samples
+
+
+class PC2Writer:
+    """Write vertex positions to a PC2 file one frame at a time
+
+    Only the current frame is held in memory; the sample count in the
+    header is filled in on close().
+    """
+
+    def __init__(self, filepath, num_points, start_frame=0.0, sample_rate=1.0):
+        self.filepath = filepath
+        self.num_points = num_points
+        self.start_frame = start_frame
+        self.sample_rate = sample_rate
+        self.num_samples = 0
+
+        self.file = open(filepath, "wb")
+        self.write_header()
+
+    def write_header(self):
+        self.file.write(PC2_HEADER.pack(PC2_SIGNATURE, 1, self.num_points,
+                                        self.start_frame, self.sample_rate, self.num_samples))
+
+    def write_frame(self, co):
+        """Append one frame of (num_points, 3) positions"""
+        co = np.ascontiguousarray(co, dtype="<f4")
+        if co.size != self.num_points * 3:
+            raise ValueError(f"Expected {self.num_points} points, got {co.size // 3}")
+        self.file.write(co.tobytes())
+        self.num_samples += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.seek(0)
+        self.write_header()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_pc2(filepath):
+    """Memory-mapped (samples, points, 3) float32 view of a PC2 file, plus its header"""
+    with open(filepath, "rb") as f:
+        signature, version, num_points, start_frame, sample_rate, num_samples = \
+            PC2_HEADER.unpack(f.read(PC2_HEADER.size))
+
+    if signature != PC2_SIGNATURE:
+        raise ValueError(f"Not a PC2 file: {filepath}")
+
+    header = {
+        'points': num_points,
+        'start_frame': start_frame,
+        'sample_rate': sample_rate,
+        'samples': num_samples,
+    }
+    positions = np.memmap(filepath, dtype="<f4", mode="r", offset=PC2_HEADER.size,
+                          shape=(num_samples, num_points, 3))
+    return positions, header
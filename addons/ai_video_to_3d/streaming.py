@@ -0,0 +1,409 @@
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+
+# In-memory video pipeline: decode -> optional resize -> depth -> consumer.
+# Stages are generators; bounded() runs a stage on its own thread with a
+# bounded queue in between, so memory stays capped however long the video.
+
+_END = object()
+
+
+def resize_frame(frame, max_size):
+    """Shrink a frame so its longest side is at most max_size"""
+    height, width = frame.shape[:2]
+    scale = max_size / max(height, width)
+    if scale >= 1.0:
+        return frame
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+class FrameSampling:
+    """Which frames of a video to decode
+
+    Every sample_rate-th frame, or target_fps frames per second when set,
+    between start_time and end_time (seconds, None = to the end).
+    """
+
+    def __init__(self, sample_rate=1, start_time=0.0, end_time=None, target_fps=None,
+                 seek_seconds=5.0):
+        self.sample_rate = max(1, int(sample_rate))
+        self.start_time = max(0.0, start_time or 0.0)
+        self.end_time = end_time
+        self.target_fps = target_fps
+        # Gaps longer than this are seeked over instead of decoded frame by
+        # frame; a seek decodes from the previous keyframe, so it only wins
+        # when the gap is longer than the keyframe interval
+        self.seek_seconds = seek_seconds
+
+    @classmethod
+    def coerce(cls, sampling):
+        """FrameSampling from a FrameSampling or a plain sample rate"""
+        return sampling if isinstance(sampling, cls) else cls(sampling or 1)
+
+    def settings(self):
+        """Settings that change which frames are decoded"""
+        return {
+            'sample_rate': self.sample_rate,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'target_fps': self.target_fps,
+        }
+
+    def step(self, fps):
+        if self.target_fps and fps > 0:
+            return max(1.0, fps / self.target_fps)
+        return float(self.sample_rate)
+
+    def frame_numbers(self, fps, frame_count=0):
+        """Source frame numbers to decode, in order (endless if the length is unknown)"""
+        first = round(self.start_time * fps) if fps > 0 else 0
+        end = frame_count if frame_count > 0 else None
+        if self.end_time is not None and fps > 0:
+            end_frame = math.ceil(self.end_time * fps)
+            end = end_frame if end is None else min(end, end_frame)
+
+        step = self.step(fps)
+        k = 0
+        while True:
+            frame_number = first + round(k * step)
+            if end is not None and frame_number >= end:
+                return
+            yield frame_number
+            k += 1
+
+
+class ChunkSampling(FrameSampling):
+    """Sampled frames start to end (indices into another sampling's frames)"""
+
+    def __init__(self, sampling, start, end):
+        super().__init__(sampling.sample_rate, sampling.start_time, sampling.end_time,
+                         sampling.target_fps, sampling.seek_seconds)
+        self.start = start
+        self.end = end
+
+    def frame_numbers(self, fps, frame_count=0):
+        return islice(super().frame_numbers(fps, frame_count), self.start, self.end)
+
+
+def iter_frames(video_path, sampling=1, max_size=None):
+    """Decode the sampled frames of a video, yielding (index, BGR frame)
+
+    sampling is a FrameSampling or a sample rate (every Nth frame). Skipped
+    frames are only grabbed (no conversion or copy) and long gaps, including
+    the start point, are seeked over by timestamp.
+    """
+    sampling = FrameSampling.coerce(sampling)
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {video_path}")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        seek_frames = sampling.seek_seconds * fps if fps > 0 else None
+
+        position = 0
+        for index, frame_number in enumerate(sampling.frame_numbers(fps, frame_count)):
+            gap = frame_number - position
+            if seek_frames is not None and gap > seek_frames:
+                cap.set(cv2.CAP_PROP_POS_MSEC, frame_number * 1000.0 / fps)
+            else:
+                for _ in range(gap):
+                    if not cap.grab():
+                        return
+            position = frame_number
+
+            ret, frame = cap.read()
+            if not ret:
+                return
+            position += 1
+
+            if max_size:
+                frame = resize_frame(frame, max_size)
+            yield index, frame
+    finally:
+        cap.release()
+
+
+def iter_depth(frames, backend):
+    """(index, frame) -> (index, frame, depth), batched by backend.batch_size"""
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) >= backend.batch_size:
+            yield from _depth_batch(batch, backend)
+            batch = []
+
+    if batch:
+        yield from _depth_batch(batch, backend)
+
+
+def _depth_batch(batch, backend):
+    depths = backend.estimate_batch([frame for _, frame in batch])
+    for (index, frame), depth in zip(batch, depths):
+        yield index, frame, depth
+
+
+def _batches(frames, size):
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def estimate_frames(backend, frames):
+    """Pool task: depth for a list of frames (module level so processes can run it)"""
+    return backend.estimate_batch_raw(frames)
+
+
+def iter_depth_pool(frames, backend, workers=2, processes=False, max_pending=None):
+    """Like iter_depth, with batches estimated concurrently on a thread or process pool
+
+    OpenCV and ONNX Runtime release the GIL, so threads scale for both
+    bundled backends. At most max_pending batches are in flight (default
+    2 per worker); results come back in frame order.
+    """
+    max_pending = max_pending or workers * 2
+    if processes:
+        # Spawn fresh interpreters: forking a running Blender is not safe
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        pool = ThreadPoolExecutor(workers)
+
+    pending = deque()
+    start = time.perf_counter()
+
+    def finish():
+        batch, future = pending.popleft()
+        depths = future.result()
+        backend.frames += len(batch)
+        backend.seconds += time.perf_counter() - start
+        return [(index, frame, depth) for (index, frame), depth in zip(batch, depths)]
+
+    try:
+        for batch in _batches(frames, backend.batch_size):
+            pending.append((batch, pool.submit(estimate_frames, backend, [frame for _, frame in batch])))
+
+            while len(pending) >= max_pending:
+                results = finish()
+                yield from results
+                # Time spent in the consumer is not depth time
+                start = time.perf_counter()
+
+        while pending:
+            results = finish()
+            yield from results
+            start = time.perf_counter()
+    finally:
+        # shutdown's cancel_futures needs Python 3.9
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def bounded(iterable, maxsize=8):
+    """Iterate on a worker thread, handing items over through a bounded queue
+
+    The worker blocks while maxsize items are waiting (backpressure).
+    Exceptions are re-raised in the consumer; closing the returned generator
+    stops the worker and closes the source.
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        error = None
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            error = e
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+        put((_END, error))
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+
+    try:
+        while True:
+            item, error = items.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+
+class PngSink:
+    """Debug sink: writes frames/frame_XXXXX.png and depth_maps/depth_XXXXX.png"""
+
+    def __init__(self, output_dir, write_frames=True):
+        self.frames_dir = os.path.join(output_dir, "frames")
+        self.depth_dir = os.path.join(output_dir, "depth_maps")
+        self.write_frames = write_frames
+        os.makedirs(self.depth_dir, exist_ok=True)
+        if write_frames:
+            os.makedirs(self.frames_dir, exist_ok=True)
+
+    def __call__(self, index, frame, depth):
+        if self.write_frames:
+            cv2.imwrite(os.path.join(self.frames_dir, f"frame_{index:05d}.png"), frame)
+        cv2.imwrite(os.path.join(self.depth_dir, f"depth_{index:05d}.png"), depth)
+
+
+def stream_depth(video_path, backend, sampling=1, max_size=None, queue_size=8, sink=None,
+                 workers=1, processes=False):
+    """Depth for a video without intermediate files, yielding (index, frame, depth)
+
+    Decoding and depth estimation each run on their own thread with at most
+    queue_size items waiting between stages; workers > 1 spreads depth
+    batches over a pool. sink, if given, is called with every
+    (index, frame, depth), e.g. a PngSink for debugging.
+    """
+    frames = bounded(iter_frames(video_path, sampling, max_size), queue_size)
+    if workers > 1 or processes:
+        depth = iter_depth_pool(frames, backend, workers, processes)
+    else:
+        depth = iter_depth(frames, backend)
+    results = bounded(depth, queue_size)
+
+    try:
+        for index, frame, depth in results:
+            if sink is not None:
+                sink(index, frame, depth)
+            yield index, frame, depth
+    finally:
+        # Downstream first, so no stage is left blocked on a full queue
+        results.close()
+        frames.close()
+
+
+def count_frames(video_path, sampling=1):
+    """Number of frames iter_frames will yield (from the container header, 0 if unknown)"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+    if frame_count <= 0:
+        return 0
+    return sum(1 for _ in FrameSampling.coerce(sampling).frame_numbers(fps, frame_count))
+
+
+class DepthJob:
+    """Decode + depth on background threads, collected by polling from the main thread
+
+    Blender data may only be touched on the main thread, so a modal operator
+    or bpy.app.timers callback calls poll() and applies the results. At most
+    queue_size results wait for it; beyond that the pipeline pauses.
+    """
+
+    def __init__(self, video_path, backend, sampling=1, max_size=None, queue_size=8,
+                 sink=None, workers=1, processes=False, source=None):
+        self.backend = backend
+        self.stream_args = (video_path, backend, sampling, max_size, queue_size, sink,
+                            workers, processes)
+        # source: callable returning the (index, frame, depth) iterator to
+        # run instead of stream_depth (e.g. a resumable ChunkedJob)
+        self.source = source
+        self.total_frames = count_frames(video_path, sampling)
+        self.frames_done = 0
+        self.error = None
+        self.done = False
+        self.start_time = None
+        self.end_time = None
+
+        self.results = queue.Queue(queue_size)
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def _run(self):
+        stream = self.source() if self.source else stream_depth(*self.stream_args)
+        try:
+            for item in stream:
+                while not self.cancelled.is_set():
+                    try:
+                        self.results.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if self.cancelled.is_set():
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            stream.close()
+            self.end_time = time.perf_counter()
+            self.done = True
+
+    def poll(self, max_items=None):
+        """Results that are ready now, as (index, frame, depth); never blocks"""
+        items = []
+        while max_items is None or len(items) < max_items:
+            try:
+                items.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        self.frames_done += len(items)
+        return items
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def wait(self):
+        self.thread.join()
+
+    @property
+    def finished(self):
+        """True once the pipeline stopped and every result has been polled"""
+        return self.done and self.results.empty()
+
+    @property
+    def progress(self):
+        if not self.total_frames:
+            return 0.0
+        return min(1.0, self.frames_done / self.total_frames)
+
+    @property
+    def fps(self):
+        end = self.end_time or time.perf_counter()
+        elapsed = end - self.start_time if self.start_time else 0.0
+        return self.frames_done / elapsed if elapsed > 0 else 0.0
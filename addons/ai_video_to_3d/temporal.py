@@ -0,0 +1,170 @@
+import zlib
+from bisect import bisect_right
+
+import cv2
+import numpy as np
+
+# Temporal stage for video depth: smoothing over time against flicker, and
+# compact storage that only keeps what changes between frames.
+
+
+class TemporalFilter:
+    """Edge-preserving exponential smoothing of depth maps over time
+
+    Small frame-to-frame changes (estimator flicker) are averaged with
+    weight strength; changes much larger than sigma depth levels are taken
+    as real motion and followed at once, so moving objects do not ghost.
+    """
+
+    def __init__(self, strength=0.5, sigma=12.0):
+        self.strength = strength
+        self.sigma = sigma
+        self.state = None
+
+    def __call__(self, depth):
+        current = depth.astype(np.float32)
+        if self.state is None or self.state.shape != current.shape:
+            self.state = current
+        else:
+            diff = current - self.state
+            keep = self.strength * np.exp(diff * diff * (-0.5 / (self.sigma * self.sigma)))
+            self.state += (1.0 - keep) * diff
+        return np.rint(self.state).astype(np.uint8)
+
+
+class DepthSequence:
+    """Depth maps of a video stored as keyframes plus quantized deltas
+
+    Each appended frame is stored as one of:
+    - a keyframe (zlib-compressed uint8) every keyframe_interval frames,
+      or when its change does not fit a delta;
+    - nothing, if its mean absolute change from the previous frame is
+      below threshold depth levels in every 16 x 16 block (it repeats
+      that frame; per block, so small moving objects are not missed);
+    - its difference to the previous frame, rounded to quant_step levels
+      and zlib-compressed as int8.
+    Deltas are taken against the decoded previous frame, so rounding never
+    accumulates. Repeated frames decode to the same array object, which
+    lets consumers reuse work (e.g. one shape key for a run of frames).
+    smoothing > 0 runs a TemporalFilter first. With keep=False nothing is
+    stored and append() just returns the decoded frame (streaming use).
+    """
+
+    KEYFRAME, DELTA, REPEAT = 'K', 'D', 'R'
+
+    def __init__(self, smoothing=0.0, keyframe_interval=30, threshold=0.0, quant_step=1, keep=True):
+        self.filter = TemporalFilter(smoothing) if smoothing > 0 else None
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.threshold = threshold
+        self.quant_step = max(1, quant_step)
+        self.keep = keep
+
+        self.entries = []
+        self.keyframe_indices = []
+        self.frame_count = 0
+        self.shape = None
+        self.last = None
+        self.since_keyframe = 0
+        self.nbytes = 0
+        self.counts = {self.KEYFRAME: 0, self.DELTA: 0, self.REPEAT: 0}
+
+    def append(self, depth):
+        """Add the next frame, returns it as it will decode"""
+        if self.filter is not None:
+            depth = self.filter(depth)
+
+        kind, payload, decoded = self.encode(depth)
+
+        self.counts[kind] += 1
+        if kind == self.KEYFRAME:
+            self.nbytes += len(payload[1])
+        elif kind == self.DELTA:
+            self.nbytes += len(payload)
+        self.since_keyframe = 0 if kind == self.KEYFRAME else self.since_keyframe + 1
+        self.last = decoded
+        if self.keep:
+            if kind == self.KEYFRAME:
+                self.keyframe_indices.append(self.frame_count)
+            self.entries.append((kind, payload))
+        self.frame_count += 1
+
+        return decoded
+
+    def encode(self, depth):
+        if (self.last is None or depth.shape != self.shape
+                or self.since_keyframe + 1 >= self.keyframe_interval):
+            return self.keyframe(depth)
+
+        diff = depth.astype(np.int16) - self.last
+        if self.threshold > 0 and self.block_change(diff) < self.threshold:
+            return self.REPEAT, None, self.last
+
+        steps = np.rint(diff / self.quant_step)
+        if np.abs(steps).max() > 127:
+            return self.keyframe(depth)
+
+        steps = steps.astype(np.int8)
+        decoded = self.apply_delta(self.last, steps)
+        return self.DELTA, zlib.compress(steps.tobytes(), 1), decoded
+
+    def block_change(self, diff, block=16):
+        """Largest mean absolute change over block x block tiles"""
+        height, width = diff.shape[:2]
+        size = (max(1, width // block), max(1, height // block))
+        return float(cv2.resize(np.abs(diff).astype(np.float32), size, interpolation=cv2.INTER_AREA).max())
+
+    def keyframe(self, depth):
+        self.shape = depth.shape
+        depth = np.ascontiguousarray(depth, dtype=np.uint8)
+        return self.KEYFRAME, (depth.shape, zlib.compress(depth.tobytes(), 1)), depth
+
+    def apply_delta(self, previous, steps):
+        return np.clip(previous + steps.astype(np.int16) * self.quant_step, 0, 255).astype(np.uint8)
+
+    def __len__(self):
+        return self.frame_count
+
+    def __iter__(self):
+        return self.decode(0)
+
+    def decode(self, start):
+        """Decode frames from entry start on (start must be a keyframe)"""
+        if not self.keep:
+            raise TypeError("DepthSequence(keep=False) does not store frames")
+
+        frame = None
+        for kind, payload in self.entries[start:]:
+            if kind == self.KEYFRAME:
+                shape, data = payload
+                frame = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(shape)
+            elif kind == self.DELTA:
+                steps = np.frombuffer(zlib.decompress(payload), dtype=np.int8).reshape(frame.shape)
+                frame = self.apply_delta(frame, steps)
+            yield frame
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            wanted = set(range(*index.indices(len(self))))
+            return [frame for i, frame in enumerate(self) if i in wanted]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("DepthSequence index out of range")
+
+        # Decode from the closest keyframe at or before index
+        start = self.keyframe_indices[bisect_right(self.keyframe_indices, index) - 1]
+        for i, frame in enumerate(self.decode(start), start):
+            if i == index:
+                return frame
+
+    def stats(self):
+        raw = int(np.prod(self.shape)) * self.frame_count if self.shape else 0
+        return {
+            'frames': self.frame_count,
+            'keyframes': self.counts[self.KEYFRAME],
+            'deltas': self.counts[self.DELTA],
+            'repeats': self.counts[self.REPEAT],
+            'bytes': self.nbytes,
+            'raw_bytes': raw,
+        }
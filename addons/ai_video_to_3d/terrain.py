@@ -0,0 +1,110 @@
+import bpy
+import numpy as np
+
+from .rtin import rtin_mesh
+
+
+class DepthSampler:
+    """Bilinear lookup of fixed UVs (v points up) in depth maps of one size
+
+    The indices and weights are computed once, so sampling many frames of a
+    video only costs the four gathers per frame.
+    """
+
+    def __init__(self, shape, u, v):
+        height, width = shape[:2]
+        self.shape = (height, width)
+
+        x = np.clip(u, 0.0, 1.0) * (width - 1)
+        y = (1.0 - np.clip(v, 0.0, 1.0)) * (height - 1)
+
+        x0 = np.floor(x).astype(np.int32)
+        y0 = np.floor(y).astype(np.int32)
+        x1 = np.minimum(x0 + 1, width - 1)
+        y1 = np.minimum(y0 + 1, height - 1)
+        fx = (x - x0).astype(np.float32)
+        fy = (y - y0).astype(np.float32)
+
+        self.indices = [y0 * width + x0, y0 * width + x1, y1 * width + x0, y1 * width + x1]
+        self.weights = [(1 - fx) * (1 - fy) / 255.0, fx * (1 - fy) / 255.0,
+                        (1 - fx) * fy / 255.0, fx * fy / 255.0]
+
+    def __call__(self, depth_map):
+        """Depth at the UVs, 0-1"""
+        flat = depth_map.reshape(-1)
+        result = flat[self.indices[0]] * self.weights[0]
+        for index, weight in zip(self.indices[1:], self.weights[1:]):
+            result += flat[index] * weight
+        return result
+
+
+def sample_depth(depth_map, u, v):
+    """Bilinear sample of a 0-255 depth map at UVs in [0, 1] (v points up), returns 0-1"""
+    return DepthSampler(depth_map.shape, u, v)(depth_map)
+
+
+def rtin_heights(depth_map, grid_size, strength=1.0):
+    """Resample a depth map onto a grid_size x grid_size grid (row 0 = bottom)"""
+    steps = np.linspace(0.0, 1.0, grid_size, dtype=np.float32)
+    u, v = np.meshgrid(steps, steps)
+    return (sample_depth(depth_map, u.ravel(), v.ravel()) * strength).reshape(u.shape)
+
+
+def adaptive_plane_arrays(errors, max_error, size=2.0):
+    """Flat vertices, triangles and UVs of the adaptive mesh for an errors grid"""
+    used, faces, xy = rtin_mesh(errors, max_error)
+
+    verts = np.zeros((len(used), 3), dtype=np.float32)
+    verts[:, :2] = (xy - 0.5) * size
+
+    return verts, faces, xy
+
+
+def mesh_from_arrays(name, verts, faces, uvs=None):
+    """Build a mesh datablock from NumPy arrays with bulk foreach_set calls"""
+    faces = np.ascontiguousarray(faces, dtype=np.int32)
+    face_count, corners = faces.shape
+
+    mesh = bpy.data.meshes.new(name)
+
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(verts, dtype=np.float32).ravel())
+
+    mesh.loops.add(faces.size)
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set("loop_start", np.arange(0, faces.size, corners, dtype=np.int32))
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", np.full(face_count, corners, dtype=np.int32))
+
+    if uvs is not None:
+        uv_layer = mesh.uv_layers.new(name="UVMap")
+        uv_layer.data.foreach_set("uv", np.ascontiguousarray(uvs[faces.ravel()], dtype=np.float32).ravel())
+
+    mesh.update(calc_edges=True)
+
+    return mesh
+
+
+def get_positions(mesh):
+    """Vertex positions of a mesh as an (N, 3) float32 array"""
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    position = mesh.attributes.get("position")
+    if position is not None:
+        # Blender 3.5+: the attribute is much faster than vertices 'co'
+        position.data.foreach_get("vector", co)
+    else:
+        mesh.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3)
+
+
+def set_positions(mesh, co):
+    """Write (N, 3) vertex positions back to a mesh"""
+    co = np.ascontiguousarray(co, dtype=np.float32).ravel()
+    position = mesh.attributes.get("position")
+    if position is not None:
+        position.data.foreach_set("vector", co)
+    else:
+        mesh.vertices.foreach_set("co", co)
+    mesh.update()
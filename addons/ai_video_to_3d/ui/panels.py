@@ -1,6 +1,53 @@
+import os
 import bpy
 from bpy.types import Panel, Operator
 
+def create_generator(scene):
+    """Create a VideoTo3DGenerator configured from the panel settings"""
+    from ..ai_video_to_3d import VideoTo3DGenerator
+    from ..depth import create_depth_backend
+    generator = VideoTo3DGenerator()
+    generator.depth_backend = create_depth_backend(
+        scene.video_3d_depth_backend,
+        threads=scene.video_3d_depth_threads,
+        batch_size=scene.video_3d_depth_batch
+    )
+    generator.start_time = scene.video_3d_start_time
+    generator.end_time = scene.video_3d_end_time or None
+    generator.target_fps = scene.video_3d_target_fps or None
+    generator.temporal_smoothing = scene.video_3d_temporal_smoothing
+    generator.delta_threshold = scene.video_3d_delta_threshold
+    generator.keyframe_interval = scene.video_3d_keyframe_interval
+    generator.delta_step = scene.video_3d_delta_step
+    generator.resumable = scene.video_3d_resumable
+    if scene.video_3d_jobs_dir:
+        generator.jobs_dir = bpy.path.abspath(scene.video_3d_jobs_dir)
+    generator.depth_workers = scene.video_3d_depth_workers
+    generator.depth_processes = scene.video_3d_depth_processes
+    generator.mesh_method = scene.video_3d_mesh_method
+    generator.max_error = scene.video_3d_max_error
+    generator.animation_mode = scene.video_3d_animation_mode
+    if scene.video_3d_cache_dir:
+        generator.cache_dir = bpy.path.abspath(scene.video_3d_cache_dir)
+    if scene.video_3d_debug_dir:
+        generator.debug_dir = bpy.path.abspath(scene.video_3d_debug_dir)
+    return generator
+
+# DepthJob of the running modal operator (one at a time)
+_active_job = None
+
+def mesh_stats_text(stats):
+    lines = [f"{stats['faces']:,} tris (grid: {stats['grid_faces']:,})"]
+    for max_error, triangles in stats['tradeoff']:
+        lines.append(f"  error {max_error:.4f} → {triangles:,} tris")
+    return "\n".join(lines)
+
+def redraw_view3d(context):
+    for window in context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
 class AIVideoTo3DPanel(Panel):
     """AI Video to 3D Panel"""
     bl_label = "Video to 3D"
@@ -47,10 +94,57 @@ class AIVideoTo3DPanel(Panel):
         box.label(text="Step 2: Generate Depth", icon='IMAGE_ZDEPTH')
         
         row = box.row()
-        row.prop(scene, "video_3d_sample_rate", text="Sample Every N Frames")
+        row.prop(scene, "video_3d_target_fps", text="Target FPS")
+        
+        if not scene.video_3d_target_fps:
+            row = box.row()
+            row.prop(scene, "video_3d_sample_rate", text="Sample Every N Frames")
+        
+        row = box.row(align=True)
+        row.prop(scene, "video_3d_start_time", text="In")
+        row.prop(scene, "video_3d_end_time", text="Out")
+        
+        row = box.row()
+        row.prop(scene, "video_3d_depth_backend", text="Estimator")
+        
+        if scene.video_3d_depth_backend == 'ONNX':
+            row = box.row(align=True)
+            row.prop(scene, "video_3d_depth_threads", text="Threads")
+            row.prop(scene, "video_3d_depth_batch", text="Batch")
+        
+        row = box.row(align=True)
+        row.prop(scene, "video_3d_depth_workers", text="Workers")
+        row.prop(scene, "video_3d_depth_processes", text="Processes", toggle=True)
+        
+        col = box.column(align=True)
+        col.prop(scene, "video_3d_temporal_smoothing", text="Temporal Smoothing")
+        col.prop(scene, "video_3d_delta_threshold", text="Skip Changes Below")
+        col.prop(scene, "video_3d_keyframe_interval", text="Keyframe Every")
+        col.prop(scene, "video_3d_delta_step", text="Delta Step")
+        
+        row = box.row()
+        row.prop(scene, "video_3d_resumable", text="Resumable (chunks on disk)")
+        
+        if scene.video_3d_resumable:
+            row = box.row()
+            row.prop(scene, "video_3d_jobs_dir", text="Jobs Folder")
+        
+        row = box.row()
+        row.prop(scene, "video_3d_debug_dir", text="Debug PNGs")
+        
+        if _active_job is not None:
+            # Progress of the running depth job, with a way out
+            row = box.row(align=True)
+            if hasattr(row, "progress"):
+                row.progress(factor=scene.video_3d_progress,
+                             text=f"{scene.video_3d_progress * 100:.0f}%")
+            else:
+                row.label(text=f"{scene.video_3d_progress * 100:.0f}%")
+            row.operator("video_3d.cancel_job", text="", icon='CANCEL')
         
         row = box.row()
         row.scale_y = 1.2
+        row.enabled = _active_job is None
         row.operator("video_3d.generate_depth", text="Generate Depth Maps", icon='RENDER_STILL')
         
         if scene.video_3d_depth_status:
@@ -66,8 +160,30 @@ class AIVideoTo3DPanel(Panel):
         row = box.row()
         row.prop(scene, "video_3d_displacement", text="Displacement Strength")
         
+        row = box.row()
+        row.prop(scene, "video_3d_mesh_method", text="Mesh")
+        
+        if scene.video_3d_mesh_method == 'ADAPTIVE':
+            row = box.row()
+            row.prop(scene, "video_3d_max_error", text="Max Error")
+            
+            # Triangle count vs. error of the last adaptive build
+            if scene.video_3d_mesh_stats:
+                col = box.column(align=True)
+                col.scale_y = 0.8
+                for line in scene.video_3d_mesh_stats.split("\n"):
+                    col.label(text=line)
+        
+        row = box.row()
+        row.prop(scene, "video_3d_animation_mode", text="Animation")
+        
+        if scene.video_3d_animation_mode == 'POINT_CACHE':
+            row = box.row()
+            row.prop(scene, "video_3d_cache_dir", text="Cache Folder")
+        
         row = box.row()
         row.scale_y = 1.3
+        row.enabled = _active_job is None
         row.operator("video_3d.displace", text="DISPLACE & ANIMATE", icon='PLAY')
         
         layout.separator()
@@ -110,63 +226,212 @@ class ImportVideoOperator(Operator):
         
         return {'FINISHED'}
 
-class GenerateDepthOperator(Operator):
-    """Generate Depth Maps"""
-    bl_idname = "video_3d.generate_depth"
-    bl_label = "Generate Depth Maps"
-    bl_options = {'REGISTER'}
+class DepthJobOperator(Operator):
+    """Base for operators that estimate depth for the whole video
     
-    def execute(self, context):
-        video_path = context.scene.video_3d_path
+    From the UI (invoke) decoding and depth run in the background while a
+    modal timer collects the depth maps, updates progress and finally calls
+    finish() on the main thread; Esc or the cancel button stops the job.
+    execute() runs the same steps blocking, for scripts.
+    """
+    
+    def invoke(self, context, event):
+        global _active_job
+        scene = context.scene
         
-        if not video_path:
+        if not scene.video_3d_path:
             self.report({'ERROR'}, "Please import a video first!")
             return {'CANCELLED'}
         
-        self.report({'INFO'}, "Generating depth maps... This may take a while.")
+        if _active_job is not None:
+            self.report({'ERROR'}, "Depth generation is already running")
+            return {'CANCELLED'}
         
         try:
-            from ..ai_video_to_3d import VideoTo3DGenerator
-            import tempfile
-            
-            generator = VideoTo3DGenerator()
-            temp_dir = tempfile.mkdtemp()
-            
-            sample_rate = context.scene.video_3d_sample_rate
-            frames_dir, frame_count = generator.extract_frames(video_path, temp_dir, sample_rate)
-            depth_dir = generator.generate_depth_maps(frames_dir, temp_dir)
-            
-            context.scene.video_3d_depth_status = f"Generated {frame_count} depth maps"
-            self.report({'INFO'}, f"Depth generation complete: {frame_count} frames")
+            self.generator = create_generator(scene)
+            self.begin(context)
+            self.job = self.generator.start_depth_job(scene.video_3d_path, scene.video_3d_sample_rate)
         except Exception as e:
+            self.abort(context)
             self.report({'ERROR'}, f"Depth generation failed: {e}")
+            return {'CANCELLED'}
+        
+        _active_job = self.job
+        scene.video_3d_progress = 0.0
         
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.job.cancel()
+            return {'RUNNING_MODAL'}
+        
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        
+        # Blender data is only touched here, on the main thread
+        for index, frame, depth in self.job.poll():
+            self.add_depth(self.generator.depth_map(depth))
+        
+        scene = context.scene
+        scene.video_3d_progress = self.job.progress
+        scene.video_3d_depth_status = f"{self.job.frames_done} frames ({self.job.fps:.1f} frames/s)"
+        redraw_view3d(context)
+        
+        if not self.job.finished:
+            return {'PASS_THROUGH'}
+        
+        self.stop(context)
+        
+        if self.job.error is not None:
+            self.abort(context)
+            scene.video_3d_depth_status = f"Failed: {self.job.error}"
+            self.report({'ERROR'}, f"Depth generation failed: {self.job.error}")
+            return {'CANCELLED'}
+        
+        if self.job.cancelled.is_set():
+            self.abort(context)
+            scene.video_3d_depth_status = f"Cancelled after {len(self.depth_maps)} frames"
+            self.report({'WARNING'}, "Depth generation cancelled")
+            return {'CANCELLED'}
+        
+        scene.video_3d_progress = 1.0
+        scene.video_3d_depth_status = f"Generated {len(self.depth_maps)} depth maps ({self.job.fps:.1f} frames/s)"
+        return self.finish_safely(context)
+    
+    def cancel(self, context):
+        self.job.cancel()
+        self.stop(context)
+        self.abort(context)
+    
+    def stop(self, context):
+        global _active_job
+        context.window_manager.event_timer_remove(self.timer)
+        self.job.wait()
+        _active_job = None
+        redraw_view3d(context)
+    
+    def execute(self, context):
+        scene = context.scene
+        
+        if not scene.video_3d_path:
+            self.report({'ERROR'}, "Please import a video first!")
+            return {'CANCELLED'}
+        
+        try:
+            self.generator = create_generator(scene)
+            self.begin(context)
+            for depth in self.generator.iter_depth_maps(scene.video_3d_path, scene.video_3d_sample_rate):
+                self.add_depth(depth)
+        except Exception as e:
+            self.abort(context)
+            self.report({'ERROR'}, f"Depth generation failed: {e}")
+            return {'CANCELLED'}
+        
+        self.generator.print_sequence_stats(self.depth_maps)
+        fps = self.generator.depth_backend.fps
+        scene.video_3d_depth_status = f"Generated {len(self.depth_maps)} depth maps ({fps:.1f} frames/s)"
+        return self.finish_safely(context)
+    
+    def finish_safely(self, context):
+        try:
+            return self.finish(context)
+        except Exception as e:
+            self.report({'ERROR'}, f"{self.bl_label} failed: {e}")
+            return {'CANCELLED'}
+    
+    def begin(self, context):
+        """Prepare for the depth maps, before the first one arrives"""
+        self.depth_maps = self.generator.new_depth_sequence()
+    
+    def add_depth(self, depth):
+        """Take the next depth map (main thread)"""
+        self.depth_maps.append(depth)
+    
+    def abort(self, context):
+        """Undo begin() when the job fails or is cancelled"""
+    
+    def finish(self, context):
+        """Use the depth maps once they are all generated"""
+        self.report({'INFO'}, f"Depth generation complete: {len(self.depth_maps)} frames")
         return {'FINISHED'}
 
-class DisplaceOperator(Operator):
+class GenerateDepthOperator(DepthJobOperator):
+    """Generate Depth Maps"""
+    bl_idname = "video_3d.generate_depth"
+    bl_label = "Generate Depth Maps"
+    bl_options = {'REGISTER'}
+
+class DisplaceOperator(DepthJobOperator):
     """Displace & Animate"""
     bl_idname = "video_3d.displace"
     bl_label = "Displace & Animate"
     bl_options = {'REGISTER', 'UNDO'}
     
-    def execute(self, context):
-        video_path = context.scene.video_3d_path
+    def begin(self, context):
+        scene = context.scene
+        self.recorder = None
+        self.video_info = self.generator.import_video(scene.video_3d_path)
+        
+        if not self.generator.streams_point_cache():
+            super().begin(context)
+            return
+        
+        # Write each frame into the point cache as it arrives instead of
+        # keeping every depth map until the end
+        self.depth_maps = self.generator.new_depth_sequence(keep=False)
+        obj = self.generator.create_grid_plane(f"VideoDepth_{self.video_info['name']}")
+        self.recorder = self.generator.start_point_cache(obj, scene.video_3d_displacement)
+    
+    def add_depth(self, depth):
+        depth = self.depth_maps.append(depth)
+        if self.recorder is not None:
+            self.recorder.append(depth)
+    
+    def abort(self, context):
+        recorder = getattr(self, "recorder", None)
+        if recorder is None:
+            return
+        
+        recorder.close()
+        bpy.data.objects.remove(recorder.obj)
+        if os.path.exists(recorder.filepath):
+            os.remove(recorder.filepath)
+        self.recorder = None
+    
+    def finish(self, context):
+        scene = context.scene
         
-        if not video_path:
-            self.report({'ERROR'}, "Please import a video first!")
-            return {'CANCELLED'}
+        if self.recorder is not None:
+            obj = self.recorder.obj
+            fps = self.generator.playback_fps(self.video_info, scene.video_3d_sample_rate)
+            self.generator.attach_point_cache(self.recorder, fps)
+        else:
+            obj = self.generator.create_3d_from_depth_maps(self.video_info, self.depth_maps,
+                                                           scene.video_3d_displacement,
+                                                           scene.video_3d_sample_rate)
         
-        try:
-            from ..ai_video_to_3d import VideoTo3DGenerator
-            generator = VideoTo3DGenerator()
-            
-            strength = context.scene.video_3d_displacement
-            obj = generator.create_3d_from_video(video_path, strength)
-            
-            self.report({'INFO'}, f"Created 3D animation: {obj.name}")
-        except Exception as e:
-            self.report({'ERROR'}, f"3D creation failed: {e}")
+        if self.generator.last_mesh_stats:
+            scene.video_3d_mesh_stats = mesh_stats_text(self.generator.last_mesh_stats)
         
+        self.report({'INFO'}, f"Created 3D animation: {obj.name}")
+        return {'FINISHED'}
+
+class CancelJobOperator(Operator):
+    """Stop the running depth generation"""
+    bl_idname = "video_3d.cancel_job"
+    bl_label = "Cancel"
+    bl_options = {'REGISTER'}
+    
+    @classmethod
+    def poll(cls, context):
+        return _active_job is not None
+    
+    def execute(self, context):
+        _active_job.cancel()
         return {'FINISHED'}
 
 class GenerateImageOperator(Operator):
@@ -240,6 +505,7 @@ def register():
     bpy.utils.register_class(ImportVideoOperator)
     bpy.utils.register_class(GenerateDepthOperator)
     bpy.utils.register_class(DisplaceOperator)
+    bpy.utils.register_class(CancelJobOperator)
     bpy.utils.register_class(GenerateImageOperator)
     bpy.utils.register_class(CheckDependenciesOperator)
     bpy.utils.register_class(InstallDependenciesOperator)
@@ -273,11 +539,135 @@ def register():
         max=30
     )
     
+    bpy.types.Scene.video_3d_target_fps = bpy.props.FloatProperty(
+        name="Target FPS",
+        description="Frames per second to sample (0 = use Sample Rate)",
+        default=0.0,
+        min=0.0,
+        max=120.0
+    )
+    
+    bpy.types.Scene.video_3d_start_time = bpy.props.FloatProperty(
+        name="In Point",
+        description="Start of the sampled range (seconds)",
+        default=0.0,
+        min=0.0,
+        unit='TIME_ABSOLUTE'
+    )
+    
+    bpy.types.Scene.video_3d_end_time = bpy.props.FloatProperty(
+        name="Out Point",
+        description="End of the sampled range (seconds, 0 = end of video)",
+        default=0.0,
+        min=0.0,
+        unit='TIME_ABSOLUTE'
+    )
+    
     bpy.types.Scene.video_3d_depth_status = bpy.props.StringProperty(
         name="Depth Status",
         default=""
     )
     
+    bpy.types.Scene.video_3d_depth_backend = bpy.props.EnumProperty(
+        name="Depth Estimator",
+        items=[
+            ('HEURISTIC', 'Heuristic (Fast)', 'Edge-based estimate, no model needed'),
+            ('ONNX', 'ONNX Model (CPU)', 'MiDaS-style depth model from local_models.path in config/settings.json (needs onnxruntime)'),
+        ],
+        default='HEURISTIC'
+    )
+    
+    bpy.types.Scene.video_3d_depth_threads = bpy.props.IntProperty(
+        name="Threads",
+        description="ONNX Runtime CPU threads (0 = all cores)",
+        default=0,
+        min=0,
+        max=64
+    )
+    
+    bpy.types.Scene.video_3d_depth_batch = bpy.props.IntProperty(
+        name="Batch Size",
+        description="Frames per model call",
+        default=4,
+        min=1,
+        max=64
+    )
+    
+    bpy.types.Scene.video_3d_depth_workers = bpy.props.IntProperty(
+        name="Workers",
+        description="Depth batches estimated at the same time",
+        default=2,
+        min=1,
+        max=32
+    )
+    
+    bpy.types.Scene.video_3d_depth_processes = bpy.props.BoolProperty(
+        name="Use Processes",
+        description="Run depth workers as separate processes instead of threads",
+        default=False
+    )
+    
+    bpy.types.Scene.video_3d_progress = bpy.props.FloatProperty(
+        name="Progress",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR'
+    )
+    
+    bpy.types.Scene.video_3d_temporal_smoothing = bpy.props.FloatProperty(
+        name="Temporal Smoothing",
+        description="Average depth over time against flicker (large changes are followed at once)",
+        default=0.0,
+        min=0.0,
+        max=0.95,
+        subtype='FACTOR'
+    )
+    
+    bpy.types.Scene.video_3d_delta_threshold = bpy.props.FloatProperty(
+        name="Skip Threshold",
+        description="Frames whose mean depth change stays below this many levels in every part of the image repeat the previous frame (0 = keep all)",
+        default=0.0,
+        min=0.0,
+        max=20.0
+    )
+    
+    bpy.types.Scene.video_3d_keyframe_interval = bpy.props.IntProperty(
+        name="Keyframe Interval",
+        description="Store a full depth map every N frames, deltas in between",
+        default=30,
+        min=1,
+        max=600
+    )
+    
+    bpy.types.Scene.video_3d_delta_step = bpy.props.IntProperty(
+        name="Delta Step",
+        description="Depth levels per stored delta step (1 = lossless deltas)",
+        default=1,
+        min=1,
+        max=16
+    )
+    
+    bpy.types.Scene.video_3d_resumable = bpy.props.BoolProperty(
+        name="Resumable",
+        description="Save depth in chunks so an interrupted run continues where it stopped (removed when complete)",
+        default=False
+    )
+    
+    bpy.types.Scene.video_3d_jobs_dir = bpy.props.StringProperty(
+        name="Jobs Folder",
+        description="Where chunked jobs are kept (empty = cache folder from config/settings.json)",
+        default="",
+        subtype='DIR_PATH'
+    )
+    
+    bpy.types.Scene.video_3d_debug_dir = bpy.props.StringProperty(
+        name="Debug Output",
+        description="Also write frame and depth PNGs to this folder (leave empty to keep everything in memory)",
+        default="",
+        subtype='DIR_PATH'
+    )
+    
     bpy.types.Scene.video_3d_displacement = bpy.props.FloatProperty(
         name="Displacement",
         description="Displacement strength",
@@ -286,6 +676,45 @@ def register():
         max=5.0
     )
     
+    bpy.types.Scene.video_3d_mesh_method = bpy.props.EnumProperty(
+        name="Mesh Method",
+        items=[
+            ('GRID', 'Uniform Grid', 'Subdivided plane, same detail everywhere'),
+            ('ADAPTIVE', 'Adaptive', 'Fewer triangles in flat areas, within a max displacement error'),
+        ],
+        default='GRID'
+    )
+    
+    bpy.types.Scene.video_3d_max_error = bpy.props.FloatProperty(
+        name="Max Error",
+        description="Largest displacement error of the adaptive mesh at any grid point, checked on up to 32 frames spread over the clip",
+        default=0.01,
+        min=0.0005,
+        max=0.5,
+        precision=4
+    )
+    
+    bpy.types.Scene.video_3d_animation_mode = bpy.props.EnumProperty(
+        name="Animation",
+        items=[
+            ('SHAPE_KEYS', 'Shape Keys', 'One shape key per frame, stored in the .blend'),
+            ('POINT_CACHE', 'Point Cache (PC2)', 'Frames streamed to a .pc2 file played by a Mesh Cache modifier (long videos)'),
+        ],
+        default='SHAPE_KEYS'
+    )
+    
+    bpy.types.Scene.video_3d_cache_dir = bpy.props.StringProperty(
+        name="Cache Folder",
+        description="Where to write .pc2 files (empty = video_cache next to the .blend)",
+        default="",
+        subtype='DIR_PATH'
+    )
+    
+    bpy.types.Scene.video_3d_mesh_stats = bpy.props.StringProperty(
+        name="Mesh Stats",
+        default=""
+    )
+    
     bpy.types.Scene.video_3d_prompt = bpy.props.StringProperty(
         name="Prompt",
         description="Text prompt for image generation",
@@ -307,6 +736,7 @@ def unregister():
     bpy.utils.unregister_class(ImportVideoOperator)
     bpy.utils.unregister_class(GenerateDepthOperator)
     bpy.utils.unregister_class(DisplaceOperator)
+    bpy.utils.unregister_class(CancelJobOperator)
     bpy.utils.unregister_class(GenerateImageOperator)
     bpy.utils.unregister_class(CheckDependenciesOperator)
     bpy.utils.unregister_class(InstallDependenciesOperator)
@@ -315,7 +745,28 @@ def unregister():
     del bpy.types.Scene.video_3d_path
     del bpy.types.Scene.video_3d_info
     del bpy.types.Scene.video_3d_sample_rate
+    del bpy.types.Scene.video_3d_target_fps
+    del bpy.types.Scene.video_3d_start_time
+    del bpy.types.Scene.video_3d_end_time
     del bpy.types.Scene.video_3d_depth_status
+    del bpy.types.Scene.video_3d_depth_backend
+    del bpy.types.Scene.video_3d_depth_threads
+    del bpy.types.Scene.video_3d_depth_batch
+    del bpy.types.Scene.video_3d_depth_workers
+    del bpy.types.Scene.video_3d_depth_processes
+    del bpy.types.Scene.video_3d_progress
+    del bpy.types.Scene.video_3d_temporal_smoothing
+    del bpy.types.Scene.video_3d_delta_threshold
+    del bpy.types.Scene.video_3d_keyframe_interval
+    del bpy.types.Scene.video_3d_delta_step
+    del bpy.types.Scene.video_3d_resumable
+    del bpy.types.Scene.video_3d_jobs_dir
+    del bpy.types.Scene.video_3d_debug_dir
     del bpy.types.Scene.video_3d_displacement
+    del bpy.types.Scene.video_3d_mesh_method
+    del bpy.types.Scene.video_3d_max_error
+    del bpy.types.Scene.video_3d_animation_mode
+    del bpy.types.Scene.video_3d_cache_dir
+    del bpy.types.Scene.video_3d_mesh_stats
     del bpy.types.Scene.video_3d_prompt
     del bpy.types.Scene.video_3d_image_style
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the image analyzers of AI Image to 3D Scene
+
+Compares the shared-feature analyzers (one grayscale conversion, float32
+gradients, cv2 statistics) with the previous per-analyzer code (grayscale
+converted in every analyzer, float64 Sobel, NumPy mean/std) on the same
+full-resolution image. Reports time and peak traced memory (NumPy/OpenCV
+arrays seen by tracemalloc).
+
+Usage:
+    python scripts/benchmark_analysis.py
+    python scripts/benchmark_analysis.py --sizes 12 48 --repeat 1
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+ADDONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "addons")
+sys.path.insert(0, os.path.abspath(ADDONS_DIR))
+
+from ai_image_to_scene.core.analysis import ImageAnalyzer  # noqa: E402
+from ai_image_to_scene.core.detection import detect_objects  # noqa: E402
+from ai_image_to_scene.core.features import ImageFeatures  # noqa: E402
+from ai_image_to_scene.core.palette import extract_palette  # noqa: E402
+from benchmark_palette import make_test_image  # noqa: E402
+
+
+def legacy_analyzers(img):
+    """Previous analyzer code: every step redoes its own grayscale/statistics"""
+    extract_palette(img)
+
+    detect_objects(img)
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    depth = cv2.normalize(gray.astype(np.float32), None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
+    sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+    gradient = np.sqrt(sobelx**2 + sobely**2)
+    gradient = cv2.normalize(gradient, None, 0, 100, cv2.NORM_MINMAX).astype(np.uint8)
+    depth = cv2.GaussianBlur(cv2.addWeighted(depth, 0.7, gradient, 0.3, 0), (7, 7), 0)
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    cv2.minMaxLoc(gray)
+
+    np.mean(img, axis=(0, 1))
+    np.std(img)
+
+    return depth
+
+
+def shared_analyzers(img):
+    """Current analyzer code on one ImageFeatures"""
+    analyzer = ImageAnalyzer()
+    features = ImageFeatures(img)
+
+    analyzer.extract_dominant_colors(img)
+    analyzer.detect_objects_basic(img, features)
+    depth = analyzer.generate_depth_map(img, features)
+    analyzer.estimate_lighting(img, features)
+    analyzer.classify_scene(img, features)
+
+    return depth
+
+
+def measure(run, img, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(img)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    depth = run(img)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak, depth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image analyzers")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 12, 48],
+                        help="Image sizes in megapixels")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'MP':>5} {'analyzers':<10} {'seconds':>9} {'peak MB':>9}  depth diff")
+    for megapixels in args.sizes:
+        img = make_test_image(megapixels)
+
+        seconds, peak, legacy_depth = measure(legacy_analyzers, img, args.repeat)
+        print(f"{megapixels:>5g} {'legacy':<10} {seconds:>9.3f} {peak / 2**20:>9.1f}")
+
+        seconds, peak, depth = measure(shared_analyzers, img, args.repeat)
+        diff = np.abs(depth.astype(np.int16) - legacy_depth).max()
+        print(f"{megapixels:>5g} {'shared':<10} {seconds:>9.3f} {peak / 2**20:>9.1f}  max {diff}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark dominant-color extraction for AI Image to 3D Scene
+
+Compares the legacy cv2.kmeans palette with the histogram and sampled
+engines at 1, 12 and 48 megapixels.
+
+Usage:
+    python scripts/benchmark_palette.py
+    python scripts/benchmark_palette.py --sizes 1 12 --skip-legacy
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "..", "addons", "ai_image_to_scene", "core")
+sys.path.insert(0, os.path.abspath(CORE_DIR))
+
+from palette import extract_palette  # noqa: E402
+
+
+def make_test_image(megapixels, seed=0):
+    """Photo-like test image: smooth color regions plus sensor noise"""
+    width = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (12, 18, 3), dtype=np.uint8)
+    img = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(-8, 9, (height, width, 1), dtype=np.int16)
+    return np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def time_palette(img, method, repeat):
+    best = None
+    palette = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        palette = extract_palette(img, k=5, method=method)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, palette
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark palette extraction")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 12, 48],
+                        help="Image sizes in megapixels")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="Skip the (slow) cv2.kmeans baseline")
+    args = parser.parse_args()
+
+    methods = ['histogram', 'sample']
+    if not args.skip_legacy:
+        methods.insert(0, 'kmeans')
+
+    print(f"{'MP':>5} {'method':<10} {'seconds':>9} {'deterministic':>14}  palette[0]")
+    for megapixels in args.sizes:
+        img = make_test_image(megapixels)
+        for method in methods:
+            # The legacy path is too slow to repeat at large sizes
+            repeat = 1 if method == 'kmeans' else args.repeat
+            seconds, palette = time_palette(img, method, repeat)
+            _, again = time_palette(img, method, 1)
+            same = "yes" if again == palette else "no"
+            print(f"{megapixels:>5g} {method:<10} {seconds:>9.3f} {same:>14}  {palette[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The addons are packages under addons/ (see setup.py package_dir)
+ADDONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addons")
+if ADDONS_DIR not in sys.path:
+    sys.path.insert(0, ADDONS_DIR)
@@ -0,0 +1,37 @@
+"""Image-to-scene analysis pipeline (plain Python, no Blender needed)"""
+import numpy as np
+import pytest
+
+from ai_image_to_scene.core.analysis import DEPTH_QUALITY_RESOLUTIONS, ImageAnalyzer, ImagePyramid
+
+
+def test_pyramid_level_for_resizes_to_the_target_size():
+    pyramid = ImagePyramid(np.zeros((3000, 4000, 3), dtype=np.uint8))
+
+    assert pyramid.level_for(1024).shape[:2] == (768, 1024)
+    assert pyramid.level_for(300).shape[:2] == (225, 300)
+    # Same size twice gives the same array (so analyzers share features)
+    assert pyramid.level_for(1024) is pyramid.level_for(1024)
+    assert pyramid.level_for(None) is pyramid.base
+    assert pyramid.level_for(8000) is pyramid.base
+
+
+def test_pyramid_scale_maps_back_to_the_base_image():
+    pyramid = ImagePyramid(np.zeros((3000, 4000, 3), dtype=np.uint8))
+
+    assert pyramid.scale_of(pyramid.level_for(1000)) == pytest.approx((4.0, 4.0))
+
+
+@pytest.mark.parametrize("quality", sorted(DEPTH_QUALITY_RESOLUTIONS))
+def test_depth_quality_sets_the_depth_map_size(quality):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (1500, 3000, 3), dtype=np.uint8)
+
+    analyzer = ImageAnalyzer()
+    analyzer.set_depth_quality(quality)
+    analysis = analyzer.analyze_array(img)
+
+    size = DEPTH_QUALITY_RESOLUTIONS[quality]
+    assert analysis['analysis_report']['analyzers']['depth_map']['resolution'] == (size, size // 2)
+    assert analysis['depth_map'].shape[:2] == (size // 2, size)
+    assert analysis['dimensions'] == (3000, 1500)
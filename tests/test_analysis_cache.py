@@ -0,0 +1,73 @@
+"""On-disk analysis cache for image-to-scene"""
+import threading
+
+import cv2
+import numpy as np
+
+from ai_image_to_scene.core.analysis import ImageAnalyzer
+from ai_image_to_scene.core.analysis_cache import AnalysisCache
+from ai_image_to_scene.core.batch import iter_batch_analysis
+
+
+def write_image(path, seed=0):
+    rng = np.random.default_rng(seed)
+    cv2.imwrite(str(path), rng.integers(0, 256, (120, 160, 3), dtype=np.uint8))
+    return str(path)
+
+
+def test_second_analysis_comes_from_the_cache(tmp_path):
+    image = write_image(tmp_path / "a.png")
+    analyzer = ImageAnalyzer()
+    analyzer.cache = AnalysisCache(str(tmp_path / "cache"))
+
+    first = analyzer.analyze_image_with_ai(image)
+    second = analyzer.analyze_image_with_ai(image)
+
+    assert 'cached' not in first and second['cached']
+    assert np.array_equal(first['depth_map'], second['depth_map'])
+    assert second['dominant_colors'] == first['dominant_colors']
+    assert (analyzer.cache.hits, analyzer.cache.misses) == (1, 1)
+
+
+def test_concurrent_writers_of_one_entry_do_not_collide(tmp_path):
+    analysis = ImageAnalyzer().analyze_array(np.full((64, 64, 3), 128, dtype=np.uint8))
+    cache = AnalysisCache(str(tmp_path))
+    errors = []
+
+    def store():
+        try:
+            for _ in range(20):
+                cache.put("same", analysis)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=store) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.get("same") is not None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["same.json", "same.npz"]
+
+
+def test_failed_cache_write_does_not_fail_the_analysis(tmp_path):
+    image = write_image(tmp_path / "a.png")
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    analyzer = ImageAnalyzer()
+    analyzer.cache = AnalysisCache(str(blocker / "cache"))
+
+    assert analyzer.analyze_image_with_ai(image)['depth_map'] is not None
+
+
+def test_batch_with_identical_images_shares_one_entry(tmp_path):
+    images = [write_image(tmp_path / name) for name in ("a.png", "b.png", "c.png")]
+    analyzer = ImageAnalyzer()
+    analyzer.cache = AnalysisCache(str(tmp_path / "cache"))
+
+    results = list(iter_batch_analysis(images, analyzer, max_workers=3))
+
+    assert [r['error'] for r in results] == [None] * 3
+    assert len(analyzer.cache.entries()) == 1
@@ -0,0 +1,61 @@
+"""Process-pool batch analysis for image-to-scene"""
+import cv2
+import numpy as np
+
+from ai_image_to_scene.core.analysis import ImageAnalyzer
+from ai_image_to_scene.core.analysis_cache import AnalysisCache
+from ai_image_to_scene.core.batch import iter_batch_analysis
+from ai_image_to_scene.core.depth import OnnxDepthBackend
+
+
+def write_image(path, seed=0):
+    rng = np.random.default_rng(seed)
+    cv2.imwrite(str(path), rng.integers(0, 256, (120, 160, 3), dtype=np.uint8))
+    return str(path)
+
+
+def test_workers_get_the_depth_threads_and_batch_size(tmp_path):
+    analyzer = ImageAnalyzer()
+    analyzer.depth_backend = OnnxDepthBackend(str(tmp_path / "depth.onnx"), threads=2, batch_size=8)
+
+    worker = ImageAnalyzer()
+    worker.apply_settings(analyzer.analysis_settings())
+
+    assert isinstance(worker.depth_backend, OnnxDepthBackend)
+    assert worker.depth_backend.model_path == analyzer.depth_backend.model_path
+    assert (worker.depth_backend.threads, worker.depth_backend.batch_size) == (2, 8)
+
+
+def test_depth_threads_do_not_change_the_cache_key(tmp_path):
+    image = write_image(tmp_path / "a.png")
+    keys = []
+    for threads in (1, 4):
+        analyzer = ImageAnalyzer()
+        analyzer.cache = AnalysisCache(str(tmp_path / "cache"))
+        analyzer.depth_backend = OnnxDepthBackend(str(tmp_path / "depth.onnx"), threads=threads)
+        keys.append(analyzer.cache_key(image))
+
+    assert keys[0] == keys[1]
+
+
+def test_results_carry_their_path_and_errors(tmp_path):
+    images = [write_image(tmp_path / "a.png"), str(tmp_path / "missing.png")]
+
+    results = {r['path']: r for r in iter_batch_analysis(images, ImageAnalyzer(), max_workers=2)}
+
+    assert results[images[0]]['error'] is None
+    assert results[images[0]]['analysis']['depth_map'] is not None
+    assert "Cannot load image" in results[images[1]]['error']
+    assert results[images[1]]['analysis'] is None
+
+
+def test_stopping_early_cancels_queued_images(tmp_path):
+    images = [write_image(tmp_path / f"{i}.png", seed=i) for i in range(12)]
+    analyzer = ImageAnalyzer()
+    analyzer.cache = AnalysisCache(str(tmp_path / "cache"))
+
+    results = iter_batch_analysis(images, analyzer, max_workers=1)
+    next(results)
+    results.close()
+
+    assert len(analyzer.cache.entries()) < len(images)
@@ -0,0 +1,74 @@
+"""Headless image-to-scene runner"""
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from ai_image_to_scene import cli
+
+
+def write_image(path, seed=0):
+    rng = np.random.default_rng(seed)
+    cv2.imwrite(str(path), rng.integers(0, 256, (120, 160, 3), dtype=np.uint8))
+    return str(path)
+
+
+def test_analysis_only_writes_json_and_depth_per_image(tmp_path):
+    for i, name in enumerate(("a.png", "b.jpg")):
+        write_image(tmp_path / name, seed=i)
+    output = tmp_path / "out"
+
+    status = cli.main([str(tmp_path), "-o", str(output), "--analysis-only",
+                       "--workers", "1", "--no-cache", "--palette", "kmeans", "--seed", "3"])
+
+    assert status == 0
+    assert sorted(os.listdir(output)) == ["a.json", "a_depth.npy", "b.json", "b_depth.npy"]
+    data = json.loads((output / "a.json").read_text())
+    assert data['image'] == str(tmp_path / "a.png")
+    assert data['depth_map'] == "a_depth.npy"
+    assert np.load(output / "a_depth.npy").dtype == np.uint8
+
+
+def test_unreadable_image_fails_the_run(tmp_path):
+    write_image(tmp_path / "good.png")
+    (tmp_path / "broken.png").write_bytes(b"not a png")
+
+    status = cli.main([str(tmp_path / "*.png"), "-o", str(tmp_path / "out"), "--analysis-only",
+                       "--workers", "1", "--no-cache"])
+
+    assert status == 1
+    assert sorted(os.listdir(tmp_path / "out")) == ["good.json", "good_depth.npy"]
+
+
+def test_no_images_found(tmp_path):
+    assert cli.main([str(tmp_path), "-o", str(tmp_path / "out"), "--analysis-only"]) == 1
+
+
+def test_scene_output_needs_a_known_extension(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.parse_args(["photo.jpg", "-o", str(tmp_path / "scene.obj")])
+
+
+def test_options_reach_the_analyzer(tmp_path):
+    args = cli.parse_args(["photo.jpg", "-o", str(tmp_path), "--analysis-only", "--mode", "full",
+                           "--depth-quality", "high", "--cache-dir", str(tmp_path / "cache")])
+
+    analyzer = cli.configure(cli.ImageAnalyzer(), args)
+
+    assert analyzer.analysis_mode == "full"
+    assert analyzer.analyzer_resolutions['depth_map'] == cli.DEPTH_QUALITY_RESOLUTIONS['high']
+    assert analyzer.cache.cache_dir == str(tmp_path / "cache")
+
+
+def test_scene_is_saved_as_blend(tmp_path):
+    pytest.importorskip("bpy")
+    write_image(tmp_path / "a.png")
+    output = tmp_path / "scene.blend"
+
+    status = cli.main([str(tmp_path / "a.png"), "-o", str(output), "--no-cache",
+                       "--mesh-resolution", "16"])
+
+    assert status == 0
+    assert output.exists()
@@ -0,0 +1,131 @@
+"""Depth backends of the image and video addons"""
+import time
+
+import numpy as np
+import pytest
+
+from ai_image_to_scene.core import depth as image_depth
+from ai_video_to_3d import depth as video_depth
+from ai_video_to_3d.streaming import iter_depth_pool
+
+
+@pytest.mark.parametrize("depth", [image_depth, video_depth])
+def test_backends_must_implement_estimate_batch_raw(depth):
+    class Incomplete(depth.DepthBackend):
+        name = 'INCOMPLETE'
+
+    with pytest.raises(TypeError):
+        depth.DepthBackend()
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("depth", [image_depth, video_depth])
+def test_heuristic_backend_counts_frames(depth):
+    backend = depth.create_depth_backend('HEURISTIC')
+    frames = [np.random.default_rng(i).integers(0, 256, (48, 64, 3), dtype=np.uint8) for i in range(3)]
+
+    depths = backend.estimate_batch(frames) + [backend.estimate(frames[0])]
+
+    assert [d.shape for d in depths] == [(48, 64)] * 4
+    assert all(d.dtype == np.uint8 for d in depths)
+    assert backend.stats()['frames'] == 4
+
+
+class SlowBackend(video_depth.DepthBackend):
+    name = 'SLOW'
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def estimate_batch_raw(self, frames):
+        self.calls += 1
+        time.sleep(0.01)
+        return [np.zeros(frame.shape[:2], dtype=np.uint8) for frame in frames]
+
+
+def test_stopping_the_depth_pool_early_cancels_queued_batches():
+    backend = SlowBackend()
+    frames = ((i, np.zeros((8, 8, 3), dtype=np.uint8)) for i in range(1000))
+
+    results = iter_depth_pool(frames, backend, workers=1, max_pending=50)
+    assert next(results)[0] == 0
+    results.close()
+
+    assert backend.calls < 50
+
+
+@pytest.mark.parametrize("depth", [image_depth, video_depth])
+def test_unknown_backend_name_raises(depth):
+    with pytest.raises(ValueError):
+        depth.create_depth_backend('MAGIC')
+
+
+@pytest.mark.parametrize("depth", [image_depth, video_depth])
+def test_onnx_model_loads_from_local_models_path(depth):
+    backend = depth.create_depth_backend('ONNX', model="custom.onnx", threads=2, batch_size=3)
+
+    assert backend.model_path == depth.resolve_project_path("./ai_models/custom.onnx")
+    assert backend.settings() == {'backend': 'ONNX', 'model': backend.model_path}
+    assert (backend.threads, backend.batch_size) == (2, 3)
+    assert depth.get_model_path().endswith(depth.DEFAULT_ONNX_MODEL)
+
+
+def test_runtime_settings_recreate_the_backend():
+    onnx = image_depth.create_depth_backend('ONNX', threads=2, batch_size=3)
+
+    assert image_depth.create_depth_backend('HEURISTIC').runtime_settings() == {}
+    assert onnx.runtime_settings() == {'threads': 2, 'batch_size': 3}
+    assert image_depth.create_depth_backend('ONNX', **onnx.runtime_settings()).batch_size == 3
+
+
+@pytest.mark.parametrize("depth", [image_depth, video_depth])
+def test_missing_onnx_model_is_reported(depth, tmp_path):
+    pytest.importorskip("onnxruntime")
+    backend = depth.OnnxDepthBackend(str(tmp_path / "missing.onnx"))
+
+    with pytest.raises(FileNotFoundError):
+        backend.estimate(np.zeros((8, 8, 3), dtype=np.uint8))
+
+
+class FakeInput:
+    name = 'input'
+
+    def __init__(self, batch):
+        self.shape = [batch, 3, 16, 16]
+
+
+class FakeSession:
+    """Stands in for an ONNX Runtime session: depth = red channel of the input"""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.batch_sizes = []
+
+    def get_inputs(self):
+        return [FakeInput(self.batch)]
+
+    def run(self, outputs, feeds):
+        batch = feeds['input']
+        self.batch_sizes.append(len(batch))
+        return [batch[:, :1]]
+
+
+@pytest.mark.parametrize("depth", [image_depth, video_depth])
+@pytest.mark.parametrize("model_batch, expected", [('N', [4, 4, 2]), (1, [1] * 10)])
+def test_onnx_backend_batches_frames(depth, model_batch, expected, monkeypatch):
+    session = FakeSession(model_batch)
+    monkeypatch.setattr(depth.OnnxDepthBackend, '_sessions', {("fake.onnx", 0): session})
+    backend = depth.OnnxDepthBackend("fake.onnx", batch_size=4)
+    frames = [np.zeros((24, 32, 3), dtype=np.uint8) for _ in range(10)]
+    for frame in frames:
+        frame[:, 16:, 2] = 255  # red on the right half
+
+    depths = backend.estimate_batch(frames)
+
+    assert session.batch_sizes == expected
+    assert [d.shape for d in depths] == [(24, 32)] * 10
+    # Red (closer) on the right
+    assert all(d[:, :8].max() < d[:, 24:].min() for d in depths)
+    assert backend.stats()['frames'] == 10
@@ -0,0 +1,67 @@
+"""Contour object detection (plain Python, no Blender needed)"""
+import numpy as np
+import pytest
+
+from ai_image_to_scene.core.detection import detect_objects
+
+
+def image_with_boxes(shape, boxes):
+    img = np.zeros(shape, dtype=np.uint8)
+    for x, y, w, h in boxes:
+        img[y:y + h, x:x + w] = 255
+    return img
+
+
+def test_largest_regions_come_first_in_image_coordinates():
+    img = image_with_boxes((400, 600), [(10, 10, 40, 40), (200, 100, 120, 80), (450, 300, 60, 60)])
+
+    objects = detect_objects(img, max_objects=10)
+
+    assert [obj['id'] for obj in objects] == [0, 1, 2]
+    assert [obj['bbox'] for obj in objects] == [(200, 100, 120, 80), (450, 300, 60, 60), (10, 10, 40, 40)]
+    assert objects[0]['center'] == (260, 140)
+    assert objects[0]['area'] > objects[1]['area'] > objects[2]['area']
+
+
+def test_max_objects_keeps_the_biggest():
+    boxes = [(20 + 60 * i, 50, 10 + 4 * i, 10 + 4 * i) for i in range(8)]
+    img = image_with_boxes((200, 600), boxes)
+
+    objects = detect_objects(img, max_objects=3)
+
+    assert [obj['bbox'] for obj in objects] == [boxes[7], boxes[6], boxes[5]]
+
+
+def test_holes_and_nested_shapes_are_not_separate_objects():
+    img = image_with_boxes((300, 300), [(50, 50, 200, 200)])
+    img[100:200, 100:200] = 0
+    img[130:170, 130:170] = 255
+
+    objects = detect_objects(img)
+
+    assert len(objects) == 1
+    assert objects[0]['bbox'] == (50, 50, 200, 200)
+
+
+def test_min_area_fraction_is_relative_to_the_image():
+    img = image_with_boxes((100, 100), [(10, 10, 30, 30), (60, 60, 5, 5)])
+
+    assert len(detect_objects(img, min_area_fraction=0.001)) == 2
+    assert len(detect_objects(img, min_area_fraction=0.01)) == 1
+
+
+def test_large_images_are_detected_on_a_downscaled_copy():
+    boxes = [(400, 300, 800, 600), (2400, 1600, 400, 400)]
+    img = image_with_boxes((2400, 3200, 3), boxes)
+
+    objects = detect_objects(img, work_size=512)
+
+    # Factor 6 downscale: boxes map back to within a few pixels
+    assert len(objects) == 2
+    for obj, box in zip(objects, boxes):
+        np.testing.assert_allclose(obj['bbox'], box, atol=12)
+    assert objects[0]['area'] == pytest.approx(800 * 600, rel=0.05)
+
+
+def test_blank_image_has_no_objects():
+    assert detect_objects(np.zeros((64, 64), dtype=np.uint8)) == []
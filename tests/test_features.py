@@ -0,0 +1,67 @@
+"""Shared per-image features (plain Python, no Blender needed)"""
+import cv2
+import numpy as np
+import pytest
+
+from ai_image_to_scene.core.features import FeatureCache, ImageFeatures
+
+
+@pytest.fixture
+def img():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+
+
+def test_gray_is_computed_once(img):
+    features = ImageFeatures(img)
+
+    assert features.gray is features.gray
+    np.testing.assert_array_equal(features.gray, cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+    assert features.shape == img.shape
+
+
+def test_grayscale_input_is_used_as_is():
+    gray = np.arange(64, dtype=np.uint8).reshape(8, 8)
+
+    assert ImageFeatures(gray).gray is gray
+
+
+def test_statistics_match_numpy(img):
+    features = ImageFeatures(img)
+    gray = features.gray
+
+    stats = features.luminance_stats
+    assert stats['min'] == gray.min()
+    assert stats['max'] == gray.max()
+    assert gray[stats['max_loc'][1], stats['max_loc'][0]] == gray.max()
+    assert stats['mean'] == pytest.approx(gray.mean())
+    assert stats['std'] == pytest.approx(gray.std())
+
+    mean, std = features.channel_stats
+    np.testing.assert_allclose(mean, img.reshape(-1, 3).mean(axis=0))
+    np.testing.assert_allclose(std, img.reshape(-1, 3).std(axis=0))
+    assert features.pixel_std == pytest.approx(np.std(img))
+
+    histogram = features.gray_histogram
+    assert histogram.shape == (256,)
+    np.testing.assert_array_equal(histogram, np.bincount(gray.ravel(), minlength=256))
+
+
+def test_gradient_magnitude_of_a_vertical_edge():
+    gray = np.zeros((16, 16), dtype=np.uint8)
+    gray[:, 8:] = 100
+
+    magnitude = ImageFeatures(gray).gradient_magnitude
+
+    assert magnitude.dtype == np.float32
+    assert magnitude[:, 0].max() == 0
+    assert magnitude[4, 7] == pytest.approx(400)
+
+
+def test_feature_cache_shares_features_per_array(img):
+    cache = FeatureCache()
+    other = img.copy()
+
+    assert cache.get(img) is cache.get(img)
+    assert cache.get(other) is not cache.get(img)
+    assert cache.get(other).img is other
@@ -0,0 +1,54 @@
+"""Prompt-keyed cache of generated images (material generator)"""
+import os
+
+import pytest
+
+from ai_material_generator.utils import generation_cache
+from ai_material_generator.utils.generation_cache import GenerationCache, default_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_default_cache(monkeypatch):
+    monkeypatch.setattr(generation_cache, "_default_cache", None)
+
+
+def write_png(path, size):
+    path.write_bytes(b"\x89PNG" + b"\0" * size)
+    return str(path)
+
+
+def test_default_cache_size_comes_from_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(generation_cache, "load_settings",
+                        lambda: {'paths': {'cache_dir': str(tmp_path), 'material_cache_max_mb': 64}})
+
+    assert default_cache().max_bytes == 64 * 1024 * 1024
+    assert default_cache() is default_cache()
+
+
+def test_default_cache_size_defaults_to_one_gib(monkeypatch):
+    monkeypatch.setattr(generation_cache, "load_settings", lambda: {})
+
+    assert default_cache().max_bytes == 1024 * 1024 * 1024
+
+
+def test_prompts_differing_in_case_and_spacing_share_a_key(tmp_path):
+    cache = GenerationCache(str(tmp_path))
+
+    assert (cache.make_key("dalle", "Rusty  Steel ", size="1024x1024")
+            == cache.make_key("dalle", "rusty steel", size="1024x1024"))
+    assert cache.make_key("dalle", "rusty steel", size="512x512") != cache.make_key("dalle", "rusty steel")
+
+
+def test_put_then_get_and_evict_least_recently_used(tmp_path):
+    cache = GenerationCache(str(tmp_path / "cache"), max_bytes=250)
+    first = cache.put("a", write_png(tmp_path / "a.png", 100))
+    second = cache.put("b", write_png(tmp_path / "b.png", 100))
+    # "a" is older, then a cache hit makes it the most recently used
+    os.utime(first, (1000, 1000))
+    os.utime(second, (2000, 2000))
+    assert cache.get("a") == first
+
+    cache.put("c", write_png(tmp_path / "c.png", 100))
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
@@ -0,0 +1,61 @@
+"""Depth heightfield meshes of image-to-scene (needs Blender's bpy module)"""
+import numpy as np
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+from ai_image_to_scene.core.heightfield import build_heightfield, grid_heightfield, sample_depth
+
+
+def depth_map():
+    # Bright (near) top-left corner on a horizontal ramp
+    depth = np.tile(np.linspace(0, 200, 64, dtype=np.float32), (48, 1))
+    depth[:12, :16] = 255
+    return depth.astype(np.uint8)
+
+
+def test_sample_depth_reads_v_up_bilinearly():
+    depth = np.array([[0, 255], [255, 0]], dtype=np.uint8)
+
+    # v = 1 is the top row of the image
+    values = sample_depth(depth, np.array([0.0, 1.0, 0.5]), np.array([1.0, 1.0, 0.5]))
+
+    np.testing.assert_allclose(values, [0.0, 1.0, 0.5], atol=1e-6)
+
+
+def test_grid_has_counter_clockwise_quads_over_the_plane():
+    verts, faces, uvs = grid_heightfield(depth_map(), 8, size=10.0, strength=2.0)
+
+    assert verts.shape == (81, 3) and faces.shape == (64, 4) and uvs.shape == (81, 2)
+    assert verts[:, :2].min() == -5.0 and verts[:, :2].max() == 5.0
+    assert verts[:, 2].min() >= 0.0 and verts[:, 2].max() <= 2.0
+
+    p0, p1, p2 = verts[faces[:, 0], :2], verts[faces[:, 1], :2], verts[faces[:, 2], :2]
+    cross = (p1[:, 0] - p0[:, 0]) * (p2[:, 1] - p0[:, 1]) - (p1[:, 1] - p0[:, 1]) * (p2[:, 0] - p0[:, 0])
+    assert (cross > 0).all()
+
+    # The bright top-left of the image is at -X, +Y
+    corner = np.argmin(np.hypot(verts[:, 0] + 5, verts[:, 1] - 5))
+    assert verts[corner, 2] == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("method", ['GRID', 'ADAPTIVE'])
+def test_build_heightfield_mesh(method):
+    mesh, stats = build_heightfield("AI_Depth_test", depth_map(), resolution=32,
+                                    method=method, max_error=0.05)
+
+    assert stats['method'] == method
+    assert stats['vertices'] == len(mesh.vertices) > 0
+    assert stats['faces'] == len(mesh.polygons) > 0
+    assert mesh.uv_layers.active.name == "UVMap"
+    assert all(poly.normal.z > 0 for poly in mesh.polygons)
+
+    if method == 'GRID':
+        assert stats['faces'] == 32 * 32
+    else:
+        # Fewer triangles than the 2 * 32^2 of a full grid, and more for smaller errors
+        assert stats['faces'] < 2 * 32 * 32
+        counts = [count for _, count in stats['tradeoff']]
+        assert counts == sorted(counts)
+
+    bpy.data.meshes.remove(mesh)
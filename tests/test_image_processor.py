@@ -0,0 +1,98 @@
+"""Local PBR map derivation of the material generator (plain Python, no Blender needed)"""
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ai_material_generator.utils.image_processor import ImageProcessor
+
+
+@pytest.fixture
+def base_color(tmp_path):
+    """Steel-grey plate with a rust-colored stripe and some grain"""
+    rng = np.random.default_rng(0)
+    rgb = np.empty((32, 48, 3), dtype=np.uint8)
+    rgb[:] = (150, 150, 155)
+    rgb[:, 30:38] = (140, 70, 30)
+    rgb[:16] = np.clip(rgb[:16].astype(int) + rng.integers(-20, 21, (16, 48, 1)), 0, 255)
+    path = str(tmp_path / "base_color.png")
+    Image.fromarray(rgb).save(path)
+    return path
+
+
+def load(path, mode):
+    return np.array(Image.open(path).convert(mode))
+
+
+def test_box_mean_matches_a_direct_window_mean():
+    rng = np.random.default_rng(1)
+    arr = rng.random((9, 11))
+
+    padded = np.pad(arr, 2, mode='symmetric')
+    expected = np.array([[padded[y:y + 5, x:x + 5].mean() for x in range(11)] for y in range(9)])
+
+    np.testing.assert_allclose(ImageProcessor.box_mean(arr, 5), expected)
+
+
+def test_normal_map_tilts_against_the_slope():
+    ramp = np.tile(np.arange(16, dtype=np.float32) * 8, (8, 1))
+
+    normal = ImageProcessor.normal_from_height(ramp)
+
+    assert normal.shape == (8, 16, 3)
+    assert (normal[..., 0] < 128).all()
+    assert (normal[..., 1] == 127).all()
+    assert (normal[..., 2] == 255).all()
+    flat = ImageProcessor.normal_from_height(np.zeros((4, 4), dtype=np.float32))
+    assert (flat[..., :2] == 127).all()
+
+
+def test_roughness_follows_local_contrast():
+    gray = np.full((20, 20), 100, dtype=np.float32)
+    gray[:, 10:] = np.tile([0, 255], (20, 5))
+
+    roughness = ImageProcessor.roughness_from_gray(gray)
+
+    assert roughness[:, :5].max() == 0
+    assert roughness[:, 15:].min() > 200
+    assert ImageProcessor.roughness_from_gray(np.zeros((4, 4))).max() == 0
+
+
+def test_metallic_marks_the_dominant_color():
+    rgb = np.zeros((4, 10, 3), dtype=np.float32)
+    rgb[:] = (150, 150, 155)
+    rgb[:, 8:] = (140, 70, 30)
+
+    metallic = ImageProcessor.metallic_from_rgb(rgb, 1.0)
+
+    assert (metallic[:, :8] == 255).all()
+    assert (metallic[:, 8:] == 0).all()
+    assert ImageProcessor.metallic_from_rgb(rgb, 0.0).max() == 0
+
+
+def test_derive_pbr_maps_matches_the_base_color(base_color):
+    maps = ImageProcessor.derive_pbr_maps(base_color, normal_strength=2.0, metalness=1.0)
+
+    try:
+        assert sorted(maps) == ["metallic", "normal", "roughness"]
+        gray = np.array(Image.open(base_color).convert('L'), dtype=np.float32)
+        rgb = np.array(Image.open(base_color).convert('RGB'), dtype=np.float32)
+        np.testing.assert_array_equal(load(maps["normal"], 'RGB'),
+                                      ImageProcessor.normal_from_height(gray, 2.0))
+        np.testing.assert_array_equal(load(maps["roughness"], 'L'), ImageProcessor.roughness_from_gray(gray))
+        np.testing.assert_array_equal(load(maps["metallic"], 'L'), ImageProcessor.metallic_from_rgb(rgb, 1.0))
+        # The grainy top half is rougher; the rust stripe is not metal
+        roughness = load(maps["roughness"], 'L')
+        assert roughness[2:14, :28].mean() > roughness[18:30, :28].mean()
+        assert load(maps["metallic"], 'L')[20, 34] == 0
+    finally:
+        for path in maps.values():
+            os.remove(path)
+
+
+def test_unreadable_images_derive_no_maps(tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+
+    assert ImageProcessor.derive_pbr_maps(str(path)) == {}
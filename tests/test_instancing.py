@@ -0,0 +1,73 @@
+"""Proxy objects with shared meshes and materials (needs Blender's bpy module)"""
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+from ai_image_to_scene.core.instancing import (MaterialCache, ProxyBuilder, primitive_mesh,
+                                               quantize_color)
+
+
+@pytest.fixture
+def builder():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    return ProxyBuilder(bpy.context.scene.collection)
+
+
+def test_quantize_color_snaps_and_clamps():
+    assert quantize_color((0.0, 0.5, 1.0), levels=3) == (0.0, 0.5, 1.0)
+    assert quantize_color((0.26, 0.74, 1.5, 0.3), levels=3) == (0.5, 0.5, 1.0)
+    assert quantize_color((-0.2, 0.1, 0.9), levels=2) == (0.0, 0.0, 1.0)
+
+
+def test_objects_of_one_kind_share_a_mesh(builder):
+    cubes = [builder.add(f"Cube_{i}", 'CUBE', (i, 0, 0), (1, 2, 3)) for i in range(3)]
+    cylinder = builder.add("Cylinder", 'CYLINDER', (0, 5, 0))
+
+    assert len({obj.data.name for obj in cubes}) == 1
+    assert cylinder.data is not cubes[0].data
+    assert tuple(cubes[1].location) == (1, 0, 0)
+    assert tuple(cubes[1].scale) == (1, 2, 3)
+    assert all(obj.name in bpy.context.scene.collection.objects for obj in cubes + [cylinder])
+    assert builder.stats() == {'objects': 4, 'meshes': 2, 'materials': 0}
+
+
+def test_primitive_mesh_is_reused_across_builders(builder):
+    first = builder.mesh('CUBE')
+    second = ProxyBuilder(builder.collection).mesh('CUBE')
+
+    assert first == second
+    assert len(first.vertices) == 8
+    assert "UVMap" in first.uv_layers
+
+
+def test_unknown_primitive_raises(builder):
+    with pytest.raises(ValueError):
+        primitive_mesh('TORUS')
+
+
+def test_similar_colors_share_one_object_linked_material(builder):
+    red = builder.add("Red", 'CUBE', (0, 0, 0), color=(0.99, 0.01, 0.0))
+    also_red = builder.add("AlsoRed", 'CUBE', (1, 0, 0), color=(1.0, 0.02, 0.01))
+    blue = builder.add("Blue", 'CUBE', (2, 0, 0), color=(0.0, 0.0, 1.0))
+    plain = builder.add("Plain", 'CUBE', (3, 0, 0))
+
+    assert red.material_slots[0].link == 'OBJECT'
+    assert red.material_slots[0].material == also_red.material_slots[0].material
+    assert blue.material_slots[0].material != red.material_slots[0].material
+    assert plain.material_slots[0].material is None
+    # The shared mesh keeps no material of its own
+    assert red.data.materials[0] is None
+    assert builder.stats()['materials'] == 2
+
+
+def test_material_cache_names_and_colors_materials():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    cache = MaterialCache(prefix="Test", levels=2, roughness=0.25)
+
+    mat = cache.get((0.9, 0.1, 0.8))
+
+    assert mat.name == "Test_Mat_FF00FF"
+    principled = mat.node_tree.nodes['Principled BSDF']
+    assert tuple(principled.inputs['Base Color'].default_value) == (1.0, 0.0, 1.0, 1.0)
+    assert principled.inputs['Roughness'].default_value == pytest.approx(0.25)
+    assert tuple(mat.diffuse_color) == (1.0, 0.0, 1.0, 1.0)
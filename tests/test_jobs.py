@@ -0,0 +1,127 @@
+"""Resumable chunked video-to-3D jobs (plain Python, no Blender needed)"""
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from ai_video_to_3d.depth import create_depth_backend
+from ai_video_to_3d.jobs import ChunkedJob, cleanup_jobs, merge_ranges
+
+FRAMES = 20
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for _ in range(FRAMES):
+        writer.write(rng.integers(0, 256, (48, 64, 3), dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def new_job(video, jobs_dir, **kwargs):
+    kwargs.setdefault('chunk_size', 6)
+    return ChunkedJob(video, create_depth_backend('HEURISTIC'), depth_map_size=32,
+                      jobs_dir=str(jobs_dir), **kwargs)
+
+
+def test_merge_ranges():
+    assert merge_ranges([(6, 12), (0, 6), (18, 20), (14, 16), (15, 18)]) == [[0, 12], [14, 20]]
+    assert merge_ranges([]) == []
+
+
+def test_run_records_chunks_in_the_manifest(video, tmp_path):
+    job = new_job(video, tmp_path / "jobs")
+
+    assert job.run() == 4
+
+    with open(job.manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['completed'] == [[0, FRAMES]]
+    assert manifest['total_frames'] == FRAMES
+    assert manifest['params']['chunk_size'] == 6
+    depth_maps = list(job.iter_depth_maps())
+    assert len(depth_maps) == FRAMES
+    assert all(depth.shape == (24, 32) for depth in depth_maps)
+    # Nothing left to do on a rerun
+    assert job.run() == 0
+
+
+def test_interrupted_stream_resumes_from_the_last_finished_chunk(video, tmp_path):
+    first = new_job(video, tmp_path / "jobs")
+    stream = first.stream()
+    for _ in range(8):
+        next(stream)
+    stream.close()
+    assert first.status()['ranges'] == [[0, 6]]
+
+    second = new_job(video, tmp_path / "jobs")
+    assert second.job_dir == first.job_dir
+    results = list(second.stream())
+
+    assert [index for index, _, _ in results] == list(range(FRAMES))
+    # Only the unfinished chunks were estimated again
+    assert second.backend.frames == FRAMES - 6
+    assert second.is_complete
+
+
+def test_stream_matches_a_single_run_and_cleans_up(video, tmp_path):
+    reference = new_job(video, tmp_path / "reference")
+    reference.run()
+
+    job = new_job(video, tmp_path / "jobs")
+    streamed = [depth for _, _, depth in job.stream(cleanup=True)]
+
+    for expected, depth in zip(reference.iter_depth_maps(), streamed):
+        np.testing.assert_array_equal(depth, expected)
+    assert not os.path.exists(job.job_dir)
+
+
+def test_workers_split_chunks_and_merge(video, tmp_path):
+    workers = [new_job(video, tmp_path / f"worker_{i}") for i in range(2)]
+    for i, job in enumerate(workers):
+        job.run(worker=i, worker_count=2)
+    assert [job.completed() for job in workers] == [[0, 2], [1, 3]]
+
+    merged = workers[0]
+    assert merged.merge_from(workers[1].job_dir) == 2
+
+    assert merged.is_complete
+    assert merged.read_manifest()['completed'] == [[0, FRAMES]]
+    assert len(list(merged.iter_depth_maps())) == FRAMES
+
+
+def test_unfinished_jobs_cannot_be_read(video, tmp_path):
+    job = new_job(video, tmp_path / "jobs")
+    job.run(worker=0, worker_count=2)
+
+    with pytest.raises(ValueError):
+        list(job.iter_depth_maps())
+
+
+def test_settings_change_the_job(video, tmp_path):
+    job = new_job(video, tmp_path / "jobs")
+    other = new_job(video, tmp_path / "jobs", chunk_size=5)
+    job.run()
+
+    assert other.job_dir != job.job_dir
+    assert other.chunk_count == 4
+    with pytest.raises(ValueError):
+        other.merge_from(job.job_dir)
+
+
+def test_cleanup_jobs_removes_stale_folders(video, tmp_path):
+    jobs_dir = tmp_path / "jobs"
+    stale = new_job(video, jobs_dir).open()
+    fresh = new_job(video, jobs_dir, chunk_size=5).open()
+    old = time.time() - 10 * 86400
+    os.utime(stale.manifest_path, (old, old))
+
+    assert cleanup_jobs(str(jobs_dir), max_age_days=7) == 1
+    assert not os.path.exists(stale.job_dir)
+    assert os.path.exists(fresh.job_dir)
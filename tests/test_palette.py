@@ -0,0 +1,57 @@
+"""Dominant color extraction"""
+import numpy as np
+import pytest
+
+from ai_image_to_scene.core.palette import extract_palette, sample_pixels
+
+
+def three_color_image():
+    # 60% blue, 30% green, 10% red (BGR)
+    img = np.empty((100, 100, 3), dtype=np.uint8)
+    img[:60] = (200, 40, 40)
+    img[60:90] = (40, 200, 40)
+    img[90:] = (40, 40, 200)
+    return img
+
+
+@pytest.mark.parametrize("method", ["histogram", "sample"])
+def test_palette_finds_colors_most_dominant_first(method):
+    palette = extract_palette(three_color_image(), k=3, method=method)
+
+    expected = [(200, 40, 40), (40, 200, 40), (40, 40, 200)]
+    assert len(palette) == 3
+    for color, target in zip(palette, expected):
+        # The histogram method returns bin centers (8 levels wide at 5 bits)
+        assert np.abs(np.subtract(color, target)).max() <= 4
+
+
+@pytest.mark.parametrize("method", ["histogram", "sample"])
+def test_palette_is_deterministic(method):
+    rng = np.random.default_rng(3)
+    img = rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)
+
+    assert extract_palette(img, method=method) == extract_palette(img, method=method)
+
+
+def test_fewer_colors_than_k():
+    img = np.full((20, 20, 3), 77, dtype=np.uint8)
+
+    palette = extract_palette(img, k=5, method='sample')
+
+    assert len(palette) == 5
+    assert all(color == [77, 77, 77] for color in palette)
+
+
+def test_sample_is_bounded_and_seeded():
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (500, 500, 3), dtype=np.uint8)
+
+    sample = sample_pixels(img, max_samples=1000, seed=1)
+
+    assert sample.shape == (1000, 3)
+    assert np.array_equal(sample, sample_pixels(img, max_samples=1000, seed=1))
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        extract_palette(three_color_image(), method='median_cut')
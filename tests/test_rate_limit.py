@@ -0,0 +1,132 @@
+"""TokenBucket and RequestScheduler with a fake clock and a local HTTP server"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ai_material_generator.utils.rate_limit import (Clock, RequestScheduler, RetryPolicy,
+                                                    TokenBucket)
+
+
+class FakeClock(Clock):
+    """Time only moves when something sleeps"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        if seconds > 0:
+            self.now += seconds
+
+
+class UpperBound:
+    """rng for RetryPolicy that always picks the largest jitter"""
+
+    def uniform(self, low, high):
+        return high
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    """Answers with the server's queued (status, headers), then 200"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.count += 1
+            status, headers = server.responses.pop(0) if server.responses else (200, {})
+
+        data = json.dumps({"status": status}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StatusHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.responses = []
+    server.count = 0
+    server.url = f"http://127.0.0.1:{server.server_port}/txt2img"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_token_bucket_spaces_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(60, burst=1, clock=clock)
+
+    assert [bucket.reserve() for _ in range(4)] == pytest.approx([0, 1, 2, 3])
+
+
+def test_token_bucket_burst_then_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(120, burst=3, clock=clock)
+
+    assert [bucket.reserve() for _ in range(5)] == pytest.approx([0, 0, 0, 0.5, 1.0])
+
+
+def test_pause_spaces_queued_requests_after_the_pause():
+    clock = FakeClock()
+    bucket = TokenBucket(60, burst=1, clock=clock)
+    bucket.acquire()
+
+    bucket.pause(20)
+
+    # Not five requests at once after 20 s, but one per second from then on
+    assert [bucket.reserve() for _ in range(5)] == pytest.approx([21, 22, 23, 24, 25])
+
+
+def test_retry_after_is_honored(server):
+    server.responses = [(429, {"Retry-After": "7"})]
+    clock = FakeClock()
+    scheduler = RequestScheduler(TokenBucket(600, clock=clock),
+                                 RetryPolicy(base_delay=0.5, rng=UpperBound()))
+
+    response = scheduler.post(server.url, json={})
+
+    assert response.status_code == 200
+    assert server.count == 2
+    assert scheduler.throttled == 1
+    # Retry-After plus base_delay of jitter, then one token (0.1 s at 600/min)
+    assert sum(clock.sleeps) == pytest.approx(7.5 + 0.1)
+
+
+def test_backoff_is_exponential_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=8.0, rng=UpperBound())
+
+    assert [policy.delay(attempt) for attempt in range(7)] == [1, 2, 4, 8, 8, 8, 8]
+
+
+def test_scheduler_gives_up_after_max_retries(server):
+    server.responses = [(503, {})] * 10
+    clock = FakeClock()
+    scheduler = RequestScheduler(retry=RetryPolicy(max_retries=3, base_delay=1.0, rng=UpperBound()),
+                                 clock=clock)
+
+    response = scheduler.post(server.url, json={})
+
+    assert response.status_code == 503
+    assert server.count == 4
+    assert scheduler.retries == 3
+    assert clock.sleeps == [1, 2, 4]
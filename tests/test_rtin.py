@@ -0,0 +1,107 @@
+"""Adaptive (RTIN) meshing, checked on both addons' copies of rtin.py"""
+import os
+from math import gcd
+
+import numpy as np
+import pytest
+
+from ai_image_to_scene.core import rtin as image_rtin
+from ai_video_to_3d import rtin as video_rtin
+
+COPIES = [image_rtin, video_rtin]
+
+
+def terrain(size, seed=0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[:size, :size] / (size - 1)
+    heights = 0.5 * np.sin(6 * x) * np.cos(4 * y) + rng.normal(0, 0.02, (size, size))
+    heights[size // 3:size // 2, size // 4:size // 2] += 0.3
+    return heights.astype(np.float32)
+
+
+def worst_error(heights, triangles):
+    """Largest |height - triangle plane| over every grid point of every triangle"""
+    worst = 0.0
+    for a, b, c in triangles.astype(np.float64):
+        lo = np.minimum(np.minimum(a, b), c).astype(int)
+        hi = np.maximum(np.maximum(a, b), c).astype(int)
+        x, y = np.meshgrid(np.arange(lo[0], hi[0] + 1), np.arange(lo[1], hi[1] + 1))
+        x, y = x.ravel(), y.ravel()
+
+        legs = np.array([[a[0] - c[0], b[0] - c[0]], [a[1] - c[1], b[1] - c[1]]])
+        wa, wb = np.linalg.solve(legs, np.stack([x - c[0], y - c[1]]))
+        wc = 1 - wa - wb
+        inside = (wa >= -1e-9) & (wb >= -1e-9) & (wc >= -1e-9)
+
+        plane = (wa * heights[int(a[1]), int(a[0])] + wb * heights[int(b[1]), int(b[0])]
+                 + wc * heights[int(c[1]), int(c[0])])
+        worst = max(worst, np.abs(heights[y, x] - plane)[inside].max())
+    return worst
+
+
+def test_copies_are_identical():
+    with open(image_rtin.__file__, 'rb') as f:
+        image_source = f.read()
+    with open(video_rtin.__file__, 'rb') as f:
+        video_source = f.read()
+
+    assert os.path.realpath(image_rtin.__file__) != os.path.realpath(video_rtin.__file__)
+    assert image_source == video_source
+
+
+@pytest.mark.parametrize("rtin", COPIES)
+@pytest.mark.parametrize("max_error", [0.01, 0.05, 0.2])
+def test_mesh_stays_within_max_error(rtin, max_error):
+    heights = terrain(65)
+
+    triangles = rtin.rtin_triangles(rtin.rtin_errors(heights), max_error)
+
+    assert worst_error(heights, triangles) <= max_error + 1e-6
+
+
+@pytest.mark.parametrize("rtin", COPIES)
+def test_mesh_is_crack_free_and_covers_the_grid(rtin):
+    size = 65
+    triangles = rtin.rtin_triangles(rtin.rtin_errors(terrain(size)), 0.05)
+    vertices = {tuple(p) for p in triangles.reshape(-1, 2)}
+
+    # No vertex of one triangle lies inside another triangle's edge (T-junction)
+    for triangle in triangles:
+        for start, end in ((0, 1), (1, 2), (2, 0)):
+            p, q = triangle[start], triangle[end]
+            steps = gcd(*np.abs(q - p))
+            for i in range(1, steps):
+                assert tuple(p + (q - p) // steps * i) not in vertices
+
+    ab = triangles[:, 1] - triangles[:, 0]
+    ac = triangles[:, 2] - triangles[:, 0]
+    area = np.abs(ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0]).sum() / 2
+    assert area == (size - 1) ** 2
+
+
+@pytest.mark.parametrize("rtin", COPIES)
+def test_faces_wind_counter_clockwise(rtin):
+    used, faces, xy = rtin.rtin_mesh(rtin.rtin_errors(terrain(33)), 0.02)
+
+    p0, p1, p2 = xy[faces[:, 0]], xy[faces[:, 1]], xy[faces[:, 2]]
+    cross = (p1[:, 0] - p0[:, 0]) * (p2[:, 1] - p0[:, 1]) - (p1[:, 1] - p0[:, 1]) * (p2[:, 0] - p0[:, 0])
+    assert (cross > 0).all()
+    assert len(np.unique(faces)) == len(used)
+    assert xy.min() == 0.0 and xy.max() == 1.0
+
+
+@pytest.mark.parametrize("rtin", COPIES)
+def test_flat_grid_needs_two_triangles(rtin):
+    errors = rtin.rtin_errors(np.full((33, 33), 0.7, dtype=np.float32))
+
+    assert len(rtin.rtin_triangles(errors, 0.0)) == 2
+
+
+@pytest.mark.parametrize("rtin", COPIES)
+def test_larger_max_error_gives_fewer_triangles(rtin):
+    errors = rtin.rtin_errors(terrain(65))
+
+    counts = [len(rtin.rtin_triangles(errors, e)) for e in (0.005, 0.02, 0.08, 0.3)]
+
+    assert counts == sorted(counts, reverse=True)
+    assert counts[0] > counts[-1]
@@ -0,0 +1,133 @@
+"""Frame sampling and seeking of video-to-3D (plain Python, no Blender needed)"""
+from itertools import islice
+
+import cv2
+import numpy as np
+import pytest
+
+from ai_video_to_3d import streaming
+from ai_video_to_3d.streaming import ChunkSampling, FrameSampling, count_frames, iter_frames
+
+FPS = 10
+FRAMES = 60
+
+VideoCapture = cv2.VideoCapture
+
+
+def frame_number(frame):
+    """Frame number encoded in the brightness of a test video frame"""
+    return int(round(frame.mean() / 4))
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (64, 48))
+    for i in range(FRAMES):
+        writer.write(np.full((48, 64, 3), i * 4 + 2, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class CountingCapture:
+    """cv2.VideoCapture that counts full decodes, grabs and seeks"""
+
+    calls = None
+
+    def __init__(self, path):
+        self.cap = VideoCapture(path)
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+    def grab(self):
+        CountingCapture.calls['grab'] += 1
+        return self.cap.grab()
+
+    def read(self):
+        CountingCapture.calls['read'] += 1
+        return self.cap.read()
+
+    def set(self, prop, value):
+        CountingCapture.calls['seek'] += 1
+        return self.cap.set(prop, value)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    CountingCapture.calls = {'grab': 0, 'read': 0, 'seek': 0}
+    monkeypatch.setattr(streaming.cv2, 'VideoCapture', CountingCapture)
+    return CountingCapture.calls
+
+
+def test_sample_rate_picks_every_nth_frame():
+    assert list(FrameSampling(3).frame_numbers(30, 10)) == [0, 3, 6, 9]
+    assert list(FrameSampling().frame_numbers(30, 4)) == [0, 1, 2, 3]
+
+
+def test_target_fps_overrides_the_sample_rate():
+    sampling = FrameSampling(sample_rate=7, target_fps=12)
+
+    assert list(sampling.frame_numbers(30, 13)) == [0, 2, 5, 8, 10, 12]
+    # Never more frames than the source has
+    assert list(FrameSampling(target_fps=60).frame_numbers(30, 3)) == [0, 1, 2]
+
+
+def test_in_and_out_points_are_in_seconds():
+    sampling = FrameSampling(2, start_time=1.0, end_time=2.0)
+
+    assert list(sampling.frame_numbers(10, 100)) == [10, 12, 14, 16, 18]
+    assert list(sampling.frame_numbers(10, 15)) == [10, 12, 14]
+
+
+def test_unknown_length_is_endless():
+    assert list(islice(FrameSampling(5).frame_numbers(25), 4)) == [0, 5, 10, 15]
+
+
+def test_chunks_cover_the_sampled_frames():
+    sampling = FrameSampling(3, start_time=0.5)
+    frames = list(sampling.frame_numbers(10, 40))
+
+    chunks = [list(ChunkSampling(sampling, start, start + 4).frame_numbers(10, 40))
+              for start in range(0, len(frames), 4)]
+
+    assert sum(chunks, []) == frames
+
+
+def test_coerce_accepts_a_sample_rate():
+    sampling = FrameSampling(2, end_time=3.0)
+
+    assert FrameSampling.coerce(sampling) is sampling
+    assert FrameSampling.coerce(4).sample_rate == 4
+    assert FrameSampling.coerce(None).sample_rate == 1
+
+
+def test_skipped_frames_are_only_grabbed(video, calls):
+    frames = list(iter_frames(video, 10))
+
+    assert [frame_number(frame) for _, frame in frames] == list(range(0, FRAMES, 10))
+    assert calls['read'] == 6
+    assert calls['grab'] == 5 * 9
+    assert calls['seek'] == 0
+
+
+def test_long_gaps_are_seeked_over(video, calls):
+    sampling = FrameSampling(20, start_time=1.5, seek_seconds=0.5)
+
+    frames = list(iter_frames(video, sampling))
+
+    assert [frame_number(frame) for _, frame in frames] == [15, 35, 55]
+    assert calls['read'] == 3
+    assert calls['seek'] == 3
+    assert calls['grab'] == 0
+
+
+def test_target_fps_and_time_range_on_a_video(video):
+    sampling = FrameSampling(target_fps=2, start_time=1.0, end_time=4.0)
+
+    frames = list(iter_frames(video, sampling))
+
+    assert [frame_number(frame) for _, frame in frames] == [10, 15, 20, 25, 30, 35]
+    assert [index for index, _ in frames] == list(range(6))
+    assert count_frames(video, sampling) == 6
+    assert count_frames(video, 7) == 9
@@ -0,0 +1,45 @@
+"""Blender side of image-to-scene (needs Blender's bpy module)"""
+import numpy as np
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+from ai_image_to_scene.core.scene_generator import ImageToSceneCore
+
+
+@pytest.fixture
+def core():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    return ImageToSceneCore()
+
+
+def image_pixels(img):
+    width, height = img.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    img.pixels.foreach_get(pixels)
+    return pixels.reshape(height, width, 4)
+
+
+def test_depth_image_holds_the_depth_map_bottom_row_first(core):
+    depth = np.zeros((4, 6), dtype=np.uint8)
+    depth[0] = 255  # top row of the photo
+    depth[:, 0] = 51
+
+    img = core.create_depth_image(depth, "AI_Depth_test")
+
+    assert tuple(img.size) == (6, 4)
+    assert img.is_float
+    pixels = image_pixels(img)
+    np.testing.assert_allclose(pixels[..., 0], np.flipud(depth) / 255.0, atol=1e-6)
+    np.testing.assert_array_equal(pixels[..., 0], pixels[..., 2])
+    assert (pixels[..., 3] == 1.0).all()
+
+
+def test_depth_image_is_reused_by_name_and_resized(core):
+    first = core.create_depth_image(np.zeros((4, 6), dtype=np.uint8), "AI_Depth_test")
+    second = core.create_depth_image(np.full((8, 5), 255, dtype=np.uint8), "AI_Depth_test")
+
+    assert second == first
+    assert len(bpy.data.images) == 1
+    assert tuple(second.size) == (5, 8)
+    assert (image_pixels(second)[..., 0] == 1.0).all()
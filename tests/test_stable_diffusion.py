@@ -0,0 +1,163 @@
+"""StableDiffusionAPI against a local stand-in for the Automatic1111 API"""
+import base64
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from ai_material_generator.models.stable_diffusion import StableDiffusionAPI
+from ai_material_generator.utils.generation_cache import GenerationCache
+
+DELAY = 0.3
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), (150, 150, 155)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+PNG = png_bytes()
+
+
+class Txt2ImgHandler(BaseHTTPRequestHandler):
+    """Answers txt2img after DELAY seconds, recording concurrency and connections"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            server.requests.append(body)
+            server.clients.add(self.client_address)
+        try:
+            time.sleep(DELAY)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+        image = base64.b64encode(PNG).decode()
+        data = json.dumps({"images": [image] * body.get("batch_size", 1)}).encode()
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Txt2ImgHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.active = server.peak = 0
+    server.status = 200
+    server.requests = []
+    server.clients = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def api(server):
+    api = StableDiffusionAPI(f"http://127.0.0.1:{server.server_port}",
+                             max_concurrency=4, max_batch_size=1, use_cache=False)
+    yield api
+    api.close()
+
+
+def remove(paths):
+    for path in paths:
+        if path:
+            os.remove(path)
+
+
+def test_generate_textures_runs_requests_concurrently(server, api):
+    requests_by_name = {f"tex{i}": {"prompt": f"texture {i}"} for i in range(4)}
+
+    start = time.perf_counter()
+    paths = api.generate_textures(requests_by_name)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(paths) == sorted(requests_by_name)
+    assert all(paths.values())
+    assert len(server.requests) == 4
+    assert server.peak == 4
+    # Four overlapping requests take about as long as one
+    assert elapsed < 2 * DELAY
+    remove(paths.values())
+
+
+def test_generate_material_maps_reuses_pooled_connections(server, api):
+    api.pbr_maps = 'DIFFUSION'
+
+    first = api.generate_material_maps("rusty steel")
+    second = api.generate_material_maps("oak planks")
+
+    assert sorted(first) == sorted(second) == ["base_color", "metallic", "normal", "roughness"]
+    assert len(server.requests) == 8
+    assert server.peak > 1
+    # Eight requests over keep-alive connections from a pool of max_concurrency
+    assert len(server.clients) <= api.max_concurrency
+    remove(first.values())
+    remove(second.values())
+
+
+def test_generate_batch_batches_identical_prompts_with_per_image_seeds(server, api, tmp_path):
+    api.cache = GenerationCache(str(tmp_path))
+    api.max_batch_size = 4
+
+    paths = api.generate_batch([{"prompt": "oak", "seed": 7}] * 3 + [{"prompt": "slate", "seed": 7}])
+
+    assert all(paths)
+    # Different prompts never share a request; image i of a batch has seed 7 + i
+    assert sorted((r["prompt"], r["batch_size"], r["seed"]) for r in server.requests) == [
+        ("texture, seamless, oak", 3, 7), ("texture, seamless, slate", 1, 7)]
+
+    # The third image was cached under its own seed
+    assert api.generate_texture("oak", seed=9) == paths[2]
+    assert len(server.requests) == 2
+
+
+def test_rejected_batch_fails_its_images_once(server, api):
+    server.status = 422
+    api.max_batch_size = 4
+
+    paths = api.generate_batch([{"prompt": "oak"}] * 2 + [{"prompt": "slate"}])
+
+    assert paths == [None, None, None]
+    # One request per prompt, no re-planning after the error
+    assert sorted((r["prompt"], r["batch_size"]) for r in server.requests) == [
+        ("texture, seamless, oak", 2), ("texture, seamless, slate", 1)]
+
+
+def test_local_pbr_maps_need_one_generation(server, api):
+    api.pbr_maps = 'LOCAL'
+
+    maps = api.generate_material_maps("brushed steel")
+
+    assert sorted(maps) == ["base_color", "metallic", "normal", "roughness"]
+    # Only the base color comes from the server
+    assert len(server.requests) == 1
+    assert "map" not in server.requests[0]["prompt"]
+    # A uniform metal plate: flat normals, smooth, fully metallic
+    assert Image.open(maps["metallic"]).getextrema() == (255, 255)
+    assert Image.open(maps["roughness"]).getextrema() == (0, 0)
+    remove(maps.values())
@@ -0,0 +1,130 @@
+"""In-memory video pipeline of video-to-3D (plain Python, no Blender needed)"""
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from ai_video_to_3d.depth import create_depth_backend
+from ai_video_to_3d.streaming import (PngSink, bounded, iter_frames, resize_frame,
+                                      stream_depth)
+
+FRAMES = 30
+
+
+def frame_number(frame):
+    """Frame number encoded in the brightness of a test video frame"""
+    return int(round(frame[-4:].mean() / 4))
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for i in range(FRAMES):
+        frame = np.full((48, 64, 3), i * 4 + 2, dtype=np.uint8)
+        # A bright square moving right, so depth maps differ per frame
+        frame[16:32, i:i + 16] = 255 - i
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_resize_frame_only_shrinks():
+    frame = np.zeros((300, 400, 3), dtype=np.uint8)
+
+    assert resize_frame(frame, 100).shape == (75, 100, 3)
+    assert resize_frame(frame, 400) is frame
+    assert resize_frame(frame, 1000) is frame
+
+
+def test_iter_frames_yields_arrays_in_order(video):
+    frames = list(iter_frames(video, max_size=32))
+
+    assert [index for index, _ in frames] == list(range(FRAMES))
+    assert [frame_number(frame) for _, frame in frames] == list(range(FRAMES))
+    assert all(frame.shape == (24, 32, 3) for _, frame in frames)
+
+
+def test_iter_frames_rejects_unreadable_videos(tmp_path):
+    with pytest.raises(ValueError):
+        next(iter_frames(str(tmp_path / "missing.avi")))
+
+
+def test_stream_depth_writes_no_files(video, tmp_path):
+    backend = create_depth_backend('HEURISTIC')
+    before = set(tmp_path.iterdir())
+
+    results = list(stream_depth(video, backend, sampling=3, queue_size=2))
+
+    assert [index for index, _, _ in results] == list(range(10))
+    assert [frame_number(frame) for _, frame, _ in results] == list(range(0, FRAMES, 3))
+    assert all(depth.shape == (48, 64) and depth.dtype == np.uint8 for _, _, depth in results)
+    assert set(tmp_path.iterdir()) == before
+
+
+def test_png_sink_is_opt_in(video, tmp_path):
+    out = tmp_path / "debug"
+
+    list(stream_depth(video, create_depth_backend('HEURISTIC'), sampling=10, sink=PngSink(str(out))))
+
+    assert sorted(p.name for p in (out / "frames").iterdir()) == [f"frame_{i:05d}.png" for i in range(3)]
+    assert sorted(p.name for p in (out / "depth_maps").iterdir()) == [f"depth_{i:05d}.png" for i in range(3)]
+
+
+def test_depth_pool_keeps_frame_order(video):
+    serial = list(stream_depth(video, create_depth_backend('HEURISTIC')))
+
+    pooled = list(stream_depth(video, create_depth_backend('HEURISTIC'), workers=3))
+
+    assert [index for index, _, _ in pooled] == list(range(FRAMES))
+    for (_, _, expected), (_, _, depth) in zip(serial, pooled):
+        np.testing.assert_array_equal(depth, expected)
+
+
+def test_bounded_applies_backpressure():
+    produced = []
+
+    def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    items = bounded(source(), maxsize=4)
+    assert next(items) == 0
+    time.sleep(0.2)
+
+    # One handed over, maxsize queued and at most one more waiting to be put
+    assert len(produced) <= 6
+    assert list(items) == list(range(1, 100))
+
+
+def test_bounded_reraises_source_errors():
+    def source():
+        yield 1
+        raise RuntimeError("decode failed")
+
+    items = bounded(source())
+    assert next(items) == 1
+    with pytest.raises(RuntimeError, match="decode failed"):
+        next(items)
+
+
+def test_closing_bounded_stops_the_source():
+    closed = threading.Event()
+
+    def source():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.set()
+
+    items = bounded(source(), maxsize=2)
+    assert next(items) == 0
+    items.close()
+
+    assert closed.is_set()
@@ -0,0 +1,106 @@
+"""Temporal smoothing and delta storage of video depth (plain Python, no Blender needed)"""
+import numpy as np
+import pytest
+
+from ai_video_to_3d.temporal import DepthSequence, TemporalFilter
+
+
+def moving_square(frames=12, size=64):
+    """Static background with a bright square moving one pixel per frame"""
+    background = np.tile(np.linspace(40, 120, size), (size, 1)).astype(np.uint8)
+    for i in range(frames):
+        depth = background.copy()
+        depth[20:36, 10 + i:26 + i] += 60
+        yield depth
+
+
+def test_filter_smooths_flicker():
+    rng = np.random.default_rng(0)
+    noisy = [np.clip(128 + rng.normal(0, 3, (32, 32)), 0, 255).astype(np.uint8) for _ in range(30)]
+    smooth = TemporalFilter(strength=0.8)
+
+    filtered = [smooth(depth) for depth in noisy]
+
+    flicker = np.mean([np.abs(b.astype(int) - a).mean() for a, b in zip(noisy, noisy[1:])])
+    filtered_flicker = np.mean([np.abs(b.astype(int) - a).mean() for a, b in zip(filtered[10:], filtered[11:])])
+    assert filtered_flicker < flicker / 2
+
+
+def test_filter_follows_large_changes_at_once():
+    smooth = TemporalFilter(strength=0.9, sigma=12.0)
+    smooth(np.zeros((8, 8), dtype=np.uint8))
+
+    # A jump far beyond sigma is motion, not flicker: no ghosting
+    assert smooth(np.full((8, 8), 200, dtype=np.uint8)).min() >= 199
+
+
+def test_sequence_decodes_exactly_without_quantization():
+    frames = list(moving_square())
+    sequence = DepthSequence(keyframe_interval=5)
+    for depth in frames:
+        sequence.append(depth)
+
+    assert len(sequence) == len(frames)
+    for expected, decoded in zip(frames, sequence):
+        np.testing.assert_array_equal(decoded, expected)
+    np.testing.assert_array_equal(sequence[7], frames[7])
+    np.testing.assert_array_equal(sequence[-1], frames[-1])
+    for expected, decoded in zip(frames[2:9:3], sequence[2:9:3]):
+        np.testing.assert_array_equal(decoded, expected)
+
+    stats = sequence.stats()
+    assert (stats['keyframes'], stats['deltas'], stats['repeats']) == (3, 9, 0)
+    assert stats['bytes'] < stats['raw_bytes'] / 4
+
+
+def test_quantized_deltas_do_not_accumulate_error():
+    rng = np.random.default_rng(1)
+    depth = rng.integers(60, 200, (32, 32)).astype(np.int16)
+    sequence = DepthSequence(keyframe_interval=100, quant_step=4)
+
+    for _ in range(40):
+        depth = np.clip(depth + rng.integers(-3, 4, depth.shape), 0, 255)
+        decoded = sequence.append(depth.astype(np.uint8))
+        assert np.abs(decoded.astype(int) - depth).max() <= 2
+
+
+def test_static_frames_repeat_the_previous_array():
+    still = np.full((64, 64), 100, dtype=np.uint8)
+    sequence = DepthSequence(threshold=2.0)
+
+    returned = [sequence.append(still + (i % 2)) for i in range(5)]
+
+    assert all(frame is returned[0] for frame in returned)
+    assert sequence.stats()['repeats'] == 4
+    decoded = list(sequence)
+    assert all(frame is decoded[0] for frame in decoded)
+
+
+def test_small_moving_objects_are_not_repeated():
+    sequence = DepthSequence(threshold=1.0)
+    for depth in moving_square(frames=4, size=128):
+        sequence.append(depth)
+
+    # The square covers far less than 1% of the frame but changes whole blocks
+    assert sequence.stats()['repeats'] == 0
+
+
+def test_large_jumps_and_new_sizes_become_keyframes():
+    sequence = DepthSequence(keyframe_interval=100)
+    sequence.append(np.zeros((16, 16), dtype=np.uint8))
+    sequence.append(np.full((16, 16), 255, dtype=np.uint8))
+    sequence.append(np.zeros((8, 8), dtype=np.uint8))
+
+    assert sequence.keyframe_indices == [0, 1, 2]
+    assert sequence[2].shape == (8, 8)
+
+
+def test_streaming_sequences_store_nothing():
+    sequence = DepthSequence(keep=False)
+    for depth in moving_square(frames=3):
+        sequence.append(depth)
+
+    assert sequence.entries == []
+    assert len(sequence) == 3
+    with pytest.raises(TypeError):
+        list(sequence)
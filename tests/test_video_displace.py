@@ -0,0 +1,105 @@
+"""Displace & Animate of the video addon (needs Blender's bpy module)"""
+import os
+
+import numpy as np
+import pytest
+
+bpy = pytest.importorskip("bpy")
+cv2 = pytest.importorskip("cv2")
+
+import ai_video_to_3d
+from ai_video_to_3d.ai_video_to_3d import VideoTo3DGenerator
+from ai_video_to_3d.pointcache import load_pc2
+
+FRAMES = 6
+
+
+@pytest.fixture(scope="module", autouse=True)
+def addon():
+    ai_video_to_3d.register()
+    yield
+    ai_video_to_3d.unregister()
+
+
+@pytest.fixture
+def scene(tmp_path):
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj)
+
+    # Detail (which the heuristic backend reads as near) in the top half only
+    path = str(tmp_path / "clip.avi")
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for _ in range(FRAMES):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[:24] = rng.integers(0, 256, (24, 64, 1), dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+    scene = bpy.context.scene
+    scene.video_3d_path = path
+    scene.video_3d_cache_dir = str(tmp_path / "cache")
+    scene.video_3d_mesh_method = 'GRID'
+    return scene
+
+
+def displaced_object():
+    return next(obj for obj in bpy.data.objects if obj.name.startswith("VideoDepth"))
+
+
+def test_point_cache_gets_one_sample_per_frame(scene, monkeypatch):
+    scene.video_3d_animation_mode = 'POINT_CACHE'
+    new_depth_sequence = VideoTo3DGenerator.new_depth_sequence
+    sequences = []
+
+    def recording(self, keep=True):
+        sequences.append(new_depth_sequence(self, keep))
+        return sequences[-1]
+
+    monkeypatch.setattr(VideoTo3DGenerator, "new_depth_sequence", recording)
+
+    assert bpy.ops.video_3d.displace('EXEC_DEFAULT') == {'FINISHED'}
+    # Frames went into the cache as they arrived, none were kept
+    assert [len(s) for s in sequences] == [FRAMES]
+    assert [s.entries for s in sequences] == [[]]
+
+    obj = displaced_object()
+    modifier = obj.modifiers["VideoDepthCache"]
+    positions, header = load_pc2(bpy.path.abspath(modifier.filepath))
+    assert header['samples'] == FRAMES == scene.frame_end
+    assert header['points'] == len(obj.data.vertices)
+
+    # Image top is +Y: the detailed half rises
+    last = positions[-1]
+    assert last[last[:, 1] > 0.5, 2].mean() > last[last[:, 1] < -0.5, 2].mean()
+    assert obj.data.shape_keys is None
+
+
+def test_point_cache_matches_shape_keys(scene):
+    scene.video_3d_animation_mode = 'SHAPE_KEYS'
+    bpy.ops.video_3d.displace('EXEC_DEFAULT')
+    keys = displaced_object().data.shape_keys.key_blocks
+    shape_key_co = np.array([v.co for v in keys[-1].data])
+
+    scene.video_3d_animation_mode = 'POINT_CACHE'
+    bpy.ops.video_3d.displace('EXEC_DEFAULT')
+    obj = [o for o in bpy.data.objects if o.name.startswith("VideoDepth") and o.modifiers][0]
+    positions, _ = load_pc2(bpy.path.abspath(obj.modifiers[0].filepath))
+
+    assert len(keys) == FRAMES + 1
+    np.testing.assert_allclose(positions[-1], shape_key_co, atol=1e-5)
+
+
+def test_failed_point_cache_run_leaves_nothing_behind(scene, monkeypatch):
+    scene.video_3d_animation_mode = 'POINT_CACHE'
+
+    def broken(self, *args, **kwargs):
+        yield np.zeros((48, 64), dtype=np.uint8)
+        raise RuntimeError("decoder died")
+
+    monkeypatch.setattr(VideoTo3DGenerator, "iter_depth_maps", broken)
+
+    with pytest.raises(RuntimeError, match="decoder died"):
+        bpy.ops.video_3d.displace('EXEC_DEFAULT')
+    assert not any(obj.name.startswith("VideoDepth") for obj in bpy.data.objects)
+    assert os.listdir(scene.video_3d_cache_dir) == []
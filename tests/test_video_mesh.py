@@ -0,0 +1,115 @@
+"""Displaced and animated planes of the video addon (needs Blender's bpy module)"""
+import numpy as np
+import pytest
+
+bpy = pytest.importorskip("bpy")
+cv2 = pytest.importorskip("cv2")
+
+from ai_video_to_3d.ai_video_to_3d import VideoTo3DGenerator
+from ai_video_to_3d.terrain import get_positions
+
+
+@pytest.fixture
+def generator():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    return VideoTo3DGenerator()
+
+
+@pytest.fixture
+def plane(generator):
+    return generator.create_grid_plane("VideoDepth_test")
+
+
+def ramp(height=9, width=17):
+    """Depth rising left to right, 0 to 255"""
+    return np.tile(np.linspace(0, 255, width), (height, 1)).astype(np.uint8)
+
+
+def test_displacement_follows_the_depth_map(generator, plane):
+    base = get_positions(plane.data)
+
+    generator.create_displaced_mesh(plane, ramp(), strength=2.0)
+
+    co = get_positions(plane.data)
+    np.testing.assert_allclose(co[:, :2], base[:, :2])
+    # Bilinear along a linear ramp is exact up to the uint8 rounding
+    np.testing.assert_allclose(co[:, 2], (base[:, 0] + 1) / 2 * 2.0, atol=0.01)
+
+
+def test_image_top_is_positive_y(generator, plane):
+    depth = np.zeros((8, 8), dtype=np.uint8)
+    depth[:4] = 255  # top half of the image
+
+    generator.create_displaced_mesh(plane, depth)
+
+    co = get_positions(plane.data)
+    np.testing.assert_allclose(co[co[:, 1] > 0.5, 2], 1.0)
+    np.testing.assert_allclose(co[co[:, 1] < -0.5, 2], 0.0)
+
+
+def test_depth_map_files_are_read(generator, plane, tmp_path):
+    path = str(tmp_path / "depth.png")
+    cv2.imwrite(path, ramp())
+    base = get_positions(plane.data)
+
+    generator.create_displaced_mesh(plane, path)
+
+    np.testing.assert_allclose(get_positions(plane.data)[:, 2], (base[:, 0] + 1) / 2, atol=0.01)
+    # Missing files leave the mesh alone
+    before = get_positions(plane.data)
+    generator.create_displaced_mesh(plane, str(tmp_path / "missing.png"))
+    np.testing.assert_array_equal(get_positions(plane.data), before)
+
+
+def test_edit_mode_is_left_first(generator, plane):
+    bpy.context.view_layer.objects.active = plane
+    bpy.ops.object.mode_set(mode='EDIT')
+
+    generator.create_displaced_mesh(plane, np.full((4, 4), 255, dtype=np.uint8))
+
+    assert plane.mode == 'OBJECT'
+    np.testing.assert_allclose(get_positions(plane.data)[:, 2], 1.0)
+
+
+def test_one_shape_key_per_depth_map(generator, plane):
+    base = get_positions(plane.data)
+    depth_maps = [np.full((4, 4), value, dtype=np.uint8) for value in (0, 51, 255)]
+
+    generator.animate_displacement(plane, depth_maps, fps=12, strength=2.0)
+
+    keys = plane.data.shape_keys.key_blocks
+    assert [key.name for key in keys] == ["Basis", "Frame_00000", "Frame_00001", "Frame_00002"]
+    for key, height in zip(keys[1:], (0.0, 0.4, 2.0)):
+        co = np.array([point.co for point in key.data])
+        np.testing.assert_allclose(co[:, :2], base[:, :2])
+        np.testing.assert_allclose(co[:, 2], base[:, 2] + height, atol=1e-5)
+
+    scene = bpy.context.scene
+    assert (scene.render.fps, scene.frame_start, scene.frame_end) == (12, 1, 3)
+
+
+def shown_keys(obj, frame):
+    bpy.context.scene.frame_set(frame)
+    return [key.name for key in obj.data.shape_keys.key_blocks[1:] if key.value > 0.5]
+
+
+def test_each_key_shows_on_its_own_frame(generator, plane):
+    depth_maps = [np.full((4, 4), value, dtype=np.uint8) for value in (0, 51, 255)]
+
+    generator.animate_displacement(plane, depth_maps, fps=24, strength=1.0)
+
+    assert [shown_keys(plane, frame) for frame in (1, 2, 3)] == [
+        ["Frame_00000"], ["Frame_00001"], ["Frame_00002"]]
+
+
+def test_repeated_frames_share_a_shape_key(generator, plane):
+    still = np.full((4, 4), 128, dtype=np.uint8)
+    depth_maps = [np.zeros((4, 4), dtype=np.uint8), still, still, still,
+                  np.full((4, 4), 255, dtype=np.uint8)]
+
+    generator.animate_displacement(plane, depth_maps, fps=24, strength=1.0)
+
+    assert len(plane.data.shape_keys.key_blocks) == 4
+    assert bpy.context.scene.frame_end == 5
+    assert [shown_keys(plane, frame) for frame in range(1, 6)] == [
+        ["Frame_00000"], ["Frame_00001"], ["Frame_00001"], ["Frame_00001"], ["Frame_00004"]]